@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# benchmarks/bench_docgen.py
+"""
+Benchmark for the document generation hot path.
+
+Runs generate_document_from_template() headless against a throwaway
+working directory containing a synthetic SQLite database (N clients,
+M variables), the bundled templates/*.docx and a generated large template.
+Reports per-stage timings, docs/sec and peak RSS, and writes everything to
+JSON so results can be compared across versions.
+
+Usage (from the project root):
+    python benchmarks/bench_docgen.py
+    python benchmarks/bench_docgen.py --clients 200 --variables 800 --docs-per-template 50
+    python benchmarks/bench_docgen.py --out benchmarks/results/my-run.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docx import Document  # noqa: E402
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def app_version():
+    match = re.search(r"\(v([\d.]+)\)", (PROJECT_ROOT / "README.md").read_text(encoding="utf-8"))
+    return match.group(1) if match else None
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scan_template_variables(template_paths):
+    """Collect the variable names the templates will ask the database for."""
+    from docxtpl import DocxTemplate
+    from modules.modifiers import parse_placeholders
+    from modules.bracket_variables import extract_bracket_variables
+
+    plain, combos = set(), set()
+    for path in template_paths:
+        raw = DocxTemplate(path).get_undeclared_template_variables()
+        for parsed in parse_placeholders(raw).values():
+            (combos if "combo" in parsed.tags else plain).add(parsed.base)
+        plain |= extract_bracket_variables(path)
+    return plain - combos, combos
+
+
+def build_large_template(path, paragraphs, n_vars):
+    """A long pleading that exercises every placeholder type on every paragraph."""
+    doc = Document()
+    doc.add_paragraph("IN THE DISTRICT COURT OF <<venue_upper>>")
+    doc.add_paragraph("Case No. {{XX25}} -- {{clientname_combo}} v. {{defendantname_upper}}")
+    for i in range(paragraphs):
+        doc.add_paragraph(
+            f"{i + 1}. (@He_She_They@) (@denies_deny@) the allegations regarding "
+            f"{{{{var{i % n_vars:04d}}}}} and {{{{var{(i * 7) % n_vars:04d}_title}}}}; "
+            f"[[firstname]] (@is_are@) represented by ((plaintiffattorneyfullname)) "
+            f"of ((plaintifffirmname))."
+        )
+    table = doc.add_table(rows=10, cols=2)
+    for r, row in enumerate(table.rows):
+        row.cells[0].text = f"{{{{var{r:04d}}}}}"
+        row.cells[1].text = "(@his_her_their@) [[lastname]]"
+    doc.save(path)
+
+
+# ---------------------------
+# Synthetic database
+# ---------------------------
+def build_synthetic_db(n_clients, n_vars, plain_vars, combo_vars, seed):
+    from modules import db
+    from modules.datagen import DataGenConfig, generate_database
+
+    # Every client gets a value for every variable the templates use, so
+    # the run never falls back to prompting
+    generate_database(DataGenConfig(
+        clients=n_clients,
+        variables=n_vars,
+        derived_fraction=0,
+        counsel=5,
+        counsel_rate=1.0,
+        fill_rate=1.0,
+        extra_variables=tuple(sorted(plain_vars)),
+        seed=seed,
+    ))
+    for name in combo_vars:
+        db.set_concat_variable(name, ["firstname", "lastname"], description="Benchmark combo")
+
+
+# ---------------------------
+# Benchmark run
+# ---------------------------
+def run(args):
+    from modules.docgen import generate_document_from_template
+    from modules.headless import headless_prompts
+    from modules.perf import GENERATION_STAGES, StageRecorder
+
+    templates = sorted(Path("templates").glob("*.docx"))
+    plain_vars, combo_vars = scan_template_variables(templates)
+
+    started = time.perf_counter()
+    build_synthetic_db(args.clients, args.variables, plain_vars, combo_vars, args.seed)
+    setup_seconds = time.perf_counter() - started
+
+    client_ids = list(range(1, args.clients + 1))
+    per_template = []
+    overall = StageRecorder()
+
+    with overall, headless_prompts() as session:
+        for template in templates:
+            with StageRecorder() as rec:
+                t0 = time.perf_counter()
+                docs = 0
+                for cid in client_ids[: args.docs_per_template]:
+                    if generate_document_from_template(template, cid):
+                        docs += 1
+                elapsed = time.perf_counter() - t0
+            per_template.append({
+                "template": template.name,
+                "documents": docs,
+                "seconds": round(elapsed, 4),
+                "docs_per_sec": round(docs / elapsed, 2) if elapsed else None,
+                "stages": {name: round(rec.totals.get(name, 0.0), 4) for name in GENERATION_STAGES},
+            })
+            print(f"  {template.name}: {docs} docs in {elapsed:.2f}s ({docs / elapsed:.1f} docs/sec)")
+
+    total_docs = sum(t["documents"] for t in per_template)
+    total_seconds = sum(t["seconds"] for t in per_template)
+    errors = [m for m in session.messages if m[0] == "showerror"]
+    return {
+        "benchmark": "docgen",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "app_version": app_version(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "clients": args.clients,
+            "variables": args.variables,
+            "docs_per_template": args.docs_per_template,
+            "large_paragraphs": args.large_paragraphs,
+            "seed": args.seed,
+        },
+        "setup_seconds": round(setup_seconds, 4),
+        "total_documents": total_docs,
+        "total_seconds": round(total_seconds, 4),
+        "docs_per_sec": round(total_docs / total_seconds, 2) if total_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {name: round(overall.totals.get(name, 0.0), 4) for name in GENERATION_STAGES},
+        "templates": per_template,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless document generation.")
+    parser.add_argument("--clients", type=int, default=20, help="synthetic clients in the database")
+    parser.add_argument("--variables", type=int, default=200, help="synthetic variables per client")
+    parser.add_argument("--docs-per-template", type=int, default=10, help="clients rendered per template")
+    parser.add_argument("--large-paragraphs", type=int, default=1000, help="paragraphs in the generated large template (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", type=Path, help="JSON results file (default: benchmarks/results/docgen-<timestamp>.json)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    args = parser.parse_args(argv)
+
+    out = args.out or PROJECT_ROOT / "benchmarks" / "results" / f"docgen-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out = out.resolve()
+
+    workdir = Path(tempfile.mkdtemp(prefix="docgen-bench-"))
+    cwd = os.getcwd()
+    try:
+        # Paths in the app are relative to the working directory (data/, templates/, ...)
+        shutil.copytree(PROJECT_ROOT / "templates", workdir / "templates")
+        shutil.copy(PROJECT_ROOT / "dynamicpleadingresponses.xlsx", workdir)
+        (workdir / "data").mkdir()
+        os.chdir(workdir)
+        if args.large_paragraphs:
+            build_large_template(
+                Path("templates") / f"BENCH - large ({args.large_paragraphs} paragraphs).docx",
+                args.large_paragraphs, args.variables,
+            )
+        print(f"Benchmarking in {workdir}")
+        results = run(args)
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"\n{results['total_documents']} documents, {results['docs_per_sec']} docs/sec, peak RSS {results['peak_rss_mb']} MB")
+    for name, seconds in results["stages"].items():
+        print(f"  {name:<8} {seconds:8.3f}s")
+    if results["errors"]:
+        print(f"{len(results['errors'])} generation error(s); see {out}")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# benchmarks/bench_memory.py
+"""
+Peak memory of rendering one pleading with a very long numbered list.
+
+A template with a multi-entry <<responses>> variable is rendered headless
+with lists of increasing length, each in a fresh process so ru_maxrss is
+that render's own peak. "stream" is the normal path (long lists expanded by
+modules.streamrender while the output is written); "tree" forces the
+python-docx expansion for comparison. In stream mode the peak should stay
+roughly flat as the list grows.
+
+Usage (from the project root):
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --items 1000 10000 50000 --modes stream
+    python benchmarks/bench_memory.py --out benchmarks/results/memory.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_docgen import app_version, build_synthetic_db, git_commit, peak_rss_mb  # noqa: E402
+
+LIST_VARIABLE = "responses"
+TEMPLATE_NAME = "BENCH - long list.docx"
+
+
+# ---------------------------
+# Setup
+# ---------------------------
+def build_list_template(path):
+    from docx import Document
+
+    doc = Document()
+    doc.add_paragraph("IN THE DISTRICT COURT -- {{firstname}} {{lastname}}")
+    doc.add_paragraph("RESPONSES TO REQUESTS FOR ADMISSION")
+    doc.add_paragraph(f"<<{LIST_VARIABLE}>>")
+    doc.add_paragraph("Respectfully submitted, [[firstname]] [[lastname]].")
+    doc.save(path)
+
+
+def build_responses_sheet(path):
+    """A one-sheet dynamicpleadingresponses.xlsx whose variable is a multi-entry list (D1 = FALSE)."""
+    import pandas as pd
+
+    rows = [
+        ("Admit", "[[firstname]] admits the request.", "", "FALSE"),
+        ("Deny", "[[firstname]] denies the request for lack of knowledge.", "", ""),
+    ]
+    frame = pd.DataFrame(rows, columns=["Display", "Output", "", "Single use"])
+    with pd.ExcelWriter(path) as writer:
+        frame.to_excel(writer, sheet_name=LIST_VARIABLE, index=False)
+
+
+# ---------------------------
+# One render (child process)
+# ---------------------------
+def render_once(mode, items):
+    from modules import streamrender
+    from modules.docgen import generate_document_from_template
+    from modules.headless import headless_prompts
+
+    if mode == "tree":
+        streamrender.STREAM_MIN_ITEMS = sys.maxsize
+    answers = {LIST_VARIABLE: [
+        f"Request {i + 1}: [[firstname]] {'admits' if i % 2 else 'denies'} the request." for i in range(items)
+    ]}
+    baseline = peak_rss_mb()
+    output = Path("output_documents") / f"list_{mode}_{items}.docx"
+    with headless_prompts(answers=answers) as session:
+        started = time.perf_counter()
+        generate_document_from_template(Path("templates") / TEMPLATE_NAME, 1, output_file=output)
+        seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+    with zipfile.ZipFile(output) as z:
+        with z.open("word/document.xml") as f:
+            paragraphs = sum(len(re.findall(rb"<w:p[ >]", chunk)) for chunk in iter(lambda: f.read(1 << 20), b""))
+    return {
+        "mode": mode,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "paragraphs": paragraphs,
+        "output_bytes": output.stat().st_size,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak,
+        "render_rss_mb": round(peak - baseline, 1) if peak is not None and baseline is not None else None,
+        "errors": [m for m in session.messages if m[0] == "showerror"],
+    }
+
+
+def run_child(mode, items):
+    """Run render_once in a fresh interpreter so ru_maxrss is this render's own."""
+    out = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", mode, str(items)],
+        capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        return {"mode": mode, "items": items, "error": out.stderr.strip().splitlines()[-1:]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------
+# Benchmark run
+# ---------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of long numbered-list renders.")
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 5000, 20000], help="list lengths to render")
+    parser.add_argument("--modes", nargs="+", choices=["stream", "tree"], default=["stream", "tree"])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", type=Path, help="JSON results file (default: benchmarks/results/memory-<timestamp>.json)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ITEMS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(render_once(args.child[0], int(args.child[1]))))
+        return
+
+    out = args.out or PROJECT_ROOT / "benchmarks" / "results" / f"memory-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out = out.resolve()
+
+    workdir = Path(tempfile.mkdtemp(prefix="docgen-bench-"))
+    cwd = os.getcwd()
+    runs = []
+    try:
+        # Paths in the app are relative to the working directory (data/, templates/, ...)
+        (workdir / "data").mkdir()
+        (workdir / "templates").mkdir()
+        os.chdir(workdir)
+        build_list_template(Path("templates") / TEMPLATE_NAME)
+        build_responses_sheet(Path("dynamicpleadingresponses.xlsx"))
+        build_synthetic_db(3, 10, {"firstname", "lastname"}, set(), args.seed)
+        print(f"Benchmarking in {workdir}")
+        for items in args.items:
+            for mode in args.modes:
+                result = run_child(mode, items)
+                runs.append(result)
+                if "error" in result:
+                    print(f"  {mode:<6} {items:>7} items: failed {result['error']}")
+                else:
+                    print(f"  {mode:<6} {items:>7} items: {result['seconds']:8.2f}s  "
+                          f"peak RSS {result['peak_rss_mb']} MB (+{result['render_rss_mb']} MB for the render)")
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "benchmark": "memory",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "app_version": app_version(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"items": args.items, "modes": args.modes, "seed": args.seed},
+        "runs": runs,
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 # modules/admin.py
 import tkinter as tk
-import sqlite3
 import modules.editdynamicvariable as edv
 import modules.editconcatvariable as ecv
 from tkinter import messagebox
@@ -10,7 +9,7 @@ from modules.db import (
     list_all_variable_meta,
     set_variable_meta,
     variable_exists,
-    DB_PATH,
+    delete_variable,
 )
 
 WARNING_TEXT = (
@@ -284,14 +283,8 @@ def open_admin():
         ):
             return
         
-        # Delete from variables_meta
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("DELETE FROM variables_meta WHERE var_name=?", (var_name,))
-        # Delete all client values for this variable
-        c.execute("DELETE FROM variables WHERE var_name=?", (var_name,))
-        conn.commit()
-        conn.close()
+        # Delete from variables_meta and all client values for this variable
+        delete_variable(var_name)
         
         messagebox.showinfo("Deleted", f"Variable '{var_name}' has been deleted.", parent=win)
         populate_list()
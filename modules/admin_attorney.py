@@ -8,8 +8,9 @@ from modules.db import (
     update_opposing_counsel,
     delete_opposing_counsel,
     ensure_opposing_counsel_table,
-    DB_PATH,  # ← Make sure this is here
-    get_variables  # ← And this
+    search_opposing_counsel,
+    list_clients_for_counsel,
+    get_variables,
 )
 
 WARNING_TEXT = (
@@ -158,16 +159,9 @@ def open_admin_attorney():
         attorney_name = f"{first_name_var.get()} {last_name_var.get()}"
         
         # Query clients with this opposing_counsel_id
-        import sqlite3
-        from modules.db import DB_PATH, get_variables
+        client_ids = list_clients_for_counsel(counsel_id)
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT id FROM clients WHERE opposing_counsel_id = ?", (counsel_id,))
-        client_rows = c.fetchall()
-        conn.close()
-        
-        if not client_rows:
+        if not client_ids:
             messagebox.showinfo(
                 "No Associated Clients",
                 f"No clients are currently assigned to {attorney_name}.",
@@ -189,7 +183,7 @@ def open_admin_attorney():
         
         tk.Label(
             clients_win,
-            text=f"Total: {len(client_rows)} client(s)",
+            text=f"Total: {len(client_ids)} client(s)",
             font=("Arial", 10),
             fg="gray"
         ).pack(pady=5)
@@ -207,7 +201,7 @@ def open_admin_attorney():
         canvas.configure(yscrollcommand=scrollbar.set)
         
         # Build list
-        for idx, (client_id,) in enumerate(client_rows, 1):
+        for idx, client_id in enumerate(client_ids, 1):
             vars_ = get_variables("client", client_id)
             matterid = vars_.get("matterid", "")
             firstname = vars_.get("firstname", "")
@@ -295,22 +289,21 @@ def open_admin_attorney():
         for widget in scroll_frame.winfo_children():
             widget.destroy()
         
-        term = search_var.get().lower()
+        term = search_var.get().strip()
         attorneys = list_opposing_counsel()
         
+        # Search in name, firm, email, bar number, ... (full-text index, best match first)
+        if term:
+            by_id = {row[0]: row for row in attorneys}
+            attorneys = [by_id[i] for i in search_opposing_counsel(term, limit=len(attorneys)) if i in by_id]
+        
         match_count = 0
         for row in attorneys:
             counsel_id = row[0]
             first_name = row[1] or ""
             last_name = row[2] or ""
             firm = row[11] or ""
-            email = row[3] or ""
-            
-            # Search in name, firm, email
             full_name = f"{first_name} {last_name}".strip()
-            searchable = f"{full_name} {firm} {email}".lower()
-            if term and term not in searchable:
-                continue
             
             match_count += 1
             
@@ -376,16 +369,9 @@ def open_admin_attorney():
         attorney_name = f"{first_name_var.get()} {last_name_var.get()}"
         
         # Query clients with this opposing_counsel_id
-        import sqlite3
-        from modules.db import DB_PATH, get_variables
-        
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT id FROM clients WHERE opposing_counsel_id = ?", (counsel_id,))
-        client_rows = c.fetchall()
-        conn.close()
+        client_ids = list_clients_for_counsel(counsel_id)
         
-        if not client_rows:
+        if not client_ids:
             messagebox.showinfo(
                 "No Associated Clients",
                 f"No clients are currently assigned to {attorney_name}.",
@@ -407,7 +393,7 @@ def open_admin_attorney():
         
         tk.Label(
             clients_win,
-            text=f"Total: {len(client_rows)} client(s)",
+            text=f"Total: {len(client_ids)} client(s)",
             font=("Arial", 10),
             fg="gray"
         ).pack(pady=5)
@@ -425,7 +411,7 @@ def open_admin_attorney():
         canvas.configure(yscrollcommand=scrollbar.set)
         
         # Build list
-        for idx, (client_id,) in enumerate(client_rows, 1):
+        for idx, client_id in enumerate(client_ids, 1):
             vars_ = get_variables("client", client_id)
             matterid = vars_.get("matterid", "")
             firstname = vars_.get("firstname", "")
@@ -6,8 +6,10 @@ These variables are embedded in Excel responses and replaced after list creation
 
 import re
 from docx import Document
+from modules.docbuffer import save_document
 from modules.db import get_variables
 
+BRACKET_RE = re.compile(r'\[\[([a-zA-Z_][a-zA-Z0-9_]*)\]\]')
 
 def extract_bracket_variables(template_path):
     """
@@ -17,7 +19,7 @@ def extract_bracket_variables(template_path):
     doc = Document(template_path)
     bracket_vars = set()
     
-    pattern = r'\[\[([a-zA-Z_][a-zA-Z0-9_]*)\]\]'
+    pattern = BRACKET_RE
     
     for paragraph in doc.paragraphs:
         matches = re.findall(pattern, paragraph.text)
@@ -35,75 +37,64 @@ def extract_bracket_variables(template_path):
     return bracket_vars
 
 
-def replace_bracket_variables(doc_path, client_id):
+def bracket_replacements(client_id, grammar_settings=None, client_vars=None):
     """
-    Replace [[variable]] with values from client database.
-    Also handles grammar variables like [[he_she_they]].
+    {name: replacement text} for [[name]] tokens, resolved lazily: the
+    grammar table first, then client variables. Unknown names map back to
+    their own [[name]] token.
+    grammar_settings ({"count", "gender"}) defaults to the client's stored fields.
+    client_vars (e.g. a rendercache.ConsumedVariables) is used instead of
+    reading the client's variables, so the caller sees every name looked
+    up, including the [[plaintiff]] / [[defendant]] fallbacks.
     """
-    from modules.db import get_variables
-    from modules.grammar import GRAMMAR_RULES
-    
-    doc = Document(doc_path)
+    from modules.grammar import get_grammar_table, grammar_settings_from_client
     
     # Get all client variables
-    client_vars = get_variables("client", client_id)
+    if client_vars is None:
+        client_vars = get_variables("client", client_id)
     
-    # Get grammar settings from client
-    count = "singular"  # Default
-    gender = "male"     # Default
+    # Get grammar settings from client (defendant_count and gender)
+    if not grammar_settings or not grammar_settings.get("count"):
+        grammar_settings = grammar_settings_from_client(client_id, client_vars)
+    count = grammar_settings["count"]
+    gender = grammar_settings["gender"] or "male"
     
-    # Check if client has defendant_count and gender
-    defendant_count = client_vars.get("defendant_count", "1")
-    try:
-        if int(defendant_count) > 1:
-            count = "plural"
-    except:
-        pass
+    grammar_table = get_grammar_table(count, gender)
     
-    client_gender = client_vars.get("gender", "male").lower()
-    if client_gender in ["male", "female"]:
-        gender = client_gender
+    class _Replacements(dict):
+        """Grammar table first, then client variables; resolved values are memoised."""
+        def __missing__(self, var_name):
+            value = client_vars.get(var_name, "")
+            if not value:
+                # Check for common derived variables
+                if var_name == "plaintiff":
+                    value = client_vars.get("clientname", client_vars.get("firstname", "")) + " " + client_vars.get("lastname", "")
+                elif var_name == "defendant":
+                    value = client_vars.get("defendantname", "Defendant")
+            value = str(value) if value else f"[[{var_name}]]"
+            self[var_name] = value
+            return value
     
-    def get_replacement(var_name):
-        """Get the replacement value for a [[variable]]"""
-        # Check if it's a grammar variable first
-        if var_name in GRAMMAR_RULES:
-            rule = GRAMMAR_RULES[var_name]
-            
-            # Simple singular/plural rules
-            if "singular" in rule and "plural" in rule:
-                return rule[count]
-            
-            # Gender-dependent pronoun rules
-            if count == "plural":
-                return rule["plural"]
-            else:
-                key = f"singular_{gender}"
-                return rule.get(key, rule.get("singular", f"[[{var_name}]]"))
-        
-        # Not a grammar variable - get from client database
-        value = client_vars.get(var_name, "")
-        if not value:
-            # Check for common derived variables
-            if var_name == "plaintiff":
-                return client_vars.get("clientname", client_vars.get("firstname", "")) + " " + client_vars.get("lastname", "")
-            elif var_name == "defendant":
-                return client_vars.get("defendantname", "Defendant")
-        
-        return value if value else f"[[{var_name}]]"
+    return _Replacements(grammar_table)
+
+
+def replace_bracket_variables(doc_path, client_id, grammar_settings=None, client_vars=None):
+    """
+    Replace [[variable]] with values from client database.
+    Also handles grammar variables like [[he_she_they]].
+    grammar_settings ({"count", "gender"}) defaults to the client's stored fields;
+    client_vars is passed to bracket_replacements.
+    """
+    doc = Document(doc_path)
+    replacements = bracket_replacements(client_id, grammar_settings, client_vars)
     
     def replace_in_paragraph(paragraph):
         """Replace [[variable]] in a paragraph"""
-        pattern = r'\[\[([a-zA-Z_][a-zA-Z0-9_]*)\]\]'
-        matches = re.findall(pattern, paragraph.text)
-        
-        for var_name in matches:
-            replacement = get_replacement(var_name)
-            original_pattern = f"[[{var_name}]]"
-            
-            for run in paragraph.runs:
-                if original_pattern in run.text:
-                    run.text = run.text.replace(original_pattern, str(replacement))
+        if "[[" not in paragraph.text:
+            return
+        for run in paragraph.runs:
+            if "[[" in run.text:
+                run.text = BRACKET_RE.sub(lambda m: replacements[m.group(1)], run.text)
     
     # Replace in all document parts
     for paragraph in doc.paragraphs:
@@ -121,4 +112,4 @@ def replace_bracket_variables(doc_path, client_id):
         for paragraph in section.footer.paragraphs:
             replace_in_paragraph(paragraph)
     
-    doc.save(doc_path)
\ No newline at end of file
+    save_document(doc, doc_path)
\ No newline at end of file
@@ -0,0 +1,267 @@
+# modules/clientpicker.py
+"""
+Shared client picker used by document generation, the main menu and
+Update Client.
+
+Labels for every client are built once per picker from a single query
+(db.list_client_label_fields) into a ClientIndex: a list of labels plus a
+precomputed lowercase copy for searching. Typing in the search box filters
+that in-memory table; matches whose words start with the search text are
+listed first, then the remaining substring matches. Very large indexes also
+keep a trigram index (built up front, so no keystroke pays for it) and a
+search only checks labels containing the search text's rarest trigram.
+Clients whose label does not match but whose variables do (an address, a
+claim number, ...) are appended from the database's full-text index
+(db.search_clients), ranked by relevance. That query is debounced: it runs
+once typing pauses for VALUE_SEARCH_DELAY_MS, not on every keystroke.
+
+The list itself is virtual (modules/virtualtree.py): the Treeview only
+ever holds the rows that fit on screen, and scrolling re-fills those rows
+from the current results, so repaint cost does not grow with the number of
+clients.
+"""
+
+import tkinter as tk
+from tkinter import messagebox
+
+from modules.db import list_client_label_fields, search_clients
+from modules.virtualtree import VirtualTreeview
+
+# A linear scan of the lowercase table takes a few ms at 20k clients; above
+# this size the index also builds a trigram index (once, when it is created)
+TRIGRAM_THRESHOLD = 50000
+# Most variable-value matches appended after the label matches
+VALUE_MATCH_LIMIT = 200
+VALUE_MATCH_MIN_CHARS = 2
+VALUE_SEARCH_DELAY_MS = 300
+
+
+def format_client_label(client_id, matterid, firstname, lastname):
+    label = f"ID-{client_id}"
+    if matterid:
+        label = f"({matterid}) - {label}"
+    name = " ".join(p for p in (firstname, lastname) if p).strip()
+    if name:
+        label += f" - {name}"
+    return label
+
+
+class ClientIndex:
+    """Client labels with a lowercase search table (and optional trigram index)."""
+
+    def __init__(self, rows, trigrams=None):
+        # rows: [(client_id, matterid, firstname, lastname)]
+        self.ids = [r[0] for r in rows]
+        self.labels = [format_client_label(*r) for r in rows]
+        self._positions = {client_id: pos for pos, client_id in enumerate(self.ids)}
+        # Leading space lets " term" find word starts with a plain substring test
+        self._search = [" " + label.lower().replace("(", " ").replace(")", " ") for label in self.labels]
+        self._trigrams = None
+        if trigrams or (trigrams is None and len(self.ids) > TRIGRAM_THRESHOLD):
+            self._build_trigrams()
+
+    @classmethod
+    def from_db(cls, client_ids=None):
+        rows = list_client_label_fields()
+        if client_ids is not None:
+            wanted = set(client_ids)
+            rows = [r for r in rows if r[0] in wanted]
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _build_trigrams(self):
+        trigrams = {}
+        for pos, text in enumerate(self._search):
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                trigrams.setdefault(gram, []).append(pos)
+        self._trigrams = trigrams
+
+    @staticmethod
+    def _normalize(term):
+        return " ".join(term.lower().replace("(", " ").replace(")", " ").split())
+
+    def search(self, term):
+        """
+        Positions of clients whose label matches: word-prefix matches first,
+        then substring matches. Only the in-memory table is searched.
+        """
+        term = self._normalize(term)
+        if not term:
+            return list(range(len(self.ids)))
+
+        candidates = range(len(self.ids))
+        if len(term) >= 3 and self._trigrams is not None:
+            postings = [self._trigrams.get(term[i:i + 3], ()) for i in range(len(term) - 2)]
+            candidates = min(postings, key=len)
+
+        search = self._search
+        word_start = " " + term
+        prefix, substring = [], []
+        for pos in candidates:
+            text = search[pos]
+            if word_start in text:
+                prefix.append(pos)
+            elif term in text:
+                substring.append(pos)
+        return prefix + substring
+
+    def wants_value_matches(self, term):
+        return len(self._normalize(term)) >= VALUE_MATCH_MIN_CHARS
+
+    def value_matches(self, term, seen):
+        """
+        Positions of clients matched only through their variable values (a
+        database full-text query), excluding positions in seen.
+        """
+        if not self.wants_value_matches(term):
+            return []
+        term = self._normalize(term)
+        positions = self._positions
+        extra = []
+        for client_id in search_clients(term, limit=VALUE_MATCH_LIMIT):
+            pos = positions.get(client_id)
+            if pos is not None and pos not in seen:
+                extra.append(pos)
+        return extra
+
+
+class VirtualClientList(VirtualTreeview):
+    """
+    Scrollable single-selection list over a ClientIndex that only creates
+    Treeview rows for the visible window of results.
+    """
+
+    def __init__(self, parent, index, on_activate=None, on_results=None, **kwargs):
+        super().__init__(parent, "ClientPicker.Treeview", "No matching clients found",
+                         tree_options={"show": "tree"}, **kwargs)
+        self.index = index
+        self.on_activate = on_activate
+        self.on_results = on_results
+        self.term = ""
+        self._value_search = None
+        self.tree.column("#0", stretch=True)
+        self.tree.bind("<Double-1>", lambda e: self._activate())
+        self.tree.bind("<Return>", lambda e: self._activate())
+
+    @property
+    def selected_id(self):
+        return None if self.selected is None else int(self.selected)
+
+    @selected_id.setter
+    def selected_id(self, client_id):
+        self.selected = None if client_id is None else str(client_id)
+
+    # --- data ---
+    def filter(self, term):
+        """Show label matches now; value matches follow once typing pauses."""
+        self._cancel_value_search()
+        self.term = term
+        self.results = self.index.search(term)
+        self.offset = 0
+        self._render()
+        if self.index.wants_value_matches(term):
+            self._value_search = self.after(VALUE_SEARCH_DELAY_MS, self._add_value_matches)
+        if self.on_results:
+            self.on_results()
+
+    def flush(self):
+        """Run a pending value search now (e.g. before acting on the results)."""
+        if self._value_search is not None:
+            self._cancel_value_search()
+            self._add_value_matches()
+
+    def _add_value_matches(self):
+        self._value_search = None
+        extra = self.index.value_matches(self.term, set(self.results))
+        if extra:
+            self.results = self.results + extra
+            self._render()
+        if self.on_results:
+            self.on_results()
+
+    def _cancel_value_search(self):
+        if self._value_search is not None:
+            self.after_cancel(self._value_search)
+            self._value_search = None
+
+    def destroy(self):
+        self._cancel_value_search()
+        super().destroy()
+
+    # --- rows ---
+    def _row_id(self, pos):
+        return str(self.index.ids[pos])
+
+    def _insert_row(self, pos):
+        self.tree.insert("", "end", iid=self._row_id(pos), text=self.index.labels[pos])
+
+    def _activate(self):
+        if self.selected_id is not None and self.on_activate:
+            self.on_activate(self.selected_id)
+
+
+def pick_client(clients=None, title="Select Client", prompt="Search Client:", parent=None):
+    """
+    Show the client picker and return (client_id, cancelled).
+
+    clients optionally restricts the list (any sequence whose items are
+    client ids or rows starting with the id, e.g. db.list_clients()).
+    """
+    client_ids = None
+    if clients is not None:
+        client_ids = [c[0] if isinstance(c, (tuple, list)) else c for c in clients]
+    index = ClientIndex.from_db(client_ids)
+
+    result = {"id": None, "cancelled": True}
+
+    popup = tk.Toplevel(parent)
+    popup.title(title)
+    popup.geometry("520x520")
+    popup.grab_set()
+
+    tk.Label(popup, text=prompt).pack(pady=(10, 0))
+    search_var = tk.StringVar()
+    entry = tk.Entry(popup, textvariable=search_var, width=50)
+    entry.pack(pady=5)
+    count_var = tk.StringVar()
+    tk.Label(popup, textvariable=count_var, fg="gray").pack()
+
+    def choose(client_id):
+        result["id"] = client_id
+        result["cancelled"] = False
+        popup.destroy()
+
+    def show_count():
+        count_var.set(f"{len(client_list.results)} of {len(index)} clients")
+
+    client_list = VirtualClientList(popup, index, on_activate=choose, on_results=show_count)
+    client_list.pack(fill="both", expand=True, padx=10, pady=5)
+
+    def update_list(*_):
+        client_list.filter(search_var.get())
+
+    search_var.trace_add("write", update_list)
+    entry.bind("<Down>", lambda e: (client_list.tree.focus_set(), client_list._step(1)))
+    entry.bind("<Return>", lambda e: submit())
+    update_list()
+    entry.focus_set()
+
+    def submit():
+        # A single match can be selected straight from the search box
+        client_list.flush()
+        if client_list.selected_id is None and len(client_list.results) == 1:
+            client_list.selected_id = index.ids[client_list.results[0]]
+        if client_list.selected_id is None:
+            messagebox.showwarning("Select Client", "No client selected.", parent=popup)
+            return
+        choose(client_list.selected_id)
+
+    btns = tk.Frame(popup)
+    btns.pack(pady=10)
+    tk.Button(btns, text="Select", command=submit, width=12).pack(side="left", padx=5)
+    tk.Button(btns, text="Cancel", command=popup.destroy, width=12).pack(side="left", padx=5)
+
+    popup.wait_window()
+    return result["id"], result["cancelled"]
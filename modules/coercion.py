@@ -0,0 +1,168 @@
+# modules/coercion.py
+"""
+Typed coercion of variable values, shared by intake, bulk intake and
+variable entry.
+
+Values are converted a whole column at a time with pandas: every cell of
+one variable type goes through a single vectorised conversion instead of a
+try/except per cell. Each conversion returns the coerced values, a validity
+mask and a list of the cells that could not be converted, so a bad import
+reports every problem at once rather than silently dropping or
+stringifying values.
+
+Supported types and the stored form of a converted value:
+
+    string    stripped text
+    int       int           ("12", 12, 12.0; "12.5" is an error)
+    float     float
+    bool      True / False  (1/0, true/false, yes/no, y/n)
+    date      "MM/DD/YYYY"
+    iso-date  "YYYY-MM-DD"
+
+Blank cells (None, NaN, "") are valid and coerce to None.
+"""
+
+from collections import namedtuple
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SUPPORTED_TYPES = ("string", "int", "float", "bool", "date", "iso-date")
+
+TRUE_VALUES = ("1", "1.0", "true", "yes", "y")
+FALSE_VALUES = ("0", "0.0", "false", "no", "n")
+DATE_FORMATS = {"date": "%m/%d/%Y", "iso-date": "%Y-%m-%d"}
+
+CoercionError = namedtuple("CoercionError", "key var_name value var_type message")
+
+
+@dataclass
+class CoercionResult:
+    values: pd.Series    # coerced values (object dtype), None where blank or invalid
+    valid: np.ndarray    # True where the cell was blank or converted
+    errors: list         # [CoercionError] for every invalid cell
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def normalize_type(raw_type):
+    """Map a user/sheet type label to a supported type (default 'string')."""
+    if raw_type is None or (not isinstance(raw_type, str) and pd.isna(raw_type)):
+        return "string"
+    t = str(raw_type).strip().lower()
+    return t if t in SUPPORTED_TYPES else "string"
+
+
+def _as_text(series):
+    """Stripped string view of a column; missing values stay <NA>."""
+    return series.astype("string").str.strip()
+
+
+def _objects(values, mask):
+    """
+    Object array holding values where mask is set and None elsewhere.
+    NumPy's astype(object) turns int64/float64 into Python ints/floats in
+    one pass; pandas would re-infer a numeric dtype and bring back NaN.
+    """
+    out = np.full(len(mask), None, dtype=object)
+    out[mask] = np.asarray(values)[mask].astype(object)
+    return out
+
+
+def coerce_series(values, var_type, var_name=None):
+    """
+    Coerce one column of values to var_type.
+
+    values may be any iterable; its index (if it is a Series) is kept and
+    used as CoercionError.key, so callers can pass a column indexed by
+    matterid, row number, etc.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    series = series.astype(object)
+    var_type = normalize_type(var_type)
+
+    text = _as_text(series)
+    blank = (series.isna() | text.eq("")).fillna(True).to_numpy(dtype=bool)
+    present = pd.Series(~blank, index=series.index)
+
+    if var_type == "int":
+        num = pd.to_numeric(text.where(present), errors="coerce").to_numpy(dtype=float)
+        converted = present.to_numpy() & ~np.isnan(num) & (np.mod(num, 1) == 0)
+        out = _objects(np.where(converted, num, 0).astype(np.int64), converted)
+        expected = "a whole number"
+    elif var_type == "float":
+        num = pd.to_numeric(text.where(present), errors="coerce").to_numpy(dtype=float)
+        converted = present.to_numpy() & np.isfinite(num)
+        out = _objects(num, converted)
+        expected = "a number"
+    elif var_type == "bool":
+        lowered = text.str.lower()
+        is_true = lowered.isin(TRUE_VALUES).fillna(False).to_numpy(dtype=bool)
+        is_false = lowered.isin(FALSE_VALUES).fillna(False).to_numpy(dtype=bool)
+        converted = present.to_numpy() & (is_true | is_false)
+        out = _objects(is_true, converted)
+        expected = "yes/no, true/false or 1/0"
+    elif var_type in DATE_FORMATS:
+        # Bare numbers are rejected rather than read as epoch offsets or day-of-month
+        numeric = text.str.fullmatch(r"\d+(\.\d+)?").fillna(False).astype(bool)
+        candidates = present & ~numeric
+        parsed = pd.to_datetime(text.where(candidates), errors="coerce", format="mixed")
+        converted = (candidates & parsed.notna()).to_numpy(dtype=bool)
+        out = _objects(parsed.dt.strftime(DATE_FORMATS[var_type]).to_numpy(dtype=object), converted)
+        expected = "a date"
+    else:
+        converted = present.to_numpy()
+        out = _objects(text.to_numpy(dtype=object), converted)
+        expected = None
+
+    valid = blank | converted
+    errors = [
+        CoercionError(key, var_name, value, var_type, f"expected {expected}")
+        for key, value in series[~valid].items()
+    ]
+    return CoercionResult(pd.Series(out, index=series.index, dtype=object), valid, errors)
+
+
+def coerce_value(value, var_type):
+    """Coerce a single value; returns None if it is blank or invalid."""
+    return coerce_series([value], var_type).values.iloc[0]
+
+
+def coerce_records(records, types):
+    """
+    Coerce {key: {var_name: raw_value}} column by column.
+
+    types maps var_name -> type (missing names are strings). Returns
+    (coerced, errors) where coerced has the same shape as records with
+    invalid cells set to None.
+    """
+    by_var = {}
+    for key, values in records.items():
+        for var_name, value in values.items():
+            column = by_var.setdefault(var_name, ([], []))
+            column[0].append(key)
+            column[1].append(value)
+
+    coerced = {key: {} for key in records}
+    errors = []
+    for var_name, (keys, raw) in by_var.items():
+        result = coerce_series(pd.Series(raw, index=keys, dtype=object), types.get(var_name), var_name)
+        for key, value in zip(keys, result.values.tolist()):
+            coerced[key][var_name] = value
+        errors.extend(result.errors)
+    return coerced, errors
+
+
+def format_errors(errors, limit=50):
+    """One line per invalid cell, truncated after limit lines."""
+    lines = [
+        f"{e.key}: {e.var_name} = {e.value!r} ({e.var_type}, {e.message})" if e.var_name
+        else f"{e.key}: {e.value!r} ({e.var_type}, {e.message})"
+        for e in errors[:limit]
+    ]
+    if len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return "\n".join(lines)
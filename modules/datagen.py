@@ -0,0 +1,289 @@
+# modules/datagen.py
+"""
+Synthetic data generator for load-testing the client database.
+
+Fills clients, variables, variables_meta, concat_variables and
+opposing_counsel with realistic-looking volume so the generation, update and
+export paths can be profiled at scale. Output is fully determined by the
+configuration (including the seed): two runs with the same settings produce
+byte-for-byte identical table contents.
+
+Rows are written with executemany() from generators inside a single
+transaction, so memory stays flat even for tens of millions of variable rows.
+
+Usage (from the project root):
+    python -m modules.datagen --clients 50000 --variables 800 --derived 0.05
+    python -m modules.datagen --db data/loadtest.db --reset
+
+Or from code:
+    from modules.datagen import DataGenConfig, generate_database
+    stats = generate_database(DataGenConfig(clients=2000, variables=300))
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from dataclasses import dataclass, field, fields
+from datetime import date, timedelta
+from pathlib import Path
+
+from modules import db
+
+FIRST_NAMES = (
+    "Alex", "Jordan", "Maria", "Samuel", "Priya", "Liam", "Grace", "Omar", "Elena", "Noah",
+    "Ava", "Mateo", "Chloe", "Ethan", "Sofia", "Lucas", "Hannah", "Diego", "Zoe", "Isaac",
+)
+LAST_NAMES = (
+    "Garcia", "Smith", "Nguyen", "Johnson", "Brown", "Khan", "Miller", "Lopez", "Davis", "Wilson",
+    "Martinez", "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "Martin", "Lee", "Clark", "Lewis",
+)
+FIRMS = ("Law Offices", "LLP", "& Associates", "Legal Group", "PC")
+CITIES = (
+    ("Glenwood Springs", "CO", "81601"), ("Denver", "CO", "80202"), ("Aspen", "CO", "81611"),
+    ("Grand Junction", "CO", "81501"), ("Boulder", "CO", "80302"),
+)
+WORDS = (
+    "contract", "breach", "notice", "payment", "property", "agreement", "tenant", "landlord",
+    "damages", "deadline", "service", "vehicle", "account", "statement", "hearing", "motion",
+)
+CATEGORIES = (
+    "Client Info", "Case Details", "Court", "Employment", "Financial",
+    "Insurance", "Medical", "Property", "Discovery", "Settlement",
+)
+
+# Client identity variables the generator always creates (the document
+# pipeline and grammar settings read these)
+CORE_VARIABLES = (
+    ("firstname", "string", "Client Info"),
+    ("lastname", "string", "Client Info"),
+    ("gender", "string", "Client Info"),
+    ("defendant_count", "int", "Client Info"),
+)
+
+
+@dataclass
+class DataGenConfig:
+    clients: int = 1000
+    variables: int = 200                 # generated variables, excluding the core ones
+    derived_fraction: float = 0.05       # share of variables that are concat/derived
+    counsel: int = 50
+    fill_rate: float = 0.9               # chance a client has a value for each variable
+    counsel_rate: float = 0.8            # chance a client is assigned opposing counsel
+    female_fraction: float = 0.5
+    plural_fraction: float = 0.15        # clients with more than one defendant
+    type_weights: dict = field(default_factory=lambda: {
+        "string": 70, "int": 10, "float": 5, "bool": 5, "iso-date": 10,
+    })
+    extra_variables: tuple = ()          # additional string variables every client gets
+    seed: int = 1234
+
+
+def _variable_plan(cfg, rng):
+    """Return [(var_name, var_type, category)] for base variables and [(var_name, components)] for derived ones."""
+    n_derived = int(round(cfg.variables * cfg.derived_fraction))
+    n_base = cfg.variables - n_derived
+    types, weights = zip(*cfg.type_weights.items())
+
+    base = list(CORE_VARIABLES)
+    for i in range(n_base):
+        base.append((f"var{i:04d}", rng.choices(types, weights)[0], CATEGORIES[i % len(CATEGORIES)]))
+    core_names = {name for name, _, _ in base}
+    base += [(name, "string", "General") for name in cfg.extra_variables if name not in core_names]
+
+    string_vars = [name for name, var_type, _ in base if var_type == "string"]
+    derived = []
+    for i in range(n_derived):
+        components = rng.sample(string_vars, k=min(len(string_vars), rng.randint(2, 3)))
+        derived.append((f"derived{i:04d}", components))
+    return base, derived
+
+
+def _random_value(rng, var_type, base_date):
+    if var_type == "int":
+        return str(rng.randint(0, 100000))
+    if var_type == "float":
+        return f"{rng.uniform(0, 100000):.2f}"
+    if var_type == "bool":
+        return "True" if rng.random() < 0.5 else "False"
+    if var_type == "iso-date":
+        return (base_date + timedelta(days=rng.randint(0, 3650))).isoformat()
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 6)))
+
+
+def _counsel_rows(cfg, rng):
+    for i in range(1, cfg.counsel + 1):
+        city, state, zip_code = rng.choice(CITIES)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (
+            i, first, last, f"{first.lower()}.{last.lower()}{i}@example.com",
+            f"eservice{i}@example.com", f"{rng.randint(100, 9999)} Main St", city, state, zip_code,
+            f"970-555-{rng.randint(0, 9999):04d}", f"970-555-{rng.randint(0, 9999):04d}",
+            f"{last} {rng.choice(FIRMS)} #{i}", str(10000 + i), None,
+        )
+
+
+def _client_and_variable_rows(cfg, rng, base_vars, client_rows):
+    """
+    Yield variable rows client by client, appending each client's row to
+    client_rows as it goes (clients are inserted in batches alongside).
+    """
+    base_date = date(2015, 1, 1)
+    for cid in range(1, cfg.clients + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        gender = "female" if rng.random() < cfg.female_fraction else "male"
+        count = rng.randint(2, 4) if rng.random() < cfg.plural_fraction else 1
+        counsel_id = rng.randint(1, cfg.counsel) if cfg.counsel and rng.random() < cfg.counsel_rate else None
+        birthday = (date(1940, 1, 1) + timedelta(days=rng.randint(0, 25000))).isoformat()
+        client_rows.append((cid, first, last, birthday, f"SYN-{cid:06d}", counsel_id, gender, count))
+
+        core = {"firstname": first, "lastname": last, "gender": gender, "defendant_count": str(count)}
+        for name, var_type, _ in base_vars:
+            if name in core:
+                yield ("client", cid, name, core[name])
+            elif name in cfg.extra_variables or rng.random() < cfg.fill_rate:
+                yield ("client", cid, name, _random_value(rng, var_type, base_date))
+
+
+def generate_database(cfg=None, db_path=None, reset=False, progress=None):
+    """
+    Populate the database with synthetic data described by cfg.
+
+    db_path defaults to db.DB_PATH; a different file is written without
+    changing db.DB_PATH. Refuses to write into a database that already has clients unless
+    reset=True, in which case the database file is deleted first.
+    progress(clients_done, clients_total) is called periodically.
+    Returns a dict of row counts and elapsed seconds.
+    """
+    cfg = cfg or DataGenConfig()
+    path = db.DB_PATH if db_path is None else Path(db_path)
+    if reset and path.exists():
+        path.unlink()
+
+    # create_db() only works on db.DB_PATH
+    saved_path, db.DB_PATH = db.DB_PATH, path
+    try:
+        db.create_db()
+    finally:
+        db.DB_PATH = saved_path
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    if c.execute("SELECT COUNT(*) FROM clients").fetchone()[0]:
+        conn.close()
+        raise ValueError(f"{path} already has clients; use reset=True to replace it.")
+
+    rng = random.Random(cfg.seed)
+    base_vars, derived_vars = _variable_plan(cfg, rng)
+    started = time.perf_counter()
+
+    # Bulk-load settings; durability is irrelevant for throwaway data
+    c.execute("PRAGMA synchronous=OFF")
+    c.execute("PRAGMA journal_mode=MEMORY")
+
+    with conn:
+        c.executemany(
+            "INSERT INTO opposing_counsel (id, first_name, last_name, email, service_email, address_street, "
+            "address_city, address_state, address_zip, phone, fax, firm_name, bar_number, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _counsel_rows(cfg, rng),
+        )
+        c.executemany(
+            "INSERT OR REPLACE INTO variables_meta (var_name, var_type, description, category, display_order) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((name, var_type, f"Synthetic {var_type} variable", category, order)
+             for order, (name, var_type, category) in enumerate(base_vars)),
+        )
+        c.executemany(
+            "INSERT OR REPLACE INTO variables_meta (var_name, var_type, description, category, is_derived, derived_expression) "
+            "VALUES (?, 'string', ?, 'Derived', 1, ?)",
+            ((name, "Derived: " + " + ".join(components), " + ' ' + ".join(components))
+             for name, components in derived_vars),
+        )
+        c.executemany(
+            f"INSERT OR REPLACE INTO {db.CONCAT_TABLE} (var_name, components, description, var_type, category, separator) "
+            "VALUES (?, ?, ?, 'string', 'Derived', ' ')",
+            ((name, ",".join(components), "Synthetic combo") for name, components in derived_vars),
+        )
+
+        # Clients are flushed in batches while their variables stream in
+        client_rows = []
+        variable_rows = 0
+        batch = []
+        for row in _client_and_variable_rows(cfg, rng, base_vars, client_rows):
+            batch.append(row)
+            if len(batch) >= 50000:
+                c.executemany("INSERT INTO variables (entity_type, entity_id, var_name, var_value) VALUES (?, ?, ?, ?)", batch)
+                variable_rows += len(batch)
+                batch.clear()
+                c.executemany(
+                    "INSERT INTO clients (id, first_name, last_name, birthday, matterid, opposing_counsel_id, gender, defendant_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    client_rows,
+                )
+                if progress:
+                    progress(client_rows[-1][0], cfg.clients)
+                client_rows.clear()
+        c.executemany("INSERT INTO variables (entity_type, entity_id, var_name, var_value) VALUES (?, ?, ?, ?)", batch)
+        variable_rows += len(batch)
+        c.executemany(
+            "INSERT INTO clients (id, first_name, last_name, birthday, matterid, opposing_counsel_id, gender, defendant_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            client_rows,
+        )
+        if progress:
+            progress(cfg.clients, cfg.clients)
+        db.refresh_search_index(conn)
+
+    conn.close()
+    db.invalidate_concat_cache()
+
+    return {
+        "db_path": str(path),
+        "clients": cfg.clients,
+        "opposing_counsel": cfg.counsel,
+        "variables_meta": len(base_vars) + len(derived_vars),
+        "derived": len(derived_vars),
+        "variable_rows": variable_rows,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv=None):
+    defaults = DataGenConfig()
+    parser = argparse.ArgumentParser(description="Populate the client database with synthetic data.")
+    parser.add_argument("--db", type=Path, default=db.DB_PATH, help=f"database file (default: {db.DB_PATH})")
+    parser.add_argument("--reset", action="store_true", help="delete the database file first")
+    parser.add_argument("--clients", type=int, default=defaults.clients)
+    parser.add_argument("--variables", type=int, default=defaults.variables)
+    parser.add_argument("--derived", type=float, default=defaults.derived_fraction, help="fraction of variables that are derived")
+    parser.add_argument("--counsel", type=int, default=defaults.counsel)
+    parser.add_argument("--fill-rate", type=float, default=defaults.fill_rate)
+    parser.add_argument("--plural", type=float, default=defaults.plural_fraction, help="fraction of clients with multiple defendants")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    cfg = DataGenConfig(
+        clients=args.clients,
+        variables=args.variables,
+        derived_fraction=args.derived,
+        counsel=args.counsel,
+        fill_rate=args.fill_rate,
+        plural_fraction=args.plural,
+        seed=args.seed,
+    )
+    print("Generating:", ", ".join(f"{f.name}={getattr(cfg, f.name)}" for f in fields(cfg) if f.name != "type_weights"))
+
+    def progress(done, total):
+        print(f"  {done}/{total} clients", end="\r", flush=True)
+
+    try:
+        stats = generate_database(cfg, db_path=args.db, reset=args.reset, progress=progress)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    print()
+    for key, value in stats.items():
+        print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 # modules/db.py
+import re
 import sqlite3
+from collections import namedtuple
 from pathlib import Path
 
+from modules.perf import traced
+
 DB_PATH = Path("data/clients.db")
 
 # ---------------------------
 # Opposing Counsel Table
 # ---------------------------
+@traced("db")
 def ensure_opposing_counsel_table():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -33,6 +38,7 @@ def ensure_opposing_counsel_table():
     conn.close()
 
 
+@traced("db")
 def list_opposing_counsel():
     ensure_opposing_counsel_table()
     conn = sqlite3.connect(DB_PATH)
@@ -43,6 +49,7 @@ def list_opposing_counsel():
     return rows
 
 
+@traced("db")
 def get_opposing_counsel(counsel_id):
     ensure_opposing_counsel_table()
     conn = sqlite3.connect(DB_PATH)
@@ -53,6 +60,7 @@ def get_opposing_counsel(counsel_id):
     return row
 
 
+@traced("db")
 def create_opposing_counsel(first_name, last_name, email=None, service_email=None, address_street=None, address_city=None, address_state=None, address_zip=None, phone=None, fax=None, firm_name=None, bar_number=None, notes=None):
     ensure_opposing_counsel_table()
     conn = sqlite3.connect(DB_PATH)
@@ -71,6 +79,7 @@ def create_opposing_counsel(first_name, last_name, email=None, service_email=Non
         return None
 
 
+@traced("db")
 def update_opposing_counsel(counsel_id, first_name, last_name, email=None, service_email=None, address_street=None, address_city=None, address_state=None, address_zip=None, phone=None, fax=None, firm_name=None, bar_number=None, notes=None):
     ensure_opposing_counsel_table()
     conn = sqlite3.connect(DB_PATH)
@@ -84,6 +93,7 @@ def update_opposing_counsel(counsel_id, first_name, last_name, email=None, servi
     conn.close()
 
 
+@traced("db")
 def delete_opposing_counsel(counsel_id):
     ensure_opposing_counsel_table()
     conn = sqlite3.connect(DB_PATH)
@@ -93,6 +103,7 @@ def delete_opposing_counsel(counsel_id):
     conn.close()
 
 
+@traced("db")
 def get_opposing_counsel_by_name(first_name, last_name, firm_name=None):
     """Get opposing counsel by name"""
     ensure_opposing_counsel_table()
@@ -109,6 +120,7 @@ def get_opposing_counsel_by_name(first_name, last_name, firm_name=None):
     return row
 
 
+@traced("db")
 def get_opposing_counsel_variables(counsel_id):
     """Get all variables for an opposing counsel by ID - returns lowercase keys"""
     ensure_opposing_counsel_table()
@@ -155,6 +167,7 @@ def get_opposing_counsel_variables(counsel_id):
 # ---------------------------
 # Database setup
 # ---------------------------
+@traced("db")
 def create_db():
     DB_PATH.parent.mkdir(exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
@@ -204,10 +217,14 @@ def create_db():
     ensure_concat_table()
     ensure_opposing_counsel_table()  
     ensure_variable_meta_columns()
+    ensure_variable_versioning()
+    ensure_grammar_rules_table()
+    ensure_search_index()
 
 
     
 
+@traced("db")
 def ensure_variable_meta_columns():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -227,10 +244,39 @@ def ensure_variable_meta_columns():
     conn.close()
 
 
+@traced("db")
+def ensure_variable_versioning():
+    """
+    Add rev/updated_at to variables. rev starts at 0 and goes up by one
+    every time var_value changes, whichever code path writes it (the trigger
+    bumps it unless the writer already did); compare_and_set_variables uses
+    it to detect concurrent edits.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(variables)")
+    cols = [r[1] for r in c.fetchall()]
+
+    if "rev" not in cols:
+        c.execute("ALTER TABLE variables ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+    if "updated_at" not in cols:
+        c.execute("ALTER TABLE variables ADD COLUMN updated_at TEXT")
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS variables_rev_au AFTER UPDATE OF var_value ON variables
+        WHEN NEW.rev = OLD.rev AND NEW.var_value IS NOT OLD.var_value BEGIN
+            UPDATE variables SET rev = OLD.rev + 1, updated_at = datetime('now') WHERE id = NEW.id;
+        END
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
 
 # ---------------------------
 # Client CRUD
 # ---------------------------
+@traced("db")
 def create_client(matterid, first_name=None, last_name=None, birthday=None):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -242,11 +288,13 @@ def create_client(matterid, first_name=None, last_name=None, birthday=None):
         (first_name, last_name, birthday, matterid)
     )
     client_id = c.lastrowid
+    refresh_search_index(conn)
     conn.commit()
     conn.close()
     return client_id
 
 
+@traced("db")
 def list_clients():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -256,6 +304,33 @@ def list_clients():
     return rows
 
 
+@traced("db")
+def list_client_label_fields():
+    """
+    Return [(client_id, matterid, firstname, lastname)] for every client in
+    one query. Values come from the client's variables, falling back to the
+    clients table columns.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        SELECT c.id,
+               COALESCE(NULLIF(MAX(CASE WHEN v.var_name='matterid' THEN v.var_value END), ''), c.matterid, ''),
+               COALESCE(NULLIF(MAX(CASE WHEN v.var_name='firstname' THEN v.var_value END), ''), c.first_name, ''),
+               COALESCE(NULLIF(MAX(CASE WHEN v.var_name='lastname' THEN v.var_value END), ''), c.last_name, '')
+        FROM clients c
+        LEFT JOIN variables v
+               ON v.entity_type='client' AND v.entity_id=c.id
+              AND v.var_name IN ('matterid', 'firstname', 'lastname')
+        GROUP BY c.id
+        ORDER BY c.id
+    ''')
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+@traced("db")
 def get_client(client_id):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -265,11 +340,60 @@ def get_client(client_id):
     return row
 
 
+@traced("db")
+def get_client_grammar_fields(client_id):
+    """Return (defendant_count, gender) stored on the clients row, or (None, None)."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    try:
+        c.execute('SELECT defendant_count, gender FROM clients WHERE id=?', (client_id,))
+        row = c.fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    conn.close()
+    return row if row else (None, None)
+
+
+@traced("db")
+def get_client_counsel_id(client_id):
+    """opposing_counsel_id assigned to the client, or None."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT opposing_counsel_id FROM clients WHERE id=?", (client_id,))
+    row = c.fetchone()
+    conn.close()
+    return row[0] if row and row[0] else None
+
+
+@traced("db")
+def set_client_counsel_id(client_id, counsel_id):
+    """Assign opposing counsel to a client (None clears the assignment)."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("UPDATE clients SET opposing_counsel_id=? WHERE id=?", (counsel_id or None, client_id))
+    refresh_search_index(conn)
+    conn.commit()
+    conn.close()
+
+
+@traced("db")
+def list_clients_for_counsel(counsel_id):
+    """IDs of the clients assigned to an opposing counsel."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT id FROM clients WHERE opposing_counsel_id=? ORDER BY id", (counsel_id,))
+    rows = [r[0] for r in c.fetchall()]
+    conn.close()
+    return rows
+
+
+@traced("db")
 def delete_client(client_id):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute("DELETE FROM variables WHERE entity_type='client' AND entity_id=?", (client_id,))
     c.execute("DELETE FROM clients WHERE id=?", (client_id,))
+    refresh_search_index(conn)
     conn.commit()
     conn.close()
 
@@ -277,6 +401,7 @@ def delete_client(client_id):
 # ---------------------------
 # Variable CRUD (values)
 # ---------------------------
+@traced("db")
 def set_variable(entity_type, entity_id, var_name, var_value):
     if isinstance(var_value, dict) and "value" in var_value:
         var_value = var_value["value"]
@@ -289,15 +414,17 @@ def set_variable(entity_type, entity_id, var_name, var_value):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute('''
-        INSERT INTO variables (entity_type, entity_id, var_name, var_value)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO variables (entity_type, entity_id, var_name, var_value, updated_at)
+        VALUES (?, ?, ?, ?, datetime('now'))
         ON CONFLICT(entity_type, entity_id, var_name)
         DO UPDATE SET var_value=excluded.var_value
     ''', (entity_type, entity_id, var_name, var_value))
+    refresh_search_index(conn)
     conn.commit()
     conn.close()
 
 
+@traced("db")
 def get_variables(entity_type, entity_id):
     import ast
     conn = sqlite3.connect(DB_PATH)
@@ -338,7 +465,14 @@ def get_variables(entity_type, entity_id):
     return values
 
 
-def get_all_variables_for_client(entity_type, entity_id):
+@traced("db")
+def get_all_variables_for_client(entity_type, entity_id, compute_derived=True):
+    """
+    {var_name: {var_type, description, category, display_order, is_derived,
+    derived_expression, value, rev}} for every variable in variables_meta.
+    With compute_derived=False derived values are left as stored so the
+    caller can evaluate them on demand (see derived_context/evaluate_derived).
+    """
     import ast
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -351,7 +485,8 @@ def get_all_variables_for_client(entity_type, entity_id):
             m.display_order,
             m.is_derived,
             m.derived_expression,
-            COALESCE(v.var_value, '') AS var_value
+            COALESCE(v.var_value, '') AS var_value,
+            v.rev
         FROM variables_meta m
         LEFT JOIN variables v
             ON v.var_name = m.var_name
@@ -363,9 +498,9 @@ def get_all_variables_for_client(entity_type, entity_id):
     conn.close()
 
     result = {}
-    for var_name, var_type, description, category, display_order, is_derived, derived_expression, var_value in rows:
+    for var_name, var_type, description, category, display_order, is_derived, derived_expression, var_value, rev in rows:
         raw_val = var_value
-        if isinstance(raw_val, str):
+        if isinstance(raw_val, str) and raw_val.startswith("{"):
             try:
                 parsed = ast.literal_eval(raw_val)
                 if isinstance(parsed, dict) and "value" in parsed:
@@ -379,23 +514,214 @@ def get_all_variables_for_client(entity_type, entity_id):
             "display_order": display_order,
             "is_derived": is_derived,
             "derived_expression": derived_expression,
-            "value": raw_val or ""
+            "value": raw_val or "",
+            "rev": rev,  # None when the client has no row for this variable
         }
 
-    for var_name, data in result.items():
-        if data["is_derived"] and data["derived_expression"]:
-            try:
-                context = {k: v["value"] for k, v in result.items()}
-                data["value"] = str(eval(data["derived_expression"], {"__builtins__": {}}, context))
-            except Exception:
-                data["value"] = ""
+    if compute_derived:
+        context = derived_context(result)
+        for var_name, data in result.items():
+            if data["is_derived"] and data["derived_expression"]:
+                data["value"] = context[var_name] = evaluate_derived(data["derived_expression"], context)
 
     return result
 
 
+def derived_context(variables):
+    """Name -> value mapping that derived expressions are evaluated against."""
+    return {k: v["value"] for k, v in variables.items()}
+
+
+def evaluate_derived(expression, context):
+    """Value of one derived expression, or "" if it cannot be evaluated."""
+    try:
+        return str(eval(expression, {"__builtins__": {}}, context))
+    except Exception:
+        return ""
+
+
+# ---------------------------
+# Bulk client import
+# ---------------------------
+def _chunks(items, size=900):
+    """Split a list for IN (...) queries (SQLite caps bound parameters)."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+@traced("db")
+def bulk_import_clients(records, meta=None, dry_run=False):
+    """
+    Create/update many clients in a single transaction.
+
+    records: {matterid: {var_name: value}}; values of None are skipped.
+    meta:    {var_name: (var_type, description)} used to create missing
+             variables_meta rows (and refresh changed descriptions).
+    dry_run: compute the report but roll everything back.
+
+    Returns {matterid: {"client_id", "created", "added": {var: new},
+    "changed": {var: (old, new)}, "unchanged": int}}. client_id is None for
+    new clients in a dry run.
+    """
+    meta = meta or {}
+    records = {str(m).strip(): values for m, values in records.items()}
+    matterids = list(records)
+    report = {}
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN")
+
+        existing = {}
+        for chunk in _chunks(matterids):
+            c.execute(
+                f"SELECT matterid, id FROM clients WHERE matterid IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            existing.update(c.fetchall())
+
+        current = {}
+        ids = list(existing.values())
+        for chunk in _chunks(ids):
+            c.execute(
+                f"SELECT entity_id, var_name, COALESCE(var_value, '') FROM variables "
+                f"WHERE entity_type='client' AND entity_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for entity_id, var_name, value in c.fetchall():
+                current.setdefault(entity_id, {})[var_name] = value
+
+        # Metadata: create what is missing, refresh changed descriptions
+        c.execute("SELECT var_name, description FROM variables_meta")
+        known_meta = dict(c.fetchall())
+        used_vars = {name for values in records.values() for name in values}
+        for var_name in sorted(used_vars):
+            var_type, description = meta.get(var_name, ("string", ""))
+            if var_name not in known_meta:
+                c.execute(
+                    "INSERT INTO variables_meta (var_name, var_type, description) VALUES (?, ?, ?)",
+                    (var_name, var_type, description),
+                )
+            elif description and description != (known_meta[var_name] or ""):
+                c.execute("UPDATE variables_meta SET description=? WHERE var_name=?", (description, var_name))
+
+        upserts = []
+        for matterid in matterids:
+            values = records[matterid]
+            client_id = existing.get(matterid)
+            created = client_id is None
+            if created and not dry_run:
+                c.execute("INSERT INTO clients (matterid) VALUES (?)", (matterid,))
+                client_id = c.lastrowid
+            old_values = current.get(client_id, {}) if not created else {}
+
+            entry = {"client_id": client_id, "created": created, "added": {}, "changed": {}, "unchanged": 0}
+            for var_name, value in values.items():
+                if value is None:
+                    continue
+                value = value if isinstance(value, str) else str(value)
+                if var_name not in old_values:
+                    entry["added"][var_name] = value
+                elif old_values[var_name] != value:
+                    entry["changed"][var_name] = (old_values[var_name], value)
+                else:
+                    entry["unchanged"] += 1
+                    continue
+                upserts.append(("client", client_id, var_name, value))
+            report[matterid] = entry
+
+        if not dry_run:
+            c.executemany('''
+                INSERT INTO variables (entity_type, entity_id, var_name, var_value, updated_at)
+                VALUES (?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(entity_type, entity_id, var_name)
+                DO UPDATE SET var_value=excluded.var_value
+            ''', upserts)
+            refresh_search_index(conn)
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return report
+
+
+# ---------------------------
+# Versioned (compare-and-swap) writes
+# ---------------------------
+VariableConflict = namedtuple("VariableConflict", "var_name expected_rev current_rev current_value updated_at")
+
+
+@traced("db")
+def compare_and_set_variables(entity_type, entity_id, changes):
+    """
+    Write several variables in one transaction, each only if its row is
+    still at the revision the caller read.
+
+    changes: [(var_name, new_value, expected_rev)] where expected_rev is
+    the rev from get_all_variables_for_client (None = the row did not
+    exist). If any row has moved on, nothing is written and the conflicts
+    are returned; otherwise every change is committed and [] is returned.
+    """
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    c = conn.cursor()
+    try:
+        # Take the write lock before reading so no other writer can slip in between
+        c.execute("BEGIN IMMEDIATE")
+        current = {}
+        for chunk in _chunks([name for name, _, _ in changes]):
+            c.execute(
+                f"SELECT var_name, rev, var_value, updated_at FROM variables "
+                f"WHERE entity_type=? AND entity_id=? AND var_name IN ({','.join('?' * len(chunk))})",
+                [entity_type, entity_id, *chunk],
+            )
+            current.update((r[0], r[1:]) for r in c.fetchall())
+
+        conflicts = []
+        for var_name, _, expected_rev in changes:
+            rev, value, updated_at = current.get(var_name, (None, None, None))
+            if rev != expected_rev:
+                conflicts.append(VariableConflict(var_name, expected_rev, rev, value, updated_at))
+        if conflicts:
+            c.execute("ROLLBACK")
+            return conflicts
+
+        updates, inserts = [], []
+        for var_name, new_value, expected_rev in changes:
+            if isinstance(new_value, dict) and "value" in new_value:
+                new_value = new_value["value"]
+            new_value = "" if new_value is None else str(new_value)
+            if expected_rev is None:
+                inserts.append((entity_type, entity_id, var_name, new_value))
+            else:
+                updates.append((new_value, entity_type, entity_id, var_name, expected_rev))
+        c.executemany('''
+            UPDATE variables SET var_value=?, rev=rev + 1, updated_at=datetime('now')
+            WHERE entity_type=? AND entity_id=? AND var_name=? AND rev=?
+        ''', updates)
+        c.executemany('''
+            INSERT INTO variables (entity_type, entity_id, var_name, var_value, rev, updated_at)
+            VALUES (?, ?, ?, ?, 0, datetime('now'))
+        ''', inserts)
+        refresh_search_index(conn)
+        c.execute("COMMIT")
+        return []
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
 # ---------------------------
 # Variable metadata CRUD
 # ---------------------------
+@traced("db")
 def set_variable_meta(var_name, var_type='string', description=None, category='General',
                       display_order=0, is_derived=0, derived_expression=None, conn=None):
     own_conn = False
@@ -421,6 +747,19 @@ def set_variable_meta(var_name, var_type='string', description=None, category='G
         conn.close()
 
 
+@traced("db")
+def delete_variable(var_name):
+    """Remove a variable's metadata and its value for every client."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("DELETE FROM variables_meta WHERE var_name=?", (var_name,))
+    c.execute("DELETE FROM variables WHERE var_name=?", (var_name,))
+    refresh_search_index(conn)
+    conn.commit()
+    conn.close()
+
+
+@traced("db")
 def variable_exists(var_name):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -430,6 +769,7 @@ def variable_exists(var_name):
     return exists
 
 
+@traced("db")
 def get_variable_meta(var_name):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -459,6 +799,7 @@ def get_variable_meta(var_name):
 # ---------------------------
 CONCAT_TABLE = "concat_variables"
 
+@traced("db")
 def ensure_concat_table():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -481,6 +822,7 @@ def ensure_concat_table():
     conn.close()
 
 
+@traced("db")
 def list_all_concats():
     ensure_concat_table()
     conn = sqlite3.connect(DB_PATH)
@@ -501,6 +843,26 @@ def list_all_concats():
     return concats
 
 
+# Concat definitions indexed by var_name, loaded once and reused by the
+# document generator; invalidated whenever a definition is written.
+_concat_index = None
+
+
+@traced("db")
+def get_concat_index():
+    """Return {var_name: concat_dict} for all concat variables (cached)."""
+    global _concat_index
+    if _concat_index is None:
+        _concat_index = {c["var_name"]: c for c in list_all_concats()}
+    return _concat_index
+
+
+def invalidate_concat_cache():
+    global _concat_index
+    _concat_index = None
+
+
+@traced("db")
 def set_concat_variable(var_name, components, description="", var_type="string",
                         category="Derived", separator=" "):
     ensure_concat_table()
@@ -518,8 +880,10 @@ def set_concat_variable(var_name, components, description="", var_type="string",
     """, (var_name, ",".join(components), description, var_type, category, separator))
     conn.commit()
     conn.close()
+    invalidate_concat_cache()
 
 
+@traced("db")
 def delete_concat_variable(var_name):
     ensure_concat_table()
     conn = sqlite3.connect(DB_PATH)
@@ -527,15 +891,110 @@ def delete_concat_variable(var_name):
     c.execute(f"DELETE FROM {CONCAT_TABLE} WHERE var_name=?", (var_name,))
     conn.commit()
     conn.close()
+    invalidate_concat_cache()
+
+
+# ---------------------------
+# User-defined grammar rules
+# ---------------------------
+GRAMMAR_RULES_TABLE = "grammar_rules"
+GRAMMAR_RULE_FORMS = ("singular", "plural", "singular_male", "singular_female", "singular_neutral")
+
+
+@traced("db")
+def ensure_grammar_rules_table():
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {GRAMMAR_RULES_TABLE} (
+            token TEXT PRIMARY KEY,
+            singular TEXT,
+            plural TEXT,
+            singular_male TEXT,
+            singular_female TEXT,
+            singular_neutral TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+@traced("db")
+def list_grammar_rules():
+    """Return {token: {form: text}} for user-defined rules (only non-NULL forms)."""
+    ensure_grammar_rules_table()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(f"SELECT token, {', '.join(GRAMMAR_RULE_FORMS)} FROM {GRAMMAR_RULES_TABLE}")
+    rows = c.fetchall()
+    conn.close()
+    return {
+        r[0]: {form: text for form, text in zip(GRAMMAR_RULE_FORMS, r[1:]) if text is not None}
+        for r in rows
+    }
+
+
+# Same caching scheme as the concat index: loaded once, dropped on write
+_grammar_rule_index = None
+
+
+@traced("db")
+def get_grammar_rule_index():
+    global _grammar_rule_index
+    if _grammar_rule_index is None:
+        try:
+            _grammar_rule_index = list_grammar_rules()
+        except sqlite3.Error:
+            _grammar_rule_index = {}
+    return _grammar_rule_index
+
+
+def invalidate_grammar_rule_cache():
+    global _grammar_rule_index
+    _grammar_rule_index = None
+
+
+@traced("db")
+def set_grammar_rule(token, singular=None, plural=None, singular_male=None,
+                     singular_female=None, singular_neutral=None):
+    ensure_grammar_rules_table()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(f"""
+        INSERT INTO {GRAMMAR_RULES_TABLE} (token, {', '.join(GRAMMAR_RULE_FORMS)})
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(token) DO UPDATE SET
+            singular=excluded.singular,
+            plural=excluded.plural,
+            singular_male=excluded.singular_male,
+            singular_female=excluded.singular_female,
+            singular_neutral=excluded.singular_neutral
+    """, (token, singular, plural, singular_male, singular_female, singular_neutral))
+    conn.commit()
+    conn.close()
+    invalidate_grammar_rule_cache()
+
+
+@traced("db")
+def delete_grammar_rule(token):
+    ensure_grammar_rules_table()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(f"DELETE FROM {GRAMMAR_RULES_TABLE} WHERE token=?", (token,))
+    conn.commit()
+    conn.close()
+    invalidate_grammar_rule_cache()
 
 
 # ---------------------------
 # Convenience helpers
 # ---------------------------
+@traced("db")
 def get_variable_value_for_client(var_name, client_id):
     return get_variables("client", client_id).get(var_name)
 
 
+@traced("db")
 def list_all_variable_meta():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -559,3 +1018,238 @@ def list_all_variable_meta():
         }
         for r in rows
     ]
+
+
+# ---------------------------
+# Full-text search (FTS5)
+# ---------------------------
+# client_search holds one document per client (rowid = clients.id): its
+# matterid, name and every variable value. Triggers on clients/variables only
+# record the client id in client_search_dirty, so a bulk import does not
+# rebuild a document per inserted variable; every write to clients or
+# variables then calls refresh_search_index(conn) before it commits, which
+# rebuilds the dirty documents in one statement in the same transaction.
+# Searches only read.
+# counsel_search holds one document per opposing counsel and is kept current
+# directly by triggers. Without FTS5 the search functions fall back to LIKE.
+CLIENT_SEARCH_TABLE = "client_search"
+CLIENT_SEARCH_DIRTY_TABLE = "client_search_dirty"
+COUNSEL_SEARCH_TABLE = "counsel_search"
+SEARCH_MAX_TERMS = 8
+# bm25 ranking costs a pass over every match; larger result sets come back in id order
+SEARCH_RANK_LIMIT = 1000
+
+_CLIENT_DOCUMENT = """
+    COALESCE(c.matterid, '') || ' ' || COALESCE(c.first_name, '') || ' ' || COALESCE(c.last_name, '') || ' ' ||
+    COALESCE((SELECT group_concat(v.var_value, ' ') FROM variables v
+              WHERE v.entity_type = 'client' AND v.entity_id = c.id), '')
+"""
+_COUNSEL_FIELDS = ("first_name", "last_name", "firm_name", "email", "service_email",
+                   "bar_number", "address_city", "phone")
+_COUNSEL_DOCUMENT = " || ' ' || ".join(f"COALESCE({{0}}.{f}, '')" for f in _COUNSEL_FIELDS)
+
+# Trigger bodies avoid INSERT OR IGNORE: an upsert's conflict handling
+# overrides the conflict clause of statements inside triggers it fires.
+_MARK_DIRTY = (
+    f"INSERT INTO {CLIENT_SEARCH_DIRTY_TABLE} (client_id) SELECT {{0}} "
+    f"WHERE NOT EXISTS (SELECT 1 FROM {CLIENT_SEARCH_DIRTY_TABLE} WHERE client_id = {{0}});"
+)
+
+_SEARCH_TRIGGERS = f"""
+CREATE TRIGGER client_search_var_ai AFTER INSERT ON variables
+WHEN NEW.entity_type = 'client' BEGIN
+    {_MARK_DIRTY.format("NEW.entity_id")}
+END;
+CREATE TRIGGER client_search_var_au AFTER UPDATE ON variables
+WHEN NEW.entity_type = 'client' OR OLD.entity_type = 'client' BEGIN
+    {_MARK_DIRTY.format("OLD.entity_id")}
+    {_MARK_DIRTY.format("NEW.entity_id")}
+END;
+CREATE TRIGGER client_search_var_ad AFTER DELETE ON variables
+WHEN OLD.entity_type = 'client' BEGIN
+    {_MARK_DIRTY.format("OLD.entity_id")}
+END;
+CREATE TRIGGER client_search_client_ai AFTER INSERT ON clients BEGIN
+    {_MARK_DIRTY.format("NEW.id")}
+END;
+CREATE TRIGGER client_search_client_au AFTER UPDATE ON clients BEGIN
+    {_MARK_DIRTY.format("OLD.id")}
+    {_MARK_DIRTY.format("NEW.id")}
+END;
+CREATE TRIGGER client_search_client_ad AFTER DELETE ON clients BEGIN
+    {_MARK_DIRTY.format("OLD.id")}
+END;
+CREATE TRIGGER counsel_search_ai AFTER INSERT ON opposing_counsel BEGIN
+    INSERT INTO {COUNSEL_SEARCH_TABLE} (rowid, body) VALUES (NEW.id, {_COUNSEL_DOCUMENT.format("NEW")});
+END;
+CREATE TRIGGER counsel_search_au AFTER UPDATE ON opposing_counsel BEGIN
+    DELETE FROM {COUNSEL_SEARCH_TABLE} WHERE rowid = OLD.id;
+    INSERT INTO {COUNSEL_SEARCH_TABLE} (rowid, body) VALUES (NEW.id, {_COUNSEL_DOCUMENT.format("NEW")});
+END;
+CREATE TRIGGER counsel_search_ad AFTER DELETE ON opposing_counsel BEGIN
+    DELETE FROM {COUNSEL_SEARCH_TABLE} WHERE rowid = OLD.id;
+END;
+"""
+
+_fts_available = None
+
+
+@traced("db")
+def ensure_search_index():
+    """
+    Create the FTS5 search tables and their triggers, building them from
+    existing data the first time. Returns False (and leaves the database
+    untouched) when this SQLite build has no FTS5.
+    """
+    global _fts_available
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    try:
+        c.execute("SELECT name FROM sqlite_master WHERE name IN (?, ?)",
+                  (CLIENT_SEARCH_TABLE, COUNSEL_SEARCH_TABLE))
+        existing = {r[0] for r in c.fetchall()}
+        try:
+            c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {CLIENT_SEARCH_TABLE} USING fts5(body, prefix='2 3')")
+            c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {COUNSEL_SEARCH_TABLE} USING fts5(body, prefix='2 3')")
+        except sqlite3.OperationalError:
+            _fts_available = False
+            return False
+        c.execute(f"CREATE TABLE IF NOT EXISTS {CLIENT_SEARCH_DIRTY_TABLE} (client_id INTEGER PRIMARY KEY)")
+
+        if CLIENT_SEARCH_TABLE not in existing:
+            c.execute(f"INSERT INTO {CLIENT_SEARCH_TABLE} (rowid, body) SELECT c.id, {_CLIENT_DOCUMENT} FROM clients c")
+        if COUNSEL_SEARCH_TABLE not in existing:
+            c.execute(f"""
+                INSERT INTO {COUNSEL_SEARCH_TABLE} (rowid, body)
+                SELECT id, {_COUNSEL_DOCUMENT.format("opposing_counsel")} FROM opposing_counsel
+            """)
+        # Recreated every start so trigger changes reach existing databases
+        for (name,) in c.execute("SELECT name FROM sqlite_master WHERE type='trigger' "
+                                 "AND (name LIKE 'client_search_%' OR name LIKE 'counsel_search_%')").fetchall():
+            c.execute(f"DROP TRIGGER {name}")
+        c.executescript(_SEARCH_TRIGGERS)
+        # Documents left dirty by a writer that did not refresh them
+        _refresh_client_documents(c)
+        conn.commit()
+        _fts_available = True
+        return True
+    finally:
+        conn.close()
+
+
+def fts_available(conn=None):
+    """True when the search tables exist (create_db builds them if SQLite has FTS5)."""
+    global _fts_available
+    if _fts_available is None:
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(DB_PATH)
+        try:
+            _fts_available = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (CLIENT_SEARCH_TABLE,)
+            ).fetchone() is not None
+        finally:
+            if own_conn:
+                conn.close()
+    return _fts_available
+
+
+def _refresh_client_documents(c):
+    """Rebuild the search documents of clients changed since the last refresh."""
+    if c.execute(f"SELECT 1 FROM {CLIENT_SEARCH_DIRTY_TABLE} LIMIT 1").fetchone() is None:
+        return 0
+    dirty = f"(SELECT client_id FROM {CLIENT_SEARCH_DIRTY_TABLE})"
+    c.execute(f"DELETE FROM {CLIENT_SEARCH_TABLE} WHERE rowid IN {dirty}")
+    c.execute(f"INSERT INTO {CLIENT_SEARCH_TABLE} (rowid, body) SELECT c.id, {_CLIENT_DOCUMENT} FROM clients c WHERE c.id IN {dirty}")
+    c.execute(f"DELETE FROM {CLIENT_SEARCH_DIRTY_TABLE}")
+    return c.rowcount
+
+
+@traced("db")
+def refresh_search_index(conn=None):
+    """
+    Rebuild the search documents of clients changed since the last refresh.
+    Writers pass their open connection and call this before committing, so
+    the index changes in the same transaction as the data.
+    Returns the number of client documents rebuilt.
+    """
+    if not fts_available(conn):
+        return 0
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    try:
+        rebuilt = _refresh_client_documents(conn.cursor())
+        if own_conn:
+            conn.commit()
+        return rebuilt
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _search_terms(query):
+    """Split a search string the way FTS5's unicode61 tokenizer does."""
+    return re.findall(r"\w+", (query or "").lower())[:SEARCH_MAX_TERMS]
+
+
+def _fts_search(c, table, terms, limit):
+    """
+    Rowids whose document contains every term as a word prefix. Result sets
+    up to SEARCH_RANK_LIMIT are ordered by bm25, larger ones by rowid.
+    """
+    match = " ".join(f'"{t}"*' for t in terms)
+    c.execute(f"SELECT rowid FROM {table} WHERE {table} MATCH ? LIMIT ?", (match, SEARCH_RANK_LIMIT + 1))
+    ids = [r[0] for r in c.fetchall()]
+    if len(ids) > SEARCH_RANK_LIMIT:
+        return ids[:limit]
+    c.execute(f"SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY rank LIMIT ?", (match, limit))
+    return [r[0] for r in c.fetchall()]
+
+
+@traced("db")
+def search_clients(query, limit=200):
+    """
+    Client IDs matching every word of query (as a word prefix) in the
+    client's matterid, name or any variable value, best match first.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    use_fts = fts_available()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    try:
+        if use_fts:
+            return _fts_search(c, CLIENT_SEARCH_TABLE, terms, limit)
+        per_term = (
+            "SELECT entity_id FROM variables WHERE entity_type = 'client' AND var_value LIKE ? "
+            "UNION SELECT id FROM clients WHERE matterid LIKE ? OR first_name LIKE ? OR last_name LIKE ?"
+        )
+        sql = " INTERSECT ".join(f"SELECT * FROM ({per_term})" for _ in terms) + " ORDER BY 1 LIMIT ?"
+        c.execute(sql, [p for t in terms for p in [f"%{t}%"] * 4] + [limit])
+        return [r[0] for r in c.fetchall()]
+    finally:
+        conn.close()
+
+
+@traced("db")
+def search_opposing_counsel(query, limit=200):
+    """Opposing counsel IDs matching every word of query (name, firm, email, bar number, ...)."""
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    use_fts = fts_available()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    try:
+        if use_fts:
+            return _fts_search(c, COUNSEL_SEARCH_TABLE, terms, limit)
+        document = _COUNSEL_DOCUMENT.format("opposing_counsel")
+        sql = " INTERSECT ".join(
+            f"SELECT id FROM opposing_counsel WHERE {document} LIKE ?" for _ in terms
+        ) + " ORDER BY 1 LIMIT ?"
+        c.execute(sql, [f"%{t}%" for t in terms] + [limit])
+        return [r[0] for r in c.fetchall()]
+    finally:
+        conn.close()
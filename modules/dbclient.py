@@ -0,0 +1,206 @@
+# modules/dbclient.py
+"""
+Client side of the optional server mode (see modules/server.py).
+
+RemoteDB calls the server's operations as if they were local functions:
+
+    remote = RemoteDB("http://127.0.0.1:8765")
+    remote.list_clients()
+    remote.set_variable("client", 12, "venue", "Garfield County")
+    remote.generate("complaint.docx", 12, download_to="output_documents")
+
+install() swaps the functions in modules.db for remote calls, so the Tk UI
+(which imports them from modules.db) talks to the server without other
+changes. It must run before the UI modules are imported; modules.main calls
+install_from_env(), which connects when DOCGEN_SERVER is set.
+
+The concat-variable and grammar-rule indexes are still cached locally, but
+other desktops write those tables too: the cached copy is checked against
+the server's revision of its table (at most every CACHE_CHECK_SECONDS) and
+fetched again when it has changed.
+"""
+
+import json
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from modules import db
+
+SERVER_ENV = "DOCGEN_SERVER"
+TOKEN_ENV = "DOCGEN_SERVER_TOKEN"
+TOKEN_HEADER = "X-DocGen-Token"
+DEFAULT_TIMEOUT = 30
+# A render reads the cached indexes many times; one revision check covers it
+CACHE_CHECK_SECONDS = 2.0
+
+# JSON turns namedtuples into lists; rebuild the ones callers use by attribute
+_RESULT_TYPES = {
+    "compare_and_set_variables": lambda result: [db.VariableConflict(*c) for c in result],
+}
+
+
+class RemoteError(RuntimeError):
+    """An operation failed on the server (or the server could not be reached)."""
+
+    def __init__(self, message, status=None, error_type=None):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+
+class RemoteDB:
+    def __init__(self, url, token=None, timeout=DEFAULT_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None, target=None):
+        """JSON response of one call, or with target, the response body copied into that file."""
+        data = None if payload is None else json.dumps(payload, default=str).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                if target is None:
+                    return json.loads(response.read())
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(response, f)
+                return target
+        except urllib.error.HTTPError as e:
+            try:
+                body = json.loads(e.read())
+            except ValueError:
+                body = {}
+            raise RemoteError(body.get("error", str(e)), e.code, body.get("type")) from None
+        except urllib.error.URLError as e:
+            raise RemoteError(f"Cannot reach {self.url}: {e.reason}") from None
+
+    def health(self):
+        return self._request("GET", "/api/health")
+
+    def ops(self):
+        return self._request("GET", "/api/ops")
+
+    def revisions(self):
+        return self._request("GET", "/api/revisions")
+
+    def call(self, op, *args, **kwargs):
+        result = self._request("POST", f"/api/db/{op}", {"args": list(args), "kwargs": kwargs})["result"]
+        convert = _RESULT_TYPES.get(op)
+        return convert(result) if convert else result
+
+    def generate(self, template, client_id, answers=None, grammar=None, counsel_id=None, download_to=None):
+        """
+        Render a template (name relative to the server's templates/) headless
+        on the server. With download_to (a directory), the document is also
+        fetched there and its local path returned as result["local_output"].
+        """
+        result = self._request("POST", "/api/generate", {
+            "template": template, "client_id": client_id, "answers": answers or {},
+            "grammar": grammar, "counsel_id": counsel_id,
+        })
+        if download_to is not None and result.get("download"):
+            target = Path(download_to) / Path(result["output"]).name
+            result["local_output"] = str(self.download(result["download"], target))
+        return result
+
+    def download(self, download, target):
+        """Save a generated document (the "download" path from generate) as target."""
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return self._request("GET", download, target=target)
+
+    def __getattr__(self, op):
+        if op.startswith("_"):
+            raise AttributeError(op)
+        return lambda *args, **kwargs: self.call(op, *args, **kwargs)
+
+
+class RevisionCheckedCache:
+    """
+    Local copy of a server table (built by load), reused while the server
+    reports the same revision for that table. The revision is checked at
+    most every CACHE_CHECK_SECONDS.
+    """
+
+    def __init__(self, remote, table, load):
+        self.remote = remote
+        self.table = table
+        self.load = load
+        self.invalidate()
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is None or now - self._checked >= CACHE_CHECK_SECONDS:
+            # Read the revision first: a write landing during load only makes the next check refetch
+            revision = self.remote.revisions()[self.table]
+            if self._value is None or revision != self._revision:
+                self._value = self.load()
+                self._revision = revision
+            self._checked = now
+        return self._value
+
+    def invalidate(self):
+        self._value = None
+        self._revision = None
+        self._checked = 0.0
+
+
+def install(url, token=None):
+    """
+    Route every operation the server exposes through RemoteDB by replacing
+    the function of the same name in modules.db. Returns the RemoteDB.
+    """
+    remote = RemoteDB(url, token)
+    ops = remote.ops()
+    for op in ops["read"] + ops["write"]:
+        if hasattr(db, op):
+            setattr(db, op, _remote_function(remote, op, getattr(db, op)))
+    # Other desktops write these tables, so the local indexes are revision-checked
+    concats = RevisionCheckedCache(remote, "concat", lambda: {c["var_name"]: c for c in remote.list_all_concats()})
+    rules = RevisionCheckedCache(remote, "grammar", remote.list_grammar_rules)
+    _replace("get_concat_index", concats.get)
+    _replace("invalidate_concat_cache", concats.invalidate)
+    _replace("get_grammar_rule_index", rules.get)
+    _replace("invalidate_grammar_rule_cache", rules.invalidate)
+    # Schema setup belongs to the server
+    for name in ("create_db", "ensure_variable_meta_columns", "ensure_opposing_counsel_table",
+                 "ensure_concat_table", "ensure_grammar_rules_table", "ensure_search_index"):
+        setattr(db, name, lambda *args, **kwargs: None)
+    return remote
+
+
+def install_from_env():
+    """install() if DOCGEN_SERVER is set; returns the RemoteDB or None."""
+    url = os.environ.get(SERVER_ENV)
+    if not url:
+        return None
+    return install(url, os.environ.get(TOKEN_ENV))
+
+
+def _replace(name, method):
+    def call():
+        return method()
+    call.__name__ = name
+    call.__doc__ = getattr(db, name).__doc__
+    setattr(db, name, call)
+
+
+def _remote_function(remote, op, local):
+    def call(*args, **kwargs):
+        result = remote.call(op, *args, **kwargs)
+        # Local caches built from these calls must not outlive a remote write
+        if op in ("set_concat_variable", "delete_concat_variable"):
+            db.invalidate_concat_cache()
+        elif op in ("set_grammar_rule", "delete_grammar_rule"):
+            db.invalidate_grammar_rule_cache()
+        return result
+    call.__name__ = op
+    call.__doc__ = local.__doc__
+    return call
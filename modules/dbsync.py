@@ -2,6 +2,7 @@
 from pathlib import Path
 import openpyxl
 from modules.db import list_all_variable_meta, get_variable_meta
+from modules.perf import span
 
 INTAKE_XLSX = "intake.xlsx"
 INTAKE_SHEET = "IntakeSheet"
@@ -21,7 +22,8 @@ def run_startup_sync():
         print(f"Warning: {INTAKE_XLSX} not found; skipping DB sync.")
         return
 
-    wb = openpyxl.load_workbook(INTAKE_XLSX)
+    with span("load_workbook", "excel", file=INTAKE_XLSX):
+        wb = openpyxl.load_workbook(INTAKE_XLSX)
     ws = wb[INTAKE_SHEET] if INTAKE_SHEET in wb.sheetnames else wb.create_sheet(INTAKE_SHEET)
 
     # Clear existing content (except headers)
@@ -8,7 +8,7 @@ from modules.db import (
     set_variable_meta,
     list_clients,
     get_all_variables_for_client,
-    DB_PATH,
+    set_variable,
 )
 
 DEFAULT_SEPARATOR = " "
@@ -221,14 +221,7 @@ def open_derived_variable_wizard(parent):
             return
 
         # Save value to database
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO variables (client_id, var_name, var_value) VALUES (?, ?, ?)",
-            (selected_client_id, new_var_name, value)
-        )
-        conn.commit()
-        conn.close()
+        set_variable("client", selected_client_id, new_var_name, value)
 
         messagebox.showinfo("Success", f"Derived variable '{new_var_name}' created for client.")
         wizard.destroy()
@@ -0,0 +1,67 @@
+# modules/docbuffer.py
+"""
+In-memory .docx buffers for the generation pipeline.
+
+generate_document_from_template reads the template's bytes once into a
+BytesIO; each pass (python-docx or docxtpl) loads from that buffer and saves
+back into it, and only the finished document is written to disk, through a
+temporary name and an atomic rename. A crash or error part-way never leaves
+a half-processed file under the output name, and there are no working
+copies to clean up.
+
+The extract_*/replace_* helpers accept either a path or a buffer; they save
+through save_document() so both work.
+"""
+
+import io
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def load_buffer(path):
+    """BytesIO holding a copy of the file at path."""
+    return io.BytesIO(Path(path).read_bytes())
+
+
+def save_document(doc, target):
+    """doc.save() to a path, or replace the contents of an in-memory buffer."""
+    if hasattr(target, "getvalue"):
+        target.seek(0)
+        target.truncate()
+        doc.save(target)
+        target.seek(0)
+    else:
+        doc.save(target)
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Binary file to write path's new contents into; it is moved into place
+    (os.replace) when the block finishes, and discarded if it raises.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+
+def write_atomic(path, data):
+    """
+    Write bytes to path via a temporary file in the same folder and
+    os.replace(), so readers only ever see the old file or the complete new
+    one. Replacing (rather than rewriting) also leaves any other hard link
+    to the old file untouched.
+    """
+    with atomic_output(path) as f:
+        f.write(data)
+    return Path(path)
@@ -12,13 +12,35 @@ import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
 from pathlib import Path
 from datetime import datetime
+import io
 import re
+from collections import OrderedDict
 import pandas as pd
 from tkinter import simpledialog
-from modules.bracket_variables import extract_bracket_variables, replace_bracket_variables
-from modules.grammar import extract_grammar_variables, replace_grammar_variables, prompt_grammar_settings
+from modules.bracket_variables import (
+    BRACKET_RE, bracket_replacements, extract_bracket_variables, replace_bracket_variables,
+)
+from modules.grammar import (
+    GRAMMAR_TOKEN_RE,
+    extract_grammar_variables,
+    replace_grammar_variables,
+    prompt_grammar_settings,
+    get_grammar_settings,
+    grammar_settings_from_client,
+    clear_grammar_defaults,
+)
+from modules.template_cache import file_digest, get_undeclared_variables, render_template
+from modules import docmerge, pdfexport, rendercache, streamrender, zipbundle
+from modules.modifiers import parse_placeholder, parse_placeholders, apply_transforms
+from modules.perf import span, stage, traced
+from modules.clientpicker import pick_client
+from modules.jobqueue import (
+    create_batch, work, batch_status, list_batches, resume_batch, batch_grammar_override, queue_stale_outputs,
+    list_outputs,
+)
 from docxtpl import DocxTemplate
 from docx import Document
+from modules.docbuffer import atomic_output, load_buffer, save_document, write_atomic
 from modules.db import (
     DB_PATH,
     list_clients,
@@ -27,8 +49,9 @@ from modules.db import (
     get_variable_value_for_client,
     variable_exists,
     set_variable_meta,
-    list_all_concats,
-    get_all_variables_for_client
+    get_concat_index,
+    get_all_variables_for_client,
+    get_grammar_rule_index,
 )
 
 # Try to import improved version first, fall back to original
@@ -154,23 +177,22 @@ def prompt_for_variable(parent, var_name, client_id, all_client_vars, allow_canc
 # VARIABLE TYPE 3: CONCATENATED & DERIVED VARIABLES
 # =============================================================================
 
+def build_concat_value(concat, all_client_vars):
+    """Join a concat definition's component values with its separator."""
+    sep = concat.get("separator", " ")
+    return sep.join(str(all_client_vars.get(comp, "")) for comp in concat["components"])
+
+
 def handle_concatenated_variable(parent, var_name, client_id, all_client_vars):
     """
     Handles concatenated variables (combinations of other variables).
     Opens GUI with pre-filled variable name if not already defined.
     """
     # Check if this is already defined as a concat variable
-    concats = {c["var_name"]: c for c in list_all_concats()}
-    
-    if var_name in concats:
-        # Build the value from components
-        comp_list = concats[var_name]["components"]
-        sep = concats[var_name].get("separator", " ")
-        values = []
-        for comp in comp_list:
-            val = all_client_vars.get(comp, "")
-            values.append(str(val))
-        return sep.join(values)
+    concat = get_concat_index().get(var_name)
+    
+    if concat:
+        return build_concat_value(concat, all_client_vars)
     
     # Not defined - ask user to build it
     response = messagebox.askyesno(
@@ -188,16 +210,10 @@ def handle_concatenated_variable(parent, var_name, client_id, all_client_vars):
         if result:
             return result
         
-        # Try again after editor closes
-        concats = {c["var_name"]: c for c in list_all_concats()}
-        if var_name in concats:
-            comp_list = concats[var_name]["components"]
-            sep = concats[var_name].get("separator", " ")
-            values = []
-            for comp in comp_list:
-                val = all_client_vars.get(comp, "")
-                values.append(str(val))
-            return sep.join(values)
+        # Try again after editor closes (saving invalidates the index)
+        concat = get_concat_index().get(var_name)
+        if concat:
+            return build_concat_value(concat, all_client_vars)
     
     # Fallback to manual entry
     return prompt_for_variable(parent, var_name, client_id, all_client_vars)
@@ -289,40 +305,36 @@ def handle_derived_variable(parent, var_name, client_id, all_client_vars):
 def extract_dynamic_variables_from_template(template_path):
     """
     Extracts dynamic variables marked with <<variable_name>> from a template.
-    Returns a set of variable names.
+    Returns a set of Placeholder objects (see modules.modifiers), so
+    <<venue_upper>> comes back as base "venue" with transform "upper".
     """
     doc = Document(template_path)
-    dynamic_vars = set()
+    names = set()
     
     # Pattern to match <<variable>> or <<variable_modifier>>
-    pattern = r'<<([a-zA-Z_][a-zA-Z0-9_]*)(?:_([a-zA-Z]+))?>>'
+    pattern = r'<<([a-zA-Z_][a-zA-Z0-9_]*)>>'
     
     for paragraph in doc.paragraphs:
-        matches = re.findall(pattern, paragraph.text)
-        for var_name, modifier in matches:
-            dynamic_vars.add((var_name, modifier if modifier else None))
+        names.update(re.findall(pattern, paragraph.text))
     
     for table in doc.tables:
         for row in table.rows:
             for cell in row.cells:
                 for paragraph in cell.paragraphs:
-                    matches = re.findall(pattern, paragraph.text)
-                    for var_name, modifier in matches:
-                        dynamic_vars.add((var_name, modifier if modifier else None))
+                    names.update(re.findall(pattern, paragraph.text))
     
-    return dynamic_vars
+    return {parse_placeholder(name, allow_tags=False) for name in names}
 
 
-def prompt_dynamic_variable_from_excel(parent, var_name, client_id, excel_path="dynamicpleadingresponses.xlsx"):
+def load_dynamic_sheet(var_name, excel_path="dynamicpleadingresponses.xlsx"):
     """
-    Prompts user to select value for a dynamic variable from Excel sheet.
-    Column A: Selection options (what user sees)
-    Column B: Output values (what gets inserted)
-    Column C: Instructions/question for user
-    Column D1: "TRUE" if single-use, "FALSE" for multi-entry numbered list
+    Reads the options for a dynamic variable from its Excel sheet.
+    Returns (options, is_single_use, use_numbered_list), or None if the
+    sheet is missing or has no usable rows. options is [(display, output)].
     """
     try:
-        df = pd.read_excel(excel_path, sheet_name=var_name)
+        with span("read_excel", "excel", file=excel_path, sheet=var_name):
+            df = pd.read_excel(excel_path, sheet_name=var_name)
     except Exception as e:
         return None
     
@@ -369,6 +381,22 @@ def prompt_dynamic_variable_from_excel(parent, var_name, client_id, excel_path="
     if not options:
         return None
     
+    return options, is_single_use, use_numbered_list
+
+
+def prompt_dynamic_variable_from_excel(parent, var_name, client_id, excel_path="dynamicpleadingresponses.xlsx"):
+    """
+    Prompts user to select value for a dynamic variable from Excel sheet.
+    Column A: Selection options (what user sees)
+    Column B: Output values (what gets inserted)
+    Column C: Instructions/question for user
+    Column D1: "TRUE" if single-use, "FALSE" for multi-entry numbered list
+    """
+    sheet = load_dynamic_sheet(var_name, excel_path)
+    if sheet is None:
+        return None
+    options, is_single_use, use_numbered_list = sheet
+    
     # ========================================================================
     # FALSE = MULTI-ENTRY NUMBERED LIST (Loop until "This is last paragraph")
     # ========================================================================
@@ -719,61 +747,41 @@ def prompt_dynamic_variable_from_excel(parent, var_name, client_id, excel_path="
 def replace_dynamic_variables_in_document(doc_path, replacements):
     """
     Replaces <<variable>> and <<variable_modifier>> in a Word document.
+    replacements maps the full token ("venue_upper") to its base value and
+    the transforms to apply.
     Preserves formatting. Handles numbered list format for FALSE variables.
     """
-    from docx.shared import Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    
     doc = Document(doc_path)
+    numbering = []  # streamrender.ListNumbering, created for the first list
+    
+    def list_numbering():
+        if not numbering:
+            numbering.append(streamrender.ListNumbering(streamrender.document_numbering(doc)))
+        return numbering[0]
     
     def replace_in_paragraph(paragraph, replacements):
         """Replace variables in a paragraph while preserving formatting"""
-        for var_name, var_data in replacements.items():
-            value = var_data["value"]
-            modifier = var_data.get("modifier")
+        for token, var_data in replacements.items():
+            value = apply_transforms(var_data["value"], var_data.get("transforms", ()))
             use_numbered_list = var_data.get("use_numbered_list", False)
             
-            # Apply modifiers
-            if modifier == "upper":
-                value = value.upper()
-            elif modifier == "lower":
-                value = value.lower()
-            elif modifier == "title":
-                value = value.title()
-            
             # Create pattern for this variable
-            if modifier:
-                pattern = f"<<{var_name}_{modifier}>>"
-            else:
-                pattern = f"<<{var_name}>>"
+            pattern = f"<<{token}>>"
             
             # Replace in paragraph
             if pattern in paragraph.text:
                 if use_numbered_list and "\n" in value:
-                    # This is a numbered list - need special handling
-                    # Replace the pattern with first item, then add remaining as new paragraphs
-                    items = value.split("\n")
-                    
-                    # Replace pattern with first item
-                    for run in paragraph.runs:
-                        if pattern in run.text:
-                            run.text = run.text.replace(pattern, items[0])
-                    
-                    # Set paragraph formatting for numbered list
-                    paragraph.paragraph_format.left_indent = Inches(0.5)
-                    paragraph.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.LEFT
-                    
-                    # Add remaining items as new paragraphs after this one
-                    if len(items) > 1:
-                        # Insert new paragraphs after current one
-                        parent = paragraph._element.getparent()
-                        for item in items[1:]:
-                            new_p = parent.makeelement('w:p', nsmap=paragraph._element.nsmap)
-                            parent.insert(parent.index(paragraph._element) + 1, new_p)
-                            new_paragraph = type(paragraph)(new_p, paragraph._parent)
-                            new_paragraph.add_run(item)
-                            new_paragraph.paragraph_format.left_indent = Inches(0.5)
-                            new_paragraph.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                    # This is a numbered list: the first item replaces the pattern and
+                    # the paragraph becomes a new Word list (w:numPr); the remaining
+                    # items are built as w:p elements and spliced in after it, in
+                    # order, with one addnext chain (see modules.streamrender)
+                    anchor = paragraph._element
+                    new_paragraphs = list(streamrender.expand_paragraph(
+                        anchor, {token: streamrender.list_items(value)}, list_numbering()
+                    ))
+                    for new_p in new_paragraphs:
+                        anchor.addnext(new_p)
+                        anchor = new_p
                 else:
                     # Simple replacement - preserves most formatting
                     for run in paragraph.runs:
@@ -798,7 +806,7 @@ def replace_dynamic_variables_in_document(doc_path, replacements):
         for paragraph in section.footer.paragraphs:
             replace_in_paragraph(paragraph, replacements)
     
-    doc.save(doc_path)
+    save_document(doc, doc_path)
 
 
 # =============================================================================
@@ -839,7 +847,7 @@ def extract_opposing_counsel_variables(template_path):
 
 def select_opposing_counsel_by_id(parent):
     """Let user select an opposing counsel from the database - returns ID"""
-    from modules.db import list_opposing_counsel
+    from modules.db import list_opposing_counsel, search_opposing_counsel
     
     attorneys = list_opposing_counsel()
     if not attorneys:
@@ -882,10 +890,17 @@ def select_opposing_counsel_by_id(parent):
         for widget in frame.winfo_children():
             widget.destroy()
         
-        term = search_var.get().lower()
+        term = search_var.get().strip()
         match_count = 0
         
-        for row in attorneys:
+        # Search name, firm, email, bar number, ... via the full-text index, best match first
+        if term:
+            by_id = {row[0]: row for row in attorneys}
+            rows = [by_id[i] for i in search_opposing_counsel(term, limit=len(attorneys)) if i in by_id]
+        else:
+            rows = attorneys
+        
+        for row in rows:
             counsel_id = row[0]
             first_name = row[1] or ""
             last_name = row[2] or ""
@@ -895,9 +910,6 @@ def select_opposing_counsel_by_id(parent):
             if firm:
                 label += f" ({firm})"
             
-            if term and term not in label.lower():
-                continue
-            
             match_count += 1
             
             rb = tk.Radiobutton(
@@ -942,8 +954,7 @@ def replace_opposing_counsel_variables(doc_path, counsel_data, counsel_id, paren
     Prompts for missing fields and saves them to the database.
     Works exactly like {{}} variables - if not found, prompt and save.
     """
-    from modules.db import update_opposing_counsel, get_opposing_counsel, DB_PATH
-    import sqlite3
+    from modules.db import update_opposing_counsel, get_opposing_counsel
     from tkinter import simpledialog
     from docx import Document
     import re
@@ -1111,7 +1122,7 @@ def replace_opposing_counsel_variables(doc_path, counsel_data, counsel_id, paren
         for paragraph in section.footer.paragraphs:
             replace_in_paragraph(paragraph)
     
-    doc.save(doc_path)
+    save_document(doc, doc_path)
 
 
 # =============================================================================
@@ -1210,7 +1221,7 @@ def replace_document_specific_variables(doc_path, doc_vars_data):
         for paragraph in section.footer.paragraphs:
             replace_in_paragraph(paragraph)
     
-    doc.save(doc_path)
+    save_document(doc, doc_path)
 
 
 
@@ -1223,96 +1234,10 @@ def replace_document_specific_variables(doc_path, doc_vars_data):
 # CLIENT SELECTION HELPERS
 # =============================================================================
 
-def build_client_label(client_id):
-    """Build a descriptive label for a client"""
-    vars_ = get_variables("client", client_id)
-    parts = []
-    
-    # Add matter ID if exists
-    if vars_.get("matterid"):
-        parts.append(f"Matter: {vars_.get('matterid')}")
-    
-    # Add name if exists
-    fname = vars_.get("firstname", "")
-    lname = vars_.get("lastname", "")
-    if fname or lname:
-        parts.append(f"{fname} {lname}".strip())
-    
-    label = f"ID {client_id}"
-    if parts:
-        label += " | " + " | ".join(parts)
-    
-    return label
-
-
 def select_client(clients):
     """Display client selection dialog"""
-    selected_id = tk.IntVar(value=-1)
-    
-    popup = tk.Toplevel()
-    popup.title("Select Client")
-    popup.geometry("800x600")
-    popup.grab_set()
-    
-    tk.Label(popup, text="Select a client:", font=("Arial", 12, "bold")).pack(pady=10)
-    
-    # Search functionality
-    search_frame = tk.Frame(popup)
-    search_frame.pack(fill="x", padx=10, pady=5)
-    search_var = tk.StringVar()
-    tk.Label(search_frame, text="Search:").pack(side="left", padx=5)
-    tk.Entry(search_frame, textvariable=search_var, width=60).pack(side="left", fill="x", expand=True, padx=5)
-    
-    # Scrollable frame for clients
-    canvas = tk.Canvas(popup)
-    scrollbar = tk.Scrollbar(popup, orient="vertical", command=canvas.yview)
-    frame = tk.Frame(canvas)
-    
-    frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-    canvas.create_window((0, 0), window=frame, anchor="nw")
-    canvas.configure(yscrollcommand=scrollbar.set)
-    
-    def refresh(*_):
-        """Refresh client list based on search"""
-        for w in frame.winfo_children():
-            w.destroy()
-        
-        term = search_var.get().lower()
-        match_count = 0
-        
-        for cid, *_ in clients:
-            label = build_client_label(cid)
-            if term in label.lower():
-                tk.Radiobutton(
-                    frame,
-                    text=label,
-                    variable=selected_id,
-                    value=cid,
-                    wraplength=750,
-                    anchor="w",
-                    justify="left"
-                ).pack(anchor="w", padx=10, pady=2, fill="x")
-                match_count += 1
-        
-        if match_count == 0:
-            tk.Label(frame, text="No matching clients found", fg="gray").pack(padx=10, pady=20)
-    
-    search_var.trace_add("write", refresh)
-    refresh()
-    
-    canvas.pack(side="left", fill="both", expand=True, padx=10)
-    scrollbar.pack(side="right", fill="y")
-    
-    def submit():
-        if selected_id.get() == -1:
-            messagebox.showwarning("No Selection", "Please select a client.")
-            return
-        popup.destroy()
-    
-    tk.Button(popup, text="Select Client", command=submit, width=15).pack(pady=10)
-    
-    popup.wait_window()
-    return selected_id.get() if selected_id.get() != -1 else None
+    client_id, _ = pick_client(clients, prompt="Select a client:")
+    return client_id
 
 
 def select_all_clients_option(clients):
@@ -1441,260 +1366,385 @@ def select_templates(templates_dir="templates"):
     return result["templates"]
 
 
+# =============================================================================
+# OUTPUT REUSE AND STALE DOCUMENTS
+# =============================================================================
+# See modules/rendercache.py. The fingerprint is taken after {{}} values are
+# resolved and covers everything the later steps would read, so a match
+# means the existing file is exactly what this render would produce. After
+# every render the variables it read are recorded for stale detection.
+
+_TOKEN_PATTERNS = {
+    "counsel": re.compile(r'\(\(([a-zA-Z_][a-zA-Z0-9_]*)\)\)'),
+    "grammar": GRAMMAR_TOKEN_RE,
+    "docvars": re.compile(r'\{@([a-zA-Z_][a-zA-Z0-9_]*)@\}'),
+    "bracket": BRACKET_RE,
+}
+# Token sets of recently fingerprinted templates, keyed by file digest
+DOCUMENT_TOKEN_CACHE_SIZE = 200
+_document_token_cache = OrderedDict()
+
+
+def _find_tokens(text):
+    return {kind: set(pattern.findall(text)) for kind, pattern in _TOKEN_PATTERNS.items()}
+
+
+def document_tokens(doc_path):
+    """{kind: set of names} for the ((counsel)), (@grammar@), {@doc@} and [[bracket]] tokens in a document."""
+    key = file_digest(doc_path)
+    cached = _document_token_cache.get(key)
+    if cached is None:
+        doc = Document(doc_path)
+        paragraphs = list(doc.paragraphs)
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    paragraphs.extend(cell.paragraphs)
+        for section in doc.sections:
+            paragraphs.extend(section.header.paragraphs)
+            paragraphs.extend(section.footer.paragraphs)
+        cached = _document_token_cache[key] = _find_tokens("\n".join(p.text for p in paragraphs))
+        if len(_document_token_cache) > DOCUMENT_TOKEN_CACHE_SIZE:
+            _document_token_cache.popitem(last=False)
+    else:
+        _document_token_cache.move_to_end(key)
+    return {kind: set(names) for kind, names in cached.items()}
+
+
+def render_fingerprint(template_path, document, client_id, raw_vars, context, replacements,
+                       all_client_vars, grammar_override=None):
+    """
+    Fingerprint of everything a render will consume, or None when its output
+    must not be reused: it has {@document-specific@} values, or a later step
+    would have to prompt (no counsel assigned, missing counsel fields, a
+    singular client with no gender on file).
+    """
+    from modules.db import get_client_counsel_id, get_opposing_counsel_variables
+    
+    used_context = {name: value for name, value in context.items() if name in raw_vars}
+    tokens = document_tokens(document)
+    for kind, names in _find_tokens("\n".join(str(v) for v in used_context.values())).items():
+        tokens[kind] |= names
+    if tokens["docvars"]:
+        return None
+    
+    inputs = {
+        "context": used_context,
+        "dynamic": {token: [data["value"], list(data.get("transforms", ())), data.get("use_numbered_list", False)]
+                    for token, data in replacements.items()},
+    }
+    
+    if tokens["counsel"]:
+        counsel_id = get_client_counsel_id(client_id)
+        if not counsel_id:
+            return None
+        try:
+            counsel = {k.lower(): v for k, v in get_opposing_counsel_variables(int(counsel_id)).items()}
+        except Exception:
+            return None
+        used_counsel = {name.lower(): counsel.get(name.lower()) for name in tokens["counsel"]}
+        if not all(used_counsel.values()):
+            return None
+        inputs["counsel"] = [int(counsel_id), used_counsel]
+        for kind, names in _find_tokens("\n".join(str(v) for v in used_counsel.values())).items():
+            tokens[kind] |= names
+    
+    if tokens["grammar"] or tokens["bracket"]:
+        if grammar_override and grammar_override.get("count"):
+            settings = grammar_override
+        else:
+            settings = grammar_settings_from_client(client_id, all_client_vars)
+            if settings["gender"] is None and tokens["grammar"]:
+                return None
+        inputs["grammar"] = [settings, get_grammar_rule_index()]
+    
+    if tokens["bracket"]:
+        # replace_bracket_variables falls back to these for [[plaintiff]] / [[defendant]]
+        names = tokens["bracket"] | {"clientname", "firstname", "lastname", "defendantname"}
+        inputs["bracket"] = {name: all_client_vars.get(name) for name in sorted(names)}
+    
+    return rendercache.fingerprint(rendercache.file_hash(template_path), inputs)
+
+
+def consumed_counsel_fields(counsel_id, counsel_vars):
+    """{field: value} of the ((counsel)) fields a document filled in, as stored now."""
+    from modules.db import get_opposing_counsel_variables
+    
+    counsel = {k.lower(): v for k, v in get_opposing_counsel_variables(int(counsel_id)).items()}
+    return {name.lower(): counsel.get(name.lower()) for name in counsel_vars}
+
+
 # =============================================================================
 # MAIN DOCUMENT GENERATION LOGIC
 # =============================================================================
-def generate_document_from_template(template_path, client_id, parent_window=None):
+@traced("generation", "generate_document")
+def generate_document_from_template(template_path, client_id, parent_window=None, grammar_override=None,
+                                    output_file=None, bundle=None):
     """
     Generate a document from a template for a specific client.
     Handles all variable types IN PRIORITY ORDER.
+    grammar_override ({"count", "gender"}) replaces the client's stored
+    grammar settings for a whole batch.
+    output_file fixes the output path (queued jobs re-render to the same
+    file); by default a timestamped name in output_documents/ is used. It is
+    written once, atomically, when every step has finished.
+    When an earlier output had exactly the same inputs it is linked to
+    output_file instead of rendering again (see modules.rendercache).
+    With a bundle (modules.zipbundle.ZipBundle) the document is added to
+    that archive under output_file's name and nothing else is written.
+    Each step runs inside a modules.perf stage so benchmarks can time it.
     """
     output_dir = Path("output_documents")
-    output_dir.mkdir(exist_ok=True)
-    
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = output_dir / f"{template_path.stem}_client{client_id}_{timestamp}.docx"
-    
-    import shutil
-    shutil.copy(template_path, output_file)
-    working_copy = output_dir / f"_temp_{template_path.stem}_{timestamp}.docx"
-    shutil.copy(template_path, working_copy)
-    
-    all_client_vars = get_variables("client", client_id)
+    if output_file is None:
+        output_file = output_dir / f"{template_path.stem}_client{client_id}_{timestamp}.docx"
+    output_file = Path(output_file)
+    if bundle is None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+    
+    with stage("scan"):
+        # Every pass works on this in-memory copy; only the finished document
+        # is written to output_file (see modules.docbuffer)
+        document = load_buffer(template_path)
+        
+        replacements = {}
+        # Long numbered lists, expanded only when the output is written
+        streamed_lists = {}
+        item_filter = None
+        fingerprint = None
+        # Remembers every variable this render reads (see rendercache.find_stale_outputs)
+        all_client_vars = rendercache.ConsumedVariables(get_variables("client", client_id))
+        dynamic_vars = extract_dynamic_variables_from_template(document)
     
     # ===================================================================
     # STEP 1: Handle <<angle bracket>> dynamic variables FIRST
     # This ensures venue/Jurisdiction are captured before {{ }} processing
     # ===================================================================
-    dynamic_vars = extract_dynamic_variables_from_template(working_copy)
-    
     if dynamic_vars:
-        replacements = {}
-        prompted_base_vars = set()
-        
-        for var_name, modifier in dynamic_vars:
-            full_key = f"{var_name}_{modifier}" if modifier else var_name
+        with stage("dynamic"):
+            prompted_base_vars = set()
             
-            if full_key in replacements:
-                continue
-            
-            if var_name in prompted_base_vars:
-                if var_name in replacements:
-                    base_value = replacements[var_name]["value"]
-                    modified_value = base_value
-                    if modifier == "upper":
-                        modified_value = base_value.upper()
-                    elif modifier == "lower":
-                        modified_value = base_value.lower()
-                    elif modifier == "title":
-                        modified_value = base_value.title()
-                    
-                    replacements[full_key] = {
-                        "value": modified_value,
-                        "modifier": modifier,
-                        "is_single_use": replacements[var_name].get("is_single_use", False),
-                        "use_numbered_list": replacements[var_name].get("use_numbered_list", False)
-                    }
+            for placeholder in sorted(dynamic_vars, key=lambda p: p.raw):
+                var_name = placeholder.base
+                
+                if placeholder.raw in replacements:
+                    continue
+                
+                # Prompt once per base variable; <<venue>> and <<venue_upper>> share it
+                if var_name not in prompted_base_vars:
+                    prompted_base_vars.add(var_name)
+                    result = prompt_dynamic_variable_from_excel(parent_window, var_name, client_id)
                     
-                    # ONLY store BASE variable in all_client_vars (NOT the modified one)
-                    # all_client_vars[full_key] = modified_value  # REMOVE THIS LINE
-                continue
+                    if result and result["value"]:
+                        replacements[var_name] = {
+                            "value": result["value"],
+                            "transforms": (),
+                            "is_single_use": result.get("is_single_use", False),
+                            "use_numbered_list": result.get("use_numbered_list", False)
+                        }
+                        
+                        # ONLY store BASE variable
+                        set_variable("client", client_id, var_name, result["value"])
+                        all_client_vars[var_name] = result["value"]
+                        all_client_vars.mark([var_name])
+                
+                if var_name in replacements and placeholder.transforms:
+                    replacements[placeholder.raw] = dict(
+                        replacements[var_name], transforms=placeholder.transforms
+                    )
             
-            prompted_base_vars.add(var_name)
-            result = prompt_dynamic_variable_from_excel(parent_window, var_name, client_id)
+            # Long numbered lists keep their <<token>> until the write step, so
+            # the passes in between work on a template-sized document
+            for token, data in replacements.items():
+                value = apply_transforms(data["value"], data.get("transforms", ()))
+                if streamrender.should_stream(data, value):
+                    streamed_lists[token] = streamrender.list_items(value)
             
-            if result and result["value"]:
-                replacements[var_name] = {
-                    "value": result["value"],
-                    "modifier": None,
-                    "is_single_use": result.get("is_single_use", False),
-                    "use_numbered_list": result.get("use_numbered_list", False)
-                }
-                
-                replacements[full_key] = {
-                    "value": result["value"],
-                    "modifier": modifier,
-                    "is_single_use": result.get("is_single_use", False),
-                    "use_numbered_list": result.get("use_numbered_list", False)
-                }
-                
-                # ONLY store BASE variable
-                set_variable("client", client_id, var_name, result["value"])
-                all_client_vars[var_name] = result["value"]
-                # all_client_vars[full_key] = result["value"]  # REMOVE THIS LINE
-        
-        # Replace dynamic variables in WORKING COPY
-        replace_dynamic_variables_in_document(working_copy, replacements)
+            # Replace dynamic variables in the buffer before docxtpl sees it
+            replace_dynamic_variables_in_document(
+                document, {token: data for token, data in replacements.items() if token not in streamed_lists}
+            )
     
     # ===================================================================
     # STEP 2: Handle {{double brace}} variables with docxtpl
     # Now all_client_vars contains the <<>> values too
     # ===================================================================
     try:
-        tpl = DocxTemplate(working_copy)
-        
-        try:
-            raw_vars = tpl.get_undeclared_template_variables()
-        except Exception as e:
-            # ... (keep your existing filter conversion code)
-            error_msg = str(e)
-            if "No filter named" in error_msg or "filter" in error_msg.lower():
-                # ... existing conversion logic ...
-                pass
-        
-        context = {}
-        context.update(get_system_date_context())
-        
-        for placeholder in raw_vars:
-            if placeholder in context:
-                continue
-            
-            # Detect suffixes/modifiers
-            var_name = placeholder
-            modifiers = []
+        with stage("scan"):
+            tpl = DocxTemplate(document)
             
-            if var_name.endswith("_combo"):
-                modifiers.append("combo")
-                var_name = var_name.rsplit("_combo", 1)[0]
-            
-            if var_name.endswith("_derived"):
-                modifiers.append("derived")
-                var_name = var_name.rsplit("_derived", 1)[0]
-            
-            if var_name.endswith("_upper"):
-                modifiers.append("upper")
-                var_name = var_name.rsplit("_upper", 1)[0]
-            
-            if var_name.endswith("_lower"):
-                modifiers.append("lower")
-                var_name = var_name.rsplit("_lower", 1)[0]
-            
-            if var_name.endswith("_title"):
-                modifiers.append("title")
-                var_name = var_name.rsplit("_title", 1)[0]
-            
-            value = all_client_vars.get(var_name)
+            try:
+                # Without <<dynamic>> substitutions the buffer is the template
+                # file's bytes, so the file's path and mtime identify it
+                raw_vars = get_undeclared_variables(tpl, document if dynamic_vars else template_path)
+            except Exception as e:
+                # ... (keep your existing filter conversion code)
+                error_msg = str(e)
+                if "No filter named" in error_msg or "filter" in error_msg.lower():
+                    # ... existing conversion logic ...
+                    pass
+        
+        with stage("resolve"):
+            context = {}
+            context.update(get_system_date_context())
             
-            if value is None or value == "":
-                # FIRST: Check if it's a combo variable
-                if "combo" in modifiers:
-                    concats = {c["var_name"]: c for c in list_all_concats()}
-                    if var_name in concats:
+            for placeholder, parsed in parse_placeholders(raw_vars).items():
+                if placeholder in context:
+                    continue
+                
+                # Suffixes (_combo, _derived, _upper, ...) come from modules.modifiers
+                var_name = parsed.base
+                
+                value = all_client_vars.get(var_name)
+                
+                if value is None or value == "":
+                    # FIRST: Check if it's a combo variable
+                    # (opens the editor if not defined yet)
+                    if "combo" in parsed.tags:
                         value = handle_concatenated_variable(parent_window, var_name, client_id, all_client_vars)
+                    # SECOND: Check if it's defined as a concat variable (without tag)
+                    elif var_name in get_concat_index():
+                        value = build_concat_value(get_concat_index()[var_name], all_client_vars)
+                    # THIRD: Check if it's a derived/grammatical variable
+                    elif "derived" in parsed.tags:
+                        value = handle_derived_variable(parent_window, var_name, client_id, all_client_vars)
+                    # LAST: Prompt user for value
                     else:
-                        # Not defined yet - open editor
-                        value = handle_concatenated_variable(parent_window, var_name, client_id, all_client_vars)
-                # SECOND: Check if it's defined as a concat variable (without tag)
-                elif var_name in {c["var_name"]: c for c in list_all_concats()}:
-                    value = handle_concatenated_variable(parent_window, var_name, client_id, all_client_vars)
-                # THIRD: Check if it's a derived/grammatical variable
-                elif "derived" in modifiers:
-                    value = handle_derived_variable(parent_window, var_name, client_id, all_client_vars)
-                # LAST: Prompt user for value
-                else:
-                    value = prompt_for_variable(parent_window, var_name, client_id, all_client_vars)
-                    all_client_vars[var_name] = value
-            
-            if value:
-                if "upper" in modifiers:
-                    value = str(value).upper()
-                elif "lower" in modifiers:
-                    value = str(value).lower()
-                elif "title" in modifiers:
-                    value = str(value).title()
-            
-            context[placeholder] = value if value else ""
+                        value = prompt_for_variable(parent_window, var_name, client_id, all_client_vars)
+                        all_client_vars[var_name] = value
+                
+                value = apply_transforms(value, parsed.transforms)
+                
+                context[placeholder] = value if value else ""
         
-        tpl.render(context)
-        tpl.save(output_file)
+        if rendercache.is_enabled():
+            with stage("reuse"):
+                fingerprint = render_fingerprint(template_path, document, client_id, raw_vars, context,
+                                                 replacements, all_client_vars, grammar_override)
+                previous = fingerprint and rendercache.find_output(fingerprint)
+                if previous and bundle is not None:
+                    bundle.add(output_file.name, previous, client_id, template_path)
+                    return str(output_file)
+                if previous:
+                    rendercache.link_output(previous, output_file)
+                    rendercache.record_output(fingerprint, output_file, template_path,
+                                              rendercache.file_hash(template_path), client_id)
+                    rendercache.copy_inputs(previous, output_file, template_path, client_id,
+                                            all_client_vars, grammar_override)
+                    return str(output_file)
         
-        if working_copy.exists():
-            working_copy.unlink()
+        with stage("docxtpl"):
+            render_template(tpl, context)
+        with stage("save"):
+            document = io.BytesIO()
+            tpl.save(document)
+            document.seek(0)
         
     except Exception as e:
-        if working_copy.exists():
-            working_copy.unlink()
         messagebox.showerror("Document Generation Error", f"Failed: {e}", parent=parent_window)
         return None
     
     # Step 3: Handle ((double parenthesis)) opposing counsel variables
-    counsel_vars = extract_opposing_counsel_variables(output_file)
-    
-    if counsel_vars:
-        from modules.db import get_opposing_counsel_variables, DB_PATH
-        import sqlite3
-        
-        # Read opposing_counsel_id DIRECTLY from clients table
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT opposing_counsel_id FROM clients WHERE id = ?", (client_id,))
-        row = c.fetchone()
-        conn.close()
+    with stage("counsel"):
+        counsel_vars = extract_opposing_counsel_variables(document)
+        used_counsel = None
         
-        assigned_counsel_id = row[0] if row and row[0] else None
-        
-        if assigned_counsel_id:
-            try:
-                counsel_data = get_opposing_counsel_variables(int(assigned_counsel_id))
-                replace_opposing_counsel_variables(output_file, counsel_data, int(assigned_counsel_id), parent_window)  # PASS counsel_id
-            except Exception as e:
-                messagebox.showwarning("Attorney Error", f"Could not load attorney.\n\n{e}", parent=parent_window)
+        if counsel_vars:
+            from modules.db import get_opposing_counsel_variables, get_client_counsel_id, set_client_counsel_id
+            
+            assigned_counsel_id = get_client_counsel_id(client_id)
+            
+            if assigned_counsel_id:
+                try:
+                    counsel_data = get_opposing_counsel_variables(int(assigned_counsel_id))
+                    replace_opposing_counsel_variables(document, counsel_data, int(assigned_counsel_id), parent_window)  # PASS counsel_id
+                    used_counsel = int(assigned_counsel_id)
+                except Exception as e:
+                    messagebox.showwarning("Attorney Error", f"Could not load attorney.\n\n{e}", parent=parent_window)
+                    counsel_id = select_opposing_counsel_by_id(parent_window)
+                    if counsel_id:
+                        counsel_data = get_opposing_counsel_variables(counsel_id)
+                        replace_opposing_counsel_variables(document, counsel_data, counsel_id, parent_window)  # PASS counsel_id
+                        used_counsel = counsel_id
+            else:
+                messagebox.showinfo("Attorney Required", "Please select an attorney.", parent=parent_window)
                 counsel_id = select_opposing_counsel_by_id(parent_window)
                 if counsel_id:
                     counsel_data = get_opposing_counsel_variables(counsel_id)
-                    replace_opposing_counsel_variables(output_file, counsel_data, counsel_id, parent_window)  # PASS counsel_id
-        else:
-            messagebox.showinfo("Attorney Required", "Please select an attorney.", parent=parent_window)
-            counsel_id = select_opposing_counsel_by_id(parent_window)
-            if counsel_id:
-                counsel_data = get_opposing_counsel_variables(counsel_id)
-                replace_opposing_counsel_variables(output_file, counsel_data, counsel_id, parent_window)  # PASS counsel_id
-                # Save assignment
-                conn = sqlite3.connect(DB_PATH)
-                c = conn.cursor()
-                c.execute("UPDATE clients SET opposing_counsel_id = ? WHERE id = ?", (counsel_id, client_id))
-                conn.commit()
-                conn.close()
-
-
+                    replace_opposing_counsel_variables(document, counsel_data, counsel_id, parent_window)  # PASS counsel_id
+                    # Save assignment
+                    set_client_counsel_id(client_id, counsel_id)
+                    used_counsel = counsel_id
 
     # Step 3.5: Handle (@grammar@) variables
-    grammar_vars = extract_grammar_variables(output_file)
-    
-    if grammar_vars:
-        grammar_settings = prompt_grammar_settings(parent_window)
-        if grammar_settings["count"]:
-            replace_grammar_variables(output_file, grammar_settings)
-
-
-
+    # Settings come from the client record; the dialog only appears when a
+    # singular client has no gender on file, once per client per batch.
+    with stage("grammar"):
+        grammar_vars = extract_grammar_variables(document)
+        grammar_settings = None
+        
+        if grammar_vars:
+            grammar_settings = get_grammar_settings(client_id, all_client_vars, parent_window, grammar_override)
+            if grammar_settings["count"]:
+                replace_grammar_variables(document, grammar_settings)
 
     # Step 4: Document-specific variables
-    doc_specific_vars = extract_document_specific_variables(output_file)
-    
-    if doc_specific_vars:
-        doc_vars_data = {}
-        for var_name in doc_specific_vars:
-            value = prompt_document_specific_variable(parent_window, var_name)
-            doc_vars_data[var_name] = value
-        replace_document_specific_variables(output_file, doc_vars_data)
-    
-
-
-        # Step 5: Handle [[bracket]] variables from Excel dynamic content
-    bracket_vars = extract_bracket_variables(output_file)
+    with stage("docvars"):
+        doc_specific_vars = extract_document_specific_variables(document)
+        
+        if doc_specific_vars:
+            doc_vars_data = {}
+            for var_name in doc_specific_vars:
+                value = prompt_document_specific_variable(parent_window, var_name)
+                doc_vars_data[var_name] = value
+            replace_document_specific_variables(document, doc_vars_data)
+
+    # Step 5: Handle [[bracket]] variables from Excel dynamic content
+    with stage("bracket"):
+        bracket_vars = extract_bracket_variables(document)
+        
+        # Lookups go through all_client_vars, so the [[plaintiff]] / [[defendant]]
+        # fallbacks are recorded as inputs too
+        if bracket_vars:
+            replace_bracket_variables(document, client_id, grammar_settings or grammar_override, all_client_vars)
+            all_client_vars.mark(bracket_vars)
+        
+        # [[names]] in the items of lists expanded at write time
+        list_bracket_vars = {
+            name for items in streamed_lists.values() for item in items for name in BRACKET_RE.findall(item)
+        }
+        if list_bracket_vars:
+            brackets = bracket_replacements(client_id, grammar_settings or grammar_override, all_client_vars)
+            item_filter = lambda text: BRACKET_RE.sub(lambda m: brackets[m.group(1)], text)
+            all_client_vars.mark(list_bracket_vars)
+            bracket_vars |= list_bracket_vars
+    
+    with stage("write"):
+        if bundle is not None:
+            if streamed_lists:
+                document = streamrender.expand_lists(document, io.BytesIO(), streamed_lists, item_filter)
+            bundle.add(output_file.name, document.getvalue(), client_id, template_path)
+            # Bundled documents are not on disk, so there is nothing to reuse or regenerate
+            return str(output_file)
+        if streamed_lists:
+            # Expanded straight into the output file, one block at a time
+            with atomic_output(output_file) as f:
+                streamrender.expand_lists(document, f, streamed_lists, item_filter)
+        else:
+            write_atomic(output_file, document.getvalue())
     
-    if bracket_vars:
-        replace_bracket_variables(output_file, client_id)
+    if fingerprint:
+        rendercache.record_output(fingerprint, output_file, template_path,
+                                  rendercache.file_hash(template_path), client_id)
+    rendercache.record_inputs(output_file, template_path, client_id, {
+        "client": all_client_vars.consumed(),
+        "counsel": used_counsel and [used_counsel, consumed_counsel_fields(used_counsel, counsel_vars)],
+        "grammar_rules": rendercache.digest(get_grammar_rule_index()) if grammar_vars or bracket_vars else None,
+    }, grammar_override)
     
     return str(output_file)
 
 
-
-
-
-
-
 def generate_documents(client_id=None):
     """
     Main orchestrator function called from GUI.
@@ -1719,53 +1769,203 @@ def generate_documents(client_id=None):
     if not selected_templates:
         return
     
-    # Step 3: Generate documents
+    # Grammar settings: per-client from stored fields, or one override for the batch
+    clear_grammar_defaults()
+    grammar_override = None
+    if len(client_ids) * len(selected_templates) > 1 and any(
+        extract_grammar_variables(t) for t in selected_templates
+    ):
+        use_stored = messagebox.askyesno(
+            "Grammar Settings",
+            "Use each client's stored party count and gender for (@grammar@) wording?\n\n"
+            "Choose 'No' to pick one setting for the whole batch."
+        )
+        if not use_stored:
+            grammar_override = prompt_grammar_settings(None)
+            if not grammar_override["count"]:
+                grammar_override = None
+    
+    # Large batches: optionally write one ZIP archive instead of separate files
+    bundle = len(client_ids) * len(selected_templates) > 1 and messagebox.askyesno(
+        "ZIP Bundle",
+        "Write all documents into a single ZIP archive (with a manifest) instead of separate files?\n\n"
+        "Faster when output_documents is on a network share."
+    )
+    
+    # Optional PDF copies, only offered when LibreOffice is installed
+    export_pdf = not bundle and pdfexport.is_available() and messagebox.askyesno(
+        "PDF Export", "Also save a PDF of each document (for e-filing)?"
+    )
+    
+    # Mass mailings: optionally merge the batch into one printable document
+    combine = not bundle and len(client_ids) * len(selected_templates) > 1 and messagebox.askyesno(
+        "Combine Documents", "Also combine all generated documents into one file (for printing/mailing)?"
+    )
+    
+    # Step 3: Queue one job per document, then work through the queue
+    batch_id = create_batch(client_ids, selected_templates, grammar_override)
+    run_generation_batch(batch_id, grammar_override, export_pdf=export_pdf, combine=combine, bundle=bundle)
+
+
+def export_pdfs(paths, parent=None):
+    """
+    Convert documents to PDF (next to each .docx) with a pool of warm
+    LibreOffice workers, showing progress. Returns (converted, failed) as
+    pdfexport.PdfConverterPool.convert_many does.
+    """
+    import threading
+    
+    paths = list(paths)
+    window = tk.Toplevel(parent)
+    window.title("Converting to PDF")
+    window.geometry("400x150")
+    window.grab_set()
+    tk.Label(window, text="Converting documents to PDF...", font=("Arial", 12)).pack(pady=10)
+    progress_var = tk.StringVar(value=f"0 of {len(paths)}")
+    tk.Label(window, textvariable=progress_var).pack(pady=5)
+    progress_bar = ttk.Progressbar(window, length=300, mode='determinate', maximum=max(len(paths), 1))
+    progress_bar.pack(pady=10)
+    
+    finished = {"count": 0}
+    result = {}
+    
+    def on_done(path, pdf, error):
+        finished["count"] += 1
+    
+    def convert():
+        try:
+            result["value"] = pdfexport.convert_to_pdf(paths, on_done=on_done)
+        except Exception as e:
+            result["value"] = ([], [(path, str(e)) for path in paths])
+    
+    # Conversion runs on a thread; Tk is only touched from this one
+    thread = threading.Thread(target=convert, daemon=True)
+    thread.start()
+    while thread.is_alive():
+        progress_var.set(f"{finished['count']} of {len(paths)}")
+        progress_bar['value'] = finished["count"]
+        window.update()
+        thread.join(0.1)
+    window.destroy()
+    return result["value"]
+
+
+def combine_batch_outputs(batch_id):
+    """
+    Merge every finished document of a batch, in job order, into
+    output_documents/batch<id>_combined.docx. Returns the path, or None if
+    the batch has nothing to merge.
+    """
+    paths = [path for path in list_outputs(batch_id) if Path(path).exists()]
+    if not paths:
+        return None
+    output_file = Path("output_documents") / f"batch{batch_id}_combined.docx"
+    with span("combine", "generation", batch=batch_id, documents=len(paths)):
+        return docmerge.merge_documents(paths, output_file)
+
+
+def run_generation_batch(batch_id, grammar_override=None, parent=None, export_pdf=False, combine=False,
+                         bundle=False):
+    """
+    Render a queued batch's pending jobs with the normal dialogs and a
+    progress window. Cancelling leaves the remaining jobs pending, so the
+    batch can be resumed later. With export_pdf, the documents generated
+    in this run are then converted to PDF; with combine, all of the batch's
+    finished documents are also merged into one file. With bundle, this
+    run's documents go into output_documents/batch<id>.zip instead of
+    separate files (PDF export and combining then do not apply).
+    """
+    status = batch_status(batch_id)
+    total_docs = status.total if status else 0
+    already_done = status.done if status else 0
     generated_files = []
-    total_docs = len(client_ids) * len(selected_templates)
+    failed = []
+    cancelled = {"flag": False}
     
     # Progress tracking
-    progress_window = tk.Toplevel()
+    progress_window = tk.Toplevel(parent)
     progress_window.title("Generating Documents")
-    progress_window.geometry("400x150")
+    progress_window.geometry("400x180")
     progress_window.grab_set()
+    progress_window.protocol("WM_DELETE_WINDOW", lambda: cancelled.update(flag=True))
     
-    tk.Label(progress_window, text="Generating documents...", font=("Arial", 12)).pack(pady=10)
-    progress_var = tk.StringVar(value="0 of " + str(total_docs))
+    tk.Label(progress_window, text=f"Generating documents (batch {batch_id})...", font=("Arial", 12)).pack(pady=10)
+    progress_var = tk.StringVar(value=f"{already_done} of {total_docs}")
     tk.Label(progress_window, textvariable=progress_var).pack(pady=5)
     
     progress_bar = ttk.Progressbar(progress_window, length=300, mode='determinate')
     progress_bar.pack(pady=10)
-    progress_bar['maximum'] = total_docs
+    progress_bar['maximum'] = max(total_docs, 1)
+    progress_bar['value'] = already_done
+    tk.Button(progress_window, text="Cancel", command=lambda: cancelled.update(flag=True)).pack()
+    progress_window.update()
     
-    count = 0
+    archive = zipbundle.ZipBundle(zipbundle.bundle_path_for(batch_id), batch_id) if bundle else None
     
-    for client_id in client_ids:
-        for template in selected_templates:
-            progress_var.set(f"{count + 1} of {total_docs}")
-            progress_bar['value'] = count + 1
-            progress_window.update()
-            
-            try:
-                output_file = generate_document_from_template(template, client_id, progress_window)
-                if output_file:
-                    generated_files.append(output_file)
-            except Exception as e:
-                messagebox.showerror(
-                    "Generation Error",
-                    f"Error generating {template.name} for client {client_id}:\n{e}",
-                    parent=progress_window
-                )
-            
-            count += 1
+    def render(job):
+        try:
+            return generate_document_from_template(
+                Path(job.template), job.client_id, progress_window,
+                grammar_override=grammar_override, output_file=Path(job.output_path), bundle=archive
+            )
+        except Exception as e:
+            messagebox.showerror(
+                "Generation Error",
+                f"Error generating {Path(job.template).name} for client {job.client_id}:\n{e}",
+                parent=progress_window
+            )
+            raise
     
+    def on_job(job, ok):
+        (generated_files if ok else failed).append(job.output_path)
+        count = already_done + len(generated_files)
+        progress_var.set(f"{count} of {total_docs}")
+        progress_bar['value'] = count
+        progress_window.update()
+    
+    def should_stop():
+        progress_window.update()
+        return cancelled["flag"]
+    
+    try:
+        work(batch_id, render=render, should_stop=should_stop, on_job=on_job)
+    finally:
+        # A cancelled run still keeps the documents it finished
+        bundle_file = archive.close() if archive is not None else None
     progress_window.destroy()
     
+    if export_pdf and generated_files and not bundle:
+        converted, pdf_failed = export_pdfs(generated_files, parent)
+        if pdf_failed:
+            messagebox.showwarning(
+                "PDF Export",
+                f"{len(converted)} PDF(s) written, {len(pdf_failed)} failed:\n\n"
+                + "\n".join(f"{Path(path).name}: {error}" for path, error in pdf_failed[:10])
+            )
+    
+    combined_file = None
+    if combine and generated_files and not bundle:
+        try:
+            combined_file = combine_batch_outputs(batch_id)
+        except Exception as e:
+            messagebox.showerror("Combine Documents", f"Could not combine the documents:\n{e}")
+    
     # Show summary
+    remaining = batch_status(batch_id)
+    if remaining and remaining.done < remaining.total:
+        messagebox.showwarning(
+            "Batch Incomplete",
+            f"Batch {batch_id}: {remaining.done} of {remaining.total} document(s) generated"
+            f" ({remaining.failed} failed, {remaining.pending} not started).\n\n"
+            "Use 'Resume Unfinished Batch' to finish it; finished documents are kept."
+        )
     if generated_files:
         messagebox.showinfo(
             "Success",
             f"Successfully generated {len(generated_files)} document(s).\n\n"
             f"Output folder: output_documents/"
+            + (f"\nCombined document: {combined_file.name}" if combined_file else "")
+            + (f"\nZIP archive: {bundle_file.name}" if bundle_file else "")
         )
         
         # Ask if user wants to open output folder
@@ -1780,10 +1980,98 @@ def generate_documents(client_id=None):
                 subprocess.Popen(["open", str(output_dir)])
             else:
                 subprocess.Popen(["xdg-open", str(output_dir)])
-    else:
+    elif not failed:
         messagebox.showwarning("No Documents", "No documents were generated.")
 
 
+def resume_generation_batches(parent=None):
+    """Pick an unfinished batch, requeue its interrupted (and optionally failed) jobs and run it."""
+    batches = list_batches(unfinished_only=True)
+    if not batches:
+        messagebox.showinfo("Resume Batch", "There are no unfinished batches.", parent=parent)
+        return
+    
+    dialog = tk.Toplevel(parent)
+    dialog.title("Resume Unfinished Batch")
+    dialog.geometry("560x360")
+    dialog.grab_set()
+    
+    tk.Label(dialog, text="Select a batch to resume:", font=("Arial", 12, "bold")).pack(pady=10)
+    listbox = tk.Listbox(dialog, width=80, height=12)
+    listbox.pack(fill="both", expand=True, padx=10)
+    for b in batches:
+        listbox.insert("end", f"Batch {b.id} - {b.created_at} - {b.done}/{b.total} done, "
+                              f"{b.pending + b.running} unfinished, {b.failed} failed")
+    listbox.selection_set(0)
+    retry_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(dialog, text="Retry failed documents", variable=retry_var).pack(pady=5)
+    
+    chosen = {"batch": None}
+    
+    def on_resume():
+        selection = listbox.curselection()
+        if selection:
+            chosen["batch"] = batches[selection[0]].id
+            dialog.destroy()
+    
+    btns = tk.Frame(dialog)
+    btns.pack(pady=10)
+    tk.Button(btns, text="Resume", command=on_resume, width=12).pack(side="left", padx=5)
+    tk.Button(btns, text="Cancel", command=dialog.destroy, width=12).pack(side="left", padx=5)
+    dialog.wait_window()
+    
+    if chosen["batch"] is None:
+        return
+    resume_batch(chosen["batch"], retry_failed=retry_var.get())
+    clear_grammar_defaults()
+    run_generation_batch(chosen["batch"], batch_grammar_override(chosen["batch"]), parent)
+
+
+def regenerate_stale_documents(parent=None):
+    """
+    List the documents whose recorded inputs changed since they were
+    generated (see rendercache.find_stale_outputs) and re-render them in
+    place through the generation queue.
+    """
+    stale = rendercache.find_stale_outputs()
+    if not stale:
+        messagebox.showinfo("Regenerate Stale Documents", "All generated documents are up to date.", parent=parent)
+        return
+    
+    dialog = tk.Toplevel(parent)
+    dialog.title("Regenerate Stale Documents")
+    dialog.geometry("700x400")
+    dialog.grab_set()
+    
+    tk.Label(dialog, text=f"{len(stale)} document(s) no longer match their client's data:",
+             font=("Arial", 12, "bold")).pack(pady=10)
+    listbox = tk.Listbox(dialog, width=100, height=14)
+    listbox.pack(fill="both", expand=True, padx=10)
+    for output in stale:
+        listbox.insert("end", f"Client {output.client_id} - {Path(output.output_path).name} - "
+                              f"changed: {', '.join(output.reasons)}")
+    
+    chosen = {"regenerate": False}
+    
+    def on_regenerate():
+        chosen["regenerate"] = True
+        dialog.destroy()
+    
+    btns = tk.Frame(dialog)
+    btns.pack(pady=10)
+    tk.Button(btns, text="Regenerate All", command=on_regenerate, width=14).pack(side="left", padx=5)
+    tk.Button(btns, text="Cancel", command=dialog.destroy, width=14).pack(side="left", padx=5)
+    dialog.wait_window()
+    
+    if not chosen["regenerate"]:
+        return
+    clear_grammar_defaults()
+    # Refresh PDF copies of documents that had one
+    export_pdf = pdfexport.is_available() and any(pdfexport.pdf_path_for(s.output_path).exists() for s in stale)
+    for batch_id in queue_stale_outputs(stale):
+        run_generation_batch(batch_id, batch_grammar_override(batch_id), parent, export_pdf=export_pdf)
+
+
 # =============================================================================
 # ENTRY POINT (called from main.py)
 # =============================================================================
@@ -0,0 +1,612 @@
+# modules/docmerge.py
+"""
+Combine many generated .docx files into one document (mass mailings).
+
+    with DocumentMerger("output_documents/mailing.docx") as merger:
+        for path in paths:
+            merger.add(path)
+
+    python -m modules.docmerge mailing.docx a.docx b.docx ...
+    python -m modules.docmerge mailing.docx --batch 12
+
+The first document is the base: its styles, settings, headers, footers and
+page setup apply to the whole result, and each further document starts on
+a new page. Work is linear in the number of documents:
+
+- body XML is streamed: each document's word/document.xml is parsed on its
+  own, its paragraphs and tables are rewritten and appended to a spool file,
+  and the parse is dropped before the next document is read
+- images and other parts the body refers to are stored once per distinct
+  content (by hash), however many letters use them
+- styles are added only when their id is new (a styles.xml seen before is
+  skipped outright); list definitions (w:abstractNum) are shared by hash,
+  and each document gets its own w:num instances restarted at the list's
+  start value so letter 2's lists don't continue letter 1's numbering
+
+Footnotes, endnotes and comments of the appended documents are not carried
+over (their reference marks are removed), nor are their own headers and
+footers; bookmark and drawing ids are renumbered to stay unique.
+"""
+
+import argparse
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+from copy import deepcopy
+from pathlib import Path
+
+from lxml import etree
+
+from modules.perf import span
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+W14 = "http://schemas.microsoft.com/office/word/2010/wordml"
+WP = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+PKG_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+OFFICE_DOCUMENT_REL = R + "/officeDocument"
+STYLES_REL = R + "/styles"
+NUMBERING_REL = R + "/numbering"
+NUMBERING_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"
+
+_R_ATTR = f"{{{R}}}"
+_DROPPED = {f"{{{W}}}{tag}" for tag in (
+    "footnoteReference", "endnoteReference", "commentReference", "commentRangeStart", "commentRangeEnd",
+)}
+_XMLNS_RE = re.compile(rb'\sxmlns:([A-Za-z0-9_.-]+)="([^"]*)"')
+
+
+def _w(tag):
+    return f"{{{W}}}{tag}"
+
+
+def _rels_name(partname):
+    directory, name = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+class _Package:
+    """Read-only view of a .docx: parts, relationships and content types."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.zip = zipfile.ZipFile(path)
+        self.names = set(self.zip.namelist())
+        self.main = next(
+            (target for _, rel_type, target, _ in self.rels("").values() if rel_type == OFFICE_DOCUMENT_REL),
+            "word/document.xml",
+        )
+        types = etree.fromstring(self.zip.read("[Content_Types].xml"))
+        self.defaults = {e.get("Extension").lower(): e.get("ContentType")
+                         for e in types.iter(f"{{{CONTENT_TYPES}}}Default")}
+        self.overrides = {e.get("PartName").lstrip("/"): e.get("ContentType")
+                          for e in types.iter(f"{{{CONTENT_TYPES}}}Override")}
+
+    def read(self, name):
+        return self.zip.read(name)
+
+    def rels(self, partname):
+        """{rId: (rId, type, target partname or URL, "External" or None)} of a part ("" = package)."""
+        rels_name = _rels_name(partname) if partname else "_rels/.rels"
+        if rels_name not in self.names:
+            return {}
+        base = posixpath.dirname(partname)
+        rels = {}
+        for rel in etree.fromstring(self.zip.read(rels_name)):
+            mode = rel.get("TargetMode")
+            target = rel.get("Target")
+            if mode != "External":
+                target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+            rels[rel.get("Id")] = (rel.get("Id"), rel.get("Type"), target, mode)
+        return rels
+
+    def part_for(self, rel_type, partname=None):
+        partname = self.main if partname is None else partname
+        return next((t for _, kind, t, mode in self.rels(partname).values()
+                     if kind == rel_type and mode != "External" and t in self.names), None)
+
+    def content_type(self, partname):
+        return self.overrides.get(partname) or self.defaults.get(posixpath.splitext(partname)[1][1:].lower())
+
+    def close(self):
+        self.zip.close()
+
+
+class DocumentMerger:
+    """Append documents one at a time; close() (or leaving the with block) writes the result."""
+
+    def __init__(self, output_path, page_breaks=True):
+        self.output_path = Path(output_path)
+        self.page_breaks = page_breaks
+        self.count = 0
+        self._tmp = self.output_path.with_name(f".{self.output_path.name}.{os.getpid()}.tmp")
+        self._spool = None
+        self._zip = None
+        self._base = None
+
+    # --- public ---
+    def add(self, path):
+        with span("merge", "generation", file=Path(path).name):
+            package = _Package(path)
+            try:
+                if self._base is None:
+                    self._start(package)
+                else:
+                    self._append(package)
+            finally:
+                if package is not self._base:
+                    package.close()
+        self.count += 1
+
+    def close(self):
+        if self._zip is None:
+            return None
+        try:
+            self._finish()
+        finally:
+            self._zip.close()
+            self._zip = None
+            self._spool.close()
+            self._base.close()
+        os.replace(self._tmp, self.output_path)
+        return self.output_path
+
+    def abort(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self._spool.close()
+            self._base.close()
+        if self._tmp.exists():
+            self._tmp.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # --- base document ---
+    def _start(self, package):
+        self._base = package
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(self._tmp, "w", zipfile.ZIP_DEFLATED)
+        self._spool = tempfile.TemporaryFile()
+
+        main = package.main
+        self._styles_name = package.part_for(STYLES_REL)
+        self._numbering_name = package.part_for(NUMBERING_REL)
+        self._rels = etree.fromstring(package.read(_rels_name(main)))
+        self._types = etree.fromstring(package.read("[Content_Types].xml"))
+        held = {main, _rels_name(main), "[Content_Types].xml", self._styles_name, self._numbering_name}
+
+        # Everything else of the base goes straight into the output
+        self._used_names = set(package.names)
+        for name in package.zip.namelist():
+            if name not in held:
+                with package.zip.open(name) as src, self._zip.open(name, "w") as dst:
+                    shutil.copyfileobj(src, dst)
+
+        self._rel_ids = {rel.get("Id") for rel in self._rels}
+        self._rel_for = {}
+        self._part_for_hash = {}
+        self._copying = {}
+        self._base_digests = {}
+        self._next_rel = 1
+        self._next_part = 1
+
+        self._styles = etree.fromstring(package.read(self._styles_name)) if self._styles_name else None
+        self._style_ids = {s.get(_w("styleId")) for s in self._styles.iter(_w("style"))} if self._styles is not None else set()
+        self._style_lists = {}
+        self._load_numbering(package.read(self._numbering_name) if self._numbering_name else None)
+
+        self._docpr_id = 0
+        self._bookmark_offset = 0
+
+        root = etree.parse(package.zip.open(main)).getroot()
+        body = root.find(_w("body"))
+        self._namespaces = {prefix: uri.encode() for prefix, uri in root.nsmap.items() if prefix}
+        self._w_prefix = next((p for p, uri in root.nsmap.items() if uri == W and p), "w")
+        children = list(body)
+        sect_pr = children.pop() if children and children[-1].tag == _w("sectPr") else None
+        self._write_body(children, rewrite=None)
+
+        # Head and tail of document.xml around the spooled body
+        for child in list(body):
+            body.remove(child)
+        xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+        marker = f"<{self._w_prefix}:body/>".encode()
+        head, _, tail = xml.partition(marker)
+        self._head = head + f"<{self._w_prefix}:body>".encode()
+        self._tail = (self._serialize(sect_pr) if sect_pr is not None else b"") + \
+            f"</{self._w_prefix}:body>".encode() + tail
+
+    # --- appended documents ---
+    def _append(self, package):
+        if self.page_breaks:
+            p = self._w_prefix
+            self._spool.write(f'<{p}:p><{p}:r><{p}:br {p}:type="page"/></{p}:r></{p}:p>'.encode())
+
+        num_map = self._numbering_mapper(package)
+        style_lists = self._merge_styles(package, num_map)
+        rels = package.rels(package.main)
+        rid_map = {}
+
+        def map_rid(rid):
+            if rid not in rid_map:
+                rel = rels.get(rid)
+                rid_map[rid] = self._add_relationship(package, rel) if rel else rid
+            return rid_map[rid]
+
+        root = etree.parse(package.zip.open(package.main)).getroot()
+        body = root.find(_w("body"))
+        children = list(body)
+        if children and children[-1].tag == _w("sectPr"):
+            children.pop()
+        self._write_body(children, rewrite=(map_rid, num_map, style_lists))
+
+    def _write_body(self, children, rewrite):
+        bookmark_max = -1
+        for child in children:
+            dropped = []
+            for el in child.iter():
+                tag = el.tag
+                if not isinstance(tag, str):
+                    continue
+                if tag == f"{{{WP}}}docPr":
+                    self._docpr_id += 1
+                    el.set("id", str(self._docpr_id))
+                    continue
+                if tag in (_w("bookmarkStart"), _w("bookmarkEnd")):
+                    try:
+                        bookmark_id = int(el.get(_w("id")))
+                    except (TypeError, ValueError):
+                        continue
+                    bookmark_max = max(bookmark_max, bookmark_id)
+                    el.set(_w("id"), str(bookmark_id + self._bookmark_offset))
+                    continue
+                if rewrite is None:
+                    continue
+                map_rid, num_map, style_lists = rewrite
+                if tag in _DROPPED:
+                    dropped.append(el)
+                    continue
+                if tag == _w("pPr") and style_lists:
+                    self._restart_style_list(el, style_lists, num_map)
+                if tag == _w("numId"):
+                    el.set(_w("val"), num_map(el.get(_w("val"))))
+                for key in list(el.attrib):
+                    if key.startswith(_R_ATTR):
+                        el.set(key, map_rid(el.get(key)))
+                    elif key.startswith(f"{{{W14}}}"):
+                        del el.attrib[key]
+            for el in dropped:
+                el.getparent().remove(el)
+            self._spool.write(self._serialize(child))
+        self._bookmark_offset += bookmark_max + 1
+
+    def _serialize(self, element):
+        """Element XML without the namespace declarations document.xml's root already makes."""
+        xml = etree.tostring(element, encoding="UTF-8")
+        end = xml.index(b">")
+        start_tag = _XMLNS_RE.sub(
+            lambda m: b"" if self._namespaces.get(m.group(1).decode()) == m.group(2) else m.group(0),
+            xml[:end],
+        )
+        return start_tag + xml[end:]
+
+    # --- parts and relationships ---
+    def _add_relationship(self, package, rel):
+        _, rel_type, target, mode = rel
+        if mode == "External":
+            key = ("external", rel_type, target)
+        else:
+            if target not in package.names:
+                return rel[0]
+            key = ("part", rel_type, self._copy_part(package, target))
+        rid = self._rel_for.get(key)
+        if rid is None:
+            rid = self._new_rel_id()
+            element = etree.SubElement(self._rels, f"{{{PKG_RELS}}}Relationship")
+            element.set("Id", rid)
+            element.set("Type", rel_type)
+            if mode == "External":
+                element.set("Target", target)
+                element.set("TargetMode", "External")
+            else:
+                element.set("Target", posixpath.relpath(key[2], posixpath.dirname(self._base.main)))
+            self._rel_for[key] = rid
+        return rid
+
+    def _new_rel_id(self):
+        while f"rIdM{self._next_rel}" in self._rel_ids:
+            self._next_rel += 1
+        rid = f"rIdM{self._next_rel}"
+        self._rel_ids.add(rid)
+        return rid
+
+    def _copy_part(self, package, partname):
+        """Store a part (and whatever it refers to) once per distinct content; returns its output name."""
+        data = package.read(partname)
+        digest = hashlib.sha1(data)
+        sub_rels = []
+        copying = self._copying.setdefault(package.path, set())
+        copying.add(partname)
+        for rid, rel_type, target, mode in package.rels(partname).values():
+            if mode != "External" and target in package.names and target not in copying:
+                target = self._copy_part(package, target)
+            sub_rels.append((rid, rel_type, target, mode))
+            digest.update(repr((rid, rel_type, target, mode)).encode())
+        key = (digest.hexdigest(), posixpath.splitext(partname)[1].lower())
+        if key in self._part_for_hash:
+            copying.discard(partname)
+            return self._part_for_hash[key]
+
+        # Most letters reuse the base document's own images
+        if not sub_rels and partname in self._base.names and self._base_digest(partname) == digest.hexdigest():
+            self._part_for_hash[key] = partname
+            copying.discard(partname)
+            return partname
+
+        directory, name = posixpath.split(partname)
+        stem, ext = posixpath.splitext(name)
+        new_name = partname
+        while new_name in self._used_names:
+            new_name = posixpath.join(directory, f"{stem}_m{self._next_part}{ext}")
+            self._next_part += 1
+        self._used_names.add(new_name)
+        self._zip.writestr(new_name, data)
+        if sub_rels:
+            rels = etree.Element(f"{{{PKG_RELS}}}Relationships", nsmap={None: PKG_RELS})
+            for rid, rel_type, target, mode in sub_rels:
+                element = etree.SubElement(rels, f"{{{PKG_RELS}}}Relationship", Id=rid, Type=rel_type)
+                if mode == "External":
+                    element.set("Target", target)
+                    element.set("TargetMode", "External")
+                else:
+                    element.set("Target", posixpath.relpath(target, directory))
+            self._zip.writestr(_rels_name(new_name), etree.tostring(rels, xml_declaration=True,
+                                                                    encoding="UTF-8", standalone=True))
+        self._register_content_type(new_name, package.content_type(partname))
+        self._part_for_hash[key] = new_name
+        copying.discard(partname)
+        return new_name
+
+    def _base_digest(self, partname):
+        if partname not in self._base_digests:
+            self._base_digests[partname] = hashlib.sha1(self._base.read(partname)).hexdigest()
+        return self._base_digests[partname]
+
+    def _register_content_type(self, partname, content_type):
+        if not content_type:
+            return
+        ext = posixpath.splitext(partname)[1][1:].lower()
+        defaults = {e.get("Extension").lower(): e.get("ContentType")
+                    for e in self._types.iter(f"{{{CONTENT_TYPES}}}Default")}
+        if defaults.get(ext) == content_type:
+            return
+        if ext and ext not in defaults and ext not in ("xml", "rels"):
+            etree.SubElement(self._types, f"{{{CONTENT_TYPES}}}Default", Extension=ext, ContentType=content_type)
+            return
+        etree.SubElement(self._types, f"{{{CONTENT_TYPES}}}Override", PartName="/" + partname,
+                         ContentType=content_type)
+
+    # --- styles ---
+    def _merge_styles(self, package, num_map):
+        """
+        Add the document's styles that the base lacks. Returns {style id:
+        (numId, ilvl)} for its list paragraph styles (see _restart_style_list).
+        """
+        name = package.part_for(STYLES_REL)
+        if not name:
+            return {}
+        data = package.read(name)
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in self._style_lists:
+            return self._style_lists[digest]
+        styles = etree.fromstring(data)
+
+        numbered, based_on = {}, {}
+        for style in styles.iter(_w("style")):
+            style_id = style.get(_w("styleId"))
+            parent = style.find(f"{_w('basedOn')}")
+            if parent is not None:
+                based_on[style_id] = parent.get(_w("val"))
+            num_pr = style.find(f"{_w('pPr')}/{_w('numPr')}")
+            if num_pr is not None and num_pr.find(_w("numId")) is not None:
+                ilvl = num_pr.find(_w("ilvl"))
+                numbered[style_id] = (num_pr.find(_w("numId")).get(_w("val")),
+                                      ilvl.get(_w("val")) if ilvl is not None else "0")
+        style_lists = {}
+        for style_id in set(numbered) | set(based_on):
+            seen, current = set(), style_id
+            while current is not None and current not in numbered and current not in seen:
+                seen.add(current)
+                current = based_on.get(current)
+            if current in numbered and numbered[current][0] != "0":
+                style_lists[style_id] = numbered[current]
+        self._style_lists[digest] = style_lists
+
+        if self._styles is not None:
+            for style in styles.iter(_w("style")):
+                style_id = style.get(_w("styleId"))
+                if style_id in self._style_ids:
+                    continue
+                style = deepcopy(style)
+                for num_id in style.iter(_w("numId")):
+                    num_id.set(_w("val"), num_map(num_id.get(_w("val"))))
+                self._styles.append(style)
+                self._style_ids.add(style_id)
+        return style_lists
+
+    _NUM_PR_FOLLOWS = {_w(tag) for tag in ("pStyle", "keepNext", "keepLines", "pageBreakBefore",
+                                           "framePr", "widowControl")}
+
+    def _restart_style_list(self, p_pr, style_lists, num_map):
+        """
+        Paragraphs numbered through their style would continue the previous
+        document's list (the style is shared); give them an explicit numPr
+        pointing at this document's restarted w:num instead.
+        """
+        style = p_pr.find(_w("pStyle"))
+        if style is None or style.get(_w("val")) not in style_lists or p_pr.find(_w("numPr")) is not None:
+            return
+        num_id, ilvl = style_lists[style.get(_w("val"))]
+        num_pr = etree.Element(_w("numPr"))
+        etree.SubElement(num_pr, _w("ilvl")).set(_w("val"), ilvl)
+        etree.SubElement(num_pr, _w("numId")).set(_w("val"), num_id)
+        index = 0
+        for position, child in enumerate(p_pr):
+            if child.tag in self._NUM_PR_FOLLOWS:
+                index = position + 1
+        p_pr.insert(index, num_pr)
+
+    # --- numbering ---
+    def _load_numbering(self, data):
+        self._numbering = etree.fromstring(data) if data else None
+        self._abstract_for_hash = {}
+        self._abstract_maps = {}
+        self._next_abstract = 0
+        self._next_num = 1
+        if self._numbering is None:
+            return
+        for abstract in self._numbering.iter(_w("abstractNum")):
+            abstract_id = int(abstract.get(_w("abstractNumId")))
+            self._abstract_for_hash.setdefault(self._abstract_digest(abstract), str(abstract_id))
+            self._next_abstract = max(self._next_abstract, abstract_id + 1)
+        for num in self._numbering.iter(_w("num")):
+            self._next_num = max(self._next_num, int(num.get(_w("numId"))) + 1)
+
+    @staticmethod
+    def _abstract_digest(abstract):
+        abstract = deepcopy(abstract)
+        abstract.attrib.pop(_w("abstractNumId"), None)
+        for child in list(abstract):
+            if child.tag in (_w("nsid"), _w("tmpl")):
+                abstract.remove(child)
+        return hashlib.sha1(etree.tostring(abstract)).hexdigest()
+
+    def _numbering_mapper(self, package):
+        """numId -> numId for one appended document; w:num instances are created on first use."""
+        name = package.part_for(NUMBERING_REL)
+        if not name:
+            return lambda num_id: num_id
+        data = package.read(name)
+        source = etree.fromstring(data)
+        abstracts = {a.get(_w("abstractNumId")): a for a in source.iter(_w("abstractNum"))}
+        nums = {n.get(_w("numId")): n for n in source.iter(_w("num"))}
+        abstract_map = self._abstract_maps.setdefault(hashlib.sha1(data).hexdigest(), {})
+        mapped = {"0": "0"}
+
+        def map_abstract(abstract_id):
+            if abstract_id not in abstract_map:
+                abstract = abstracts[abstract_id]
+                digest = self._abstract_digest(abstract)
+                if digest not in self._abstract_for_hash:
+                    copy = deepcopy(abstract)
+                    copy.set(_w("abstractNumId"), str(self._next_abstract))
+                    self._next_abstract += 1
+                    self._numbering_root().insert(self._abstract_insert_index(), copy)
+                    self._abstract_for_hash[digest] = copy.get(_w("abstractNumId"))
+                abstract_map[abstract_id] = self._abstract_for_hash[digest]
+            return abstract_map[abstract_id]
+
+        def map_num(num_id):
+            if num_id in mapped:
+                return mapped[num_id]
+            num = nums.get(num_id)
+            abstract_ref = num.find(_w("abstractNumId")) if num is not None else None
+            if abstract_ref is None or abstract_ref.get(_w("val")) not in abstracts:
+                mapped[num_id] = num_id
+                return num_id
+            abstract_id = abstract_ref.get(_w("val"))
+            new_num = etree.SubElement(self._numbering_root(), _w("num"))
+            new_num.set(_w("numId"), str(self._next_num))
+            self._next_num += 1
+            etree.SubElement(new_num, _w("abstractNumId")).set(_w("val"), map_abstract(abstract_id))
+            overridden = set()
+            for override in num.iter(_w("lvlOverride")):
+                new_num.append(deepcopy(override))
+                overridden.add(override.get(_w("ilvl")))
+            # Restart each level so this document's lists begin at their start value
+            for lvl in abstracts[abstract_id].iter(_w("lvl")):
+                start = lvl.find(_w("start"))
+                if start is not None and lvl.get(_w("ilvl")) not in overridden:
+                    override = etree.SubElement(new_num, _w("lvlOverride"))
+                    override.set(_w("ilvl"), lvl.get(_w("ilvl")))
+                    etree.SubElement(override, _w("startOverride")).set(_w("val"), start.get(_w("val")))
+            mapped[num_id] = new_num.get(_w("numId"))
+            return mapped[num_id]
+
+        return map_num
+
+    def _numbering_root(self):
+        if self._numbering is None:
+            self._numbering = etree.Element(_w("numbering"), nsmap={"w": W})
+        return self._numbering
+
+    def _abstract_insert_index(self):
+        # Every w:abstractNum must come before the first w:num
+        for index, child in enumerate(self._numbering):
+            if child.tag == _w("num"):
+                return index
+        return len(self._numbering)
+
+    # --- output ---
+    def _finish(self):
+        main = self._base.main
+        with self._zip.open(main, "w", force_zip64=True) as dst:
+            dst.write(self._head)
+            self._spool.seek(0)
+            shutil.copyfileobj(self._spool, dst)
+            dst.write(self._tail)
+
+        if self._numbering is not None and self._numbering_name is None:
+            self._numbering_name = posixpath.join(posixpath.dirname(main), "numbering.xml")
+            rid = self._new_rel_id()
+            etree.SubElement(self._rels, f"{{{PKG_RELS}}}Relationship", Id=rid, Type=NUMBERING_REL,
+                             Target=posixpath.relpath(self._numbering_name, posixpath.dirname(main)))
+            etree.SubElement(self._types, f"{{{CONTENT_TYPES}}}Override", PartName="/" + self._numbering_name,
+                             ContentType=NUMBERING_CONTENT_TYPE)
+        for name, root in ((self._styles_name, self._styles), (self._numbering_name, self._numbering),
+                           (_rels_name(main), self._rels), ("[Content_Types].xml", self._types)):
+            if name and root is not None:
+                self._zip.writestr(name, etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+
+def merge_documents(paths, output_path, page_breaks=True):
+    """Merge paths (in order) into output_path; returns output_path."""
+    with DocumentMerger(output_path, page_breaks) as merger:
+        for path in paths:
+            merger.add(path)
+    return Path(output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge generated .docx files into one document.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("paths", nargs="*", type=Path, help="documents to append, in order")
+    parser.add_argument("--batch", type=int, help="append the finished documents of this generation batch")
+    parser.add_argument("--no-page-breaks", action="store_true", help="do not start each document on a new page")
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths)
+    if args.batch is not None:
+        from modules.jobqueue import list_outputs
+        paths += [Path(p) for p in list_outputs(args.batch)]
+    if not paths:
+        parser.error("nothing to merge")
+    merge_documents(paths, args.output, page_breaks=not args.no_page_breaks)
+    print(f"Merged {len(paths)} document(s) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
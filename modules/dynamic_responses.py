@@ -5,6 +5,7 @@ import pandas as pd
 import tkinter as tk
 from tkinter import messagebox
 from modules.variable_flags import apply_flags
+from modules.perf import span
 
 DYNAMIC_RESPONSES_FILE = Path("dynamicpleadingresponses.xlsx")
 
@@ -13,7 +14,8 @@ def load_dynamic_responses(sheet_name: str) -> list[tuple[str, str]]:
     if not DYNAMIC_RESPONSES_FILE.exists():
         return []
     try:
-        df = pd.read_excel(DYNAMIC_RESPONSES_FILE, sheet_name=sheet_name, header=0, usecols="A:B")
+        with span("read_excel", "excel", file=DYNAMIC_RESPONSES_FILE, sheet=sheet_name):
+            df = pd.read_excel(DYNAMIC_RESPONSES_FILE, sheet_name=sheet_name, header=0, usecols="A:B")
     except Exception:
         return []
     rows = []
@@ -55,7 +57,8 @@ def resolve_dynamic_blocks(parent, token_names: set[str], client_vars: dict = No
 
         # Load Excel sheet for this block
         try:
-            df = pd.read_excel(DYNAMIC_RESPONSES_FILE, sheet_name=token, header=None)
+            with span("read_excel", "excel", file=DYNAMIC_RESPONSES_FILE, sheet=token):
+                df = pd.read_excel(DYNAMIC_RESPONSES_FILE, sheet_name=token, header=None)
         except Exception:
             messagebox.showwarning(
                 "Missing Dynamic Sheet",
@@ -13,6 +13,7 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 from modules.db import (
     list_all_concats,
+    get_concat_index,
     set_concat_variable,
     delete_concat_variable,
     get_variables,
@@ -414,7 +415,7 @@ def get_or_build_derived_value(var_name, client_id, parent_window):
     Returns the value of a derived/concatenated variable.
     Opens modal if needed.
     """
-    combos = {c["var_name"]: c for c in list_all_concats()}
+    combos = get_concat_index()
     client_vars = get_variables("client", client_id)
 
     if var_name in combos:
@@ -438,7 +439,7 @@ def get_or_build_derived_value(var_name, client_id, parent_window):
             return result
         
         # Otherwise try fetching from database again
-        combos = {c["var_name"]: c for c in list_all_concats()}
+        combos = get_concat_index()
         if var_name in combos:
             comp_list = combos[var_name]["components"]
             sep = combos[var_name].get("separator", " ")
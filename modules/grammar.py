@@ -8,6 +8,8 @@ import tkinter as tk
 from tkinter import messagebox
 import re
 from docx import Document
+from modules.docbuffer import save_document
+from modules.db import get_grammar_rule_index, get_client_grammar_fields, get_variables
 
 # Grammar rules based on client count and gender
 GRAMMAR_RULES = {
@@ -45,6 +47,7 @@ GRAMMAR_RULES = {
     "he_she_they": {
         "singular_male": "he",
         "singular_female": "she",
+        "singular_neutral": "they",
         "plural": "they"
     },
     
@@ -52,6 +55,7 @@ GRAMMAR_RULES = {
     "him_her_them": {
         "singular_male": "him",
         "singular_female": "her",
+        "singular_neutral": "them",
         "plural": "them"
     },
     
@@ -59,6 +63,7 @@ GRAMMAR_RULES = {
     "his_her_their": {
         "singular_male": "his",
         "singular_female": "her",
+        "singular_neutral": "their",
         "plural": "their"
     },
     
@@ -66,6 +71,7 @@ GRAMMAR_RULES = {
     "his_hers_theirs": {
         "singular_male": "his",
         "singular_female": "hers",
+        "singular_neutral": "theirs",
         "plural": "theirs"
     },
     
@@ -73,10 +79,151 @@ GRAMMAR_RULES = {
     "himself_herself_themselves": {
         "singular_male": "himself",
         "singular_female": "herself",
+        "singular_neutral": "themselves",
         "plural": "themselves"
     },
 }
 
+COUNTS = ("singular", "plural")
+GENDERS = ("male", "female", "neutral")
+
+GRAMMAR_TOKEN_RE = re.compile(r'\(@([a-zA-Z_][a-zA-Z0-9_-]*?)@\)')
+
+_GENDER_ALIASES = {
+    "male": "male", "m": "male", "man": "male",
+    "female": "female", "f": "female", "woman": "female",
+    "neutral": "neutral", "n": "neutral", "x": "neutral", "nonbinary": "neutral",
+    "non-binary": "neutral", "other": "neutral", "they": "neutral",
+}
+
+
+def normalize_gender(value, default="male"):
+    """Map stored gender values (M, Female, nonbinary, ...) onto GENDERS."""
+    return _GENDER_ALIASES.get(str(value or "").strip().lower(), default)
+
+
+# =============================================================================
+# PRECOMPUTED RESOLUTION TABLES
+# =============================================================================
+# Every rule is resolved up front for each (count, gender) combination, so
+# substitution is a dict lookup instead of re-inspecting the rule shape for
+# every occurrence. User-defined rules from the grammar_rules DB table are
+# merged in on first use and whenever that table changes.
+
+def resolve_rule(rule, count, gender):
+    """Pick the form of a rule for a count/gender, or None if it has none."""
+    if count == "plural":
+        return rule.get("plural")
+    return rule.get(f"singular_{gender}", rule.get("singular"))
+
+
+def _capitalized_variants(token):
+    first = token[:1].upper() + token[1:]
+    each = "_".join(part[:1].upper() + part[1:] for part in token.split("_"))
+    return {first, each} - {token}
+
+
+def build_grammar_tables(rules):
+    """Return {(count, gender): {token: replacement}} for a rule set."""
+    tables = {}
+    for count in COUNTS:
+        for gender in GENDERS:
+            table = {}
+            for token, rule in rules.items():
+                form = resolve_rule(rule, count, gender)
+                if form is None:
+                    continue
+                table[token] = form
+                # (@He_She_They@) at the start of a sentence -> "He"/"She"/"They"
+                for variant in _capitalized_variants(token):
+                    if variant not in rules:
+                        table[variant] = form[:1].upper() + form[1:]
+            tables[(count, gender)] = table
+    return tables
+
+
+_BUILTIN_TABLES = build_grammar_tables(GRAMMAR_RULES)
+_tables = _BUILTIN_TABLES
+_tables_source = None
+
+
+def get_grammar_table(count, gender):
+    """Flat {token: replacement} table for a count ("singular"/"plural") and gender."""
+    global _tables, _tables_source
+    user_rules = get_grammar_rule_index()
+    if user_rules is not _tables_source:
+        _tables = build_grammar_tables({**GRAMMAR_RULES, **user_rules}) if user_rules else _BUILTIN_TABLES
+        _tables_source = user_rules
+    return _tables[(count, gender if gender in GENDERS else "male")]
+
+
+def substitute_tokens(text, pattern, table):
+    """One regex sweep over text; unknown tokens are left as written."""
+    return pattern.sub(lambda m: table.get(m.group(1), m.group(0)), text)
+
+
+# =============================================================================
+# GRAMMAR SETTINGS FROM THE CLIENT RECORD
+# =============================================================================
+# Count comes from defendant_count and gender from gender, read from the
+# client's variables first and the clients table columns second. The dialog
+# is only needed when a singular client has no usable gender on file, and
+# the answer is remembered for the rest of the batch.
+
+_client_grammar_defaults = {}
+
+
+def grammar_settings_from_client(client_id, client_vars=None):
+    """
+    Build {"count", "gender"} from stored client fields.
+    gender is None when the client is singular and no gender is on file.
+    """
+    if client_vars is None:
+        client_vars = get_variables("client", client_id)
+    row_count, row_gender = get_client_grammar_fields(client_id)
+    
+    count = "singular"
+    raw_count = client_vars.get("defendant_count") or row_count
+    try:
+        if int(raw_count) > 1:
+            count = "plural"
+    except (TypeError, ValueError):
+        pass
+    
+    gender = normalize_gender(client_vars.get("gender") or row_gender, default=None)
+    if gender is None and count == "plural":
+        gender = "neutral"
+    return {"count": count, "gender": gender}
+
+
+def get_grammar_settings(client_id, client_vars=None, parent=None, override=None):
+    """
+    Resolve grammar settings for one client.
+    Order: per-batch override, cached per-client default, stored client
+    fields, and only then the dialog (asked once per client).
+    """
+    if override and override.get("count"):
+        return override
+    if client_id in _client_grammar_defaults:
+        return _client_grammar_defaults[client_id]
+    
+    settings = grammar_settings_from_client(client_id, client_vars)
+    if settings["gender"] is None:
+        settings = prompt_grammar_settings(parent)
+        if not settings["count"]:
+            return settings
+    
+    _client_grammar_defaults[client_id] = settings
+    return settings
+
+
+def clear_grammar_defaults(client_id=None):
+    """Forget cached per-client settings (all clients if client_id is None)."""
+    if client_id is None:
+        _client_grammar_defaults.clear()
+    else:
+        _client_grammar_defaults.pop(client_id, None)
+
 
 def prompt_grammar_settings(parent):
     """
@@ -110,6 +257,7 @@ def prompt_grammar_settings(parent):
     gender_frame.pack(pady=5)
     tk.Radiobutton(gender_frame, text="Male (he/him/his/himself)", variable=gender_var, value="male", font=("Arial", 10)).pack(anchor="w", padx=20)
     tk.Radiobutton(gender_frame, text="Female (she/her/hers/herself)", variable=gender_var, value="female", font=("Arial", 10)).pack(anchor="w", padx=20)
+    tk.Radiobutton(gender_frame, text="Neutral (they/them/their/themselves)", variable=gender_var, value="neutral", font=("Arial", 10)).pack(anchor="w", padx=20)
     
     result = {"count": None, "gender": None}
     
@@ -133,7 +281,7 @@ def extract_grammar_variables(template_path):
     doc = Document(template_path)
     grammar_vars = set()
     
-    pattern = r'\(@([a-zA-Z_][a-zA-Z0-9_-]*?)@\)'
+    pattern = GRAMMAR_TOKEN_RE
     
     for paragraph in doc.paragraphs:
         matches = re.findall(pattern, paragraph.text)
@@ -157,38 +305,15 @@ def replace_grammar_variables(doc_path, grammar_settings):
     """
     doc = Document(doc_path)
     count = grammar_settings["count"]  # "singular" or "plural"
-    gender = grammar_settings["gender"]  # "male" or "female"
-    
-    def get_replacement(var_name):
-        """Get the replacement text for a grammar variable"""
-        if var_name not in GRAMMAR_RULES:
-            return f"(@{var_name}@)"  # Leave unchanged if unknown
-        
-        rule = GRAMMAR_RULES[var_name]
-        
-        # Simple singular/plural rules
-        if "singular" in rule and "plural" in rule:
-            return rule[count]
-        
-        # Gender-dependent pronoun rules
-        if count == "plural":
-            return rule["plural"]
-        else:
-            # Singular - check gender
-            key = f"singular_{gender}"
-            return rule.get(key, rule.get("singular", f"(@{var_name}@)"))
+    gender = grammar_settings["gender"]  # "male", "female" or "neutral"
+    lookup = get_grammar_table(count, gender)
     
     def replace_in_paragraph(paragraph):
-        pattern = r'\(@([a-zA-Z_][a-zA-Z0-9_-]*?)@\)'
-        matches = re.findall(pattern, paragraph.text)
-        
-        for var_name in matches:
-            replacement = get_replacement(var_name)
-            original_pattern = f"(@{var_name}@)"
-            
-            for run in paragraph.runs:
-                if original_pattern in run.text:
-                    run.text = run.text.replace(original_pattern, replacement)
+        if "(@" not in paragraph.text:
+            return
+        for run in paragraph.runs:
+            if "(@" in run.text:
+                run.text = substitute_tokens(run.text, GRAMMAR_TOKEN_RE, lookup)
     
     # Replace in all document parts
     for paragraph in doc.paragraphs:
@@ -206,4 +331,4 @@ def replace_grammar_variables(doc_path, grammar_settings):
         for paragraph in section.footer.paragraphs:
             replace_in_paragraph(paragraph)
     
-    doc.save(doc_path)
\ No newline at end of file
+    save_document(doc, doc_path)
\ No newline at end of file
@@ -0,0 +1,125 @@
+# modules/headless.py
+"""
+Headless document generation.
+
+generate_document_from_template() asks the user for anything it cannot
+resolve from the database (dynamic <<>> selections, missing {{}} values,
+{@doc-specific@} values, grammar settings, attorney fields). Benchmarks and
+other unattended runs wrap generation in headless_prompts(), which swaps
+those dialogs for canned answers and records any message boxes instead of
+showing them:
+
+    with headless_prompts(answers={"venue": "Garfield County"}) as session:
+        generate_document_from_template(template, client_id)
+    session.messages   # [("showerror", title, message), ...]
+
+Unanswered dynamic variables take the first option of their Excel sheet,
+which suits benchmarks; with unanswered="fail" they raise UnansweredPrompt
+instead, so queued jobs never guess a pleading response. Everything else
+falls back to an empty string.
+"""
+
+import threading
+from contextlib import contextmanager
+
+DEFAULT_GRAMMAR = {"count": "singular", "gender": "male"}
+
+# Dialogs are swapped at module level, so only one headless run at a time
+_lock = threading.RLock()
+
+
+class UnansweredPrompt(RuntimeError):
+    """A <<dynamic>> variable needed a choice and none was given (unanswered="fail")."""
+
+
+class HeadlessSession:
+    def __init__(self, answers=None, grammar=None, counsel_id=None, unanswered="first"):
+        self.answers = dict(answers or {})
+        self.grammar = dict(grammar or DEFAULT_GRAMMAR)
+        self.counsel_id = counsel_id
+        self.unanswered = unanswered
+        self.messages = []
+        self.prompted = []
+
+    # --- replacements for docgen dialogs ---
+    def dynamic_variable(self, parent, var_name, client_id, excel_path="dynamicpleadingresponses.xlsx"):
+        from modules.docgen import load_dynamic_sheet
+
+        self.prompted.append(("dynamic", var_name))
+        sheet = load_dynamic_sheet(var_name, excel_path)
+        answer = self.answers.get(var_name)
+        if sheet is None and answer is None:
+            return None
+        options, is_single_use, use_numbered_list = sheet or ([], True, False)
+
+        if answer is None:
+            if self.unanswered == "fail":
+                raise UnansweredPrompt(f"<<{var_name}>> needs a choice and none was recorded")
+            answer = options[0][1]
+        if use_numbered_list:
+            items = list(answer) if isinstance(answer, (list, tuple)) else [answer]
+            return {
+                "value": "\n".join(f"{i+1}. {item}" for i, item in enumerate(items)),
+                "is_single_use": False,
+                "use_numbered_list": True,
+                "selected_items": items,
+            }
+        return {"value": str(answer), "is_single_use": is_single_use, "use_numbered_list": False}
+
+    def variable(self, parent, var_name, client_id=None, all_client_vars=None, allow_cancel=True):
+        self.prompted.append(("variable", var_name))
+        return str(self.answers.get(var_name, ""))
+
+    def document_specific(self, parent, var_name):
+        self.prompted.append(("doc_specific", var_name))
+        return str(self.answers.get(var_name, ""))
+
+    def select_counsel(self, parent):
+        return self.counsel_id
+
+    def grammar_settings(self, parent):
+        return dict(self.grammar)
+
+    # --- message boxes ---
+    def _record(self, kind, default):
+        def show(title=None, message=None, **kwargs):
+            self.messages.append((kind, title, message))
+            return default
+        return show
+
+
+class _MessageBoxStub:
+    """Stands in for tkinter.messagebox: records, never blocks, always declines."""
+
+    def __init__(self, session):
+        self.showinfo = session._record("showinfo", "ok")
+        self.showwarning = session._record("showwarning", "ok")
+        self.showerror = session._record("showerror", "ok")
+        self.askyesno = session._record("askyesno", False)
+        self.askyesnocancel = session._record("askyesnocancel", False)
+        self.askokcancel = session._record("askokcancel", False)
+
+
+@contextmanager
+def headless_prompts(answers=None, grammar=None, counsel_id=None, unanswered="first"):
+    """Run document generation without any dialogs (see module docstring)."""
+    from modules import docgen, grammar as grammar_module
+
+    session = HeadlessSession(answers, grammar, counsel_id, unanswered)
+    patches = [
+        (docgen, "prompt_dynamic_variable_from_excel", session.dynamic_variable),
+        (docgen, "prompt_for_variable", session.variable),
+        (docgen, "prompt_document_specific_variable", session.document_specific),
+        (docgen, "select_opposing_counsel_by_id", session.select_counsel),
+        (docgen, "messagebox", _MessageBoxStub(session)),
+        (grammar_module, "prompt_grammar_settings", session.grammar_settings),
+    ]
+    with _lock:
+        saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        try:
+            for module, name, replacement in patches:
+                setattr(module, name, replacement)
+            yield session
+        finally:
+            for module, name, original in saved:
+                setattr(module, name, original)
@@ -1,7 +1,9 @@
 # modules/intake.py
+from collections import namedtuple
 from pathlib import Path
 import pandas as pd
-from tkinter import messagebox
+import tkinter as tk
+from tkinter import messagebox, filedialog
 import subprocess
 import platform
 
@@ -13,43 +15,21 @@ from modules.db import (
     list_clients,
     get_variable_meta,
     get_variables,
+    list_all_variable_meta,
+    bulk_import_clients,
 )
+from modules.perf import span
+from modules.coercion import coerce_records, coerce_series, format_errors, normalize_type
 
 import openpyxl
 
 INTAKE_FILE = Path("intake.xlsx")
 INTAKE_SHEET = "IntakeSheet"
 
-SUPPORTED_TYPES = {"string", "int", "float", "bool", "date", "iso-date"}
-
 
 # ---------------------------
 # Helpers
 # ---------------------------
-def normalize_type(raw_type):
-    if raw_type is None or pd.isna(raw_type):
-        return "string"
-    t = str(raw_type).strip().lower()
-    return t if t in SUPPORTED_TYPES else "string"
-
-
-def coerce_value(value, var_type):
-    if value is None or pd.isna(value) or value == "":
-        return None
-    if isinstance(value, (dict, list, tuple)):
-        return None
-    try:
-        if var_type == "int":
-            return int(value)
-        if var_type == "float":
-            return float(value)
-        if var_type == "bool":
-            return str(value).strip().lower() in {"1", "true", "yes", "y"}
-        return str(value).strip()
-    except Exception:
-        return None
-
-
 def open_intake_file():
     if platform.system() == "Windows":
         subprocess.run(["start", str(INTAKE_FILE)], shell=True)
@@ -59,31 +39,111 @@ def open_intake_file():
         subprocess.run(["xdg-open", str(INTAKE_FILE)])
 
 
+# ---------------------------
+# Streaming intake reader
+# ---------------------------
+# Column layout of IntakeSheet: A group, B variable, C value, D type, E description
+IntakeRecord = namedtuple("IntakeRecord", "row group var value raw type description error")
+
+# Rows are coerced in blocks so each type is converted column-wise
+INTAKE_CHUNK_ROWS = 500
+
+
+def _coerce_chunk(chunk):
+    """Coerce a block of (row, group, var, raw, type, description) tuples by type."""
+    values = [None] * len(chunk)
+    errors = [None] * len(chunk)
+    by_type = {}
+    for i, item in enumerate(chunk):
+        by_type.setdefault(item[4], []).append(i)
+    for var_type, positions in by_type.items():
+        result = coerce_series(pd.Series([chunk[i][3] for i in positions], index=positions, dtype=object), var_type)
+        for i, value in zip(positions, result.values.tolist()):
+            values[i] = value
+        for err in result.errors:
+            errors[err.key] = err.message
+    for item, value, error in zip(chunk, values, errors):
+        row, group, var_name, raw, var_type, description = item
+        yield IntakeRecord(row, group, var_name, value, raw, var_type, description, error)
+
+
+def iter_intake_records(path=INTAKE_FILE, sheet_name=INTAKE_SHEET):
+    """
+    Stream the intake sheet as IntakeRecord tuples, one per row with a
+    variable name. value is coerced according to the row's type (None if
+    blank or invalid, with the reason in error); raw is the cell value as
+    stored. The workbook is opened read-only with cached formula values, so
+    the file is never locked for writing or rewritten.
+    Raises KeyError if the sheet does not exist.
+    """
+    with span("load_workbook", "excel", file=path, sheet=sheet_name):
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        chunk = []
+        for r_idx, row in enumerate(ws.iter_rows(min_row=2, max_col=5, values_only=True), start=2):
+            row = tuple(row) + (None,) * (5 - len(row))
+            group, var_name, raw, raw_type, description = row
+            var_name = str(var_name).strip() if var_name is not None else ""
+            if not var_name:
+                continue
+            chunk.append((
+                r_idx,
+                str(group).strip() if group is not None else "",
+                var_name,
+                raw,
+                normalize_type(raw_type),
+                str(description).strip() if description else "",
+            ))
+            if len(chunk) >= INTAKE_CHUNK_ROWS:
+                yield from _coerce_chunk(chunk)
+                chunk = []
+        yield from _coerce_chunk(chunk)
+    finally:
+        wb.close()
+
+
+def clear_intake_values(path=INTAKE_FILE, sheet_name=INTAKE_SHEET):
+    """Blank the value column (C) below the header and save the workbook."""
+    with span("load_workbook", "excel", file=path, sheet=sheet_name):
+        wb = openpyxl.load_workbook(path)
+    ws = wb[sheet_name]
+    for (cell,) in ws.iter_rows(min_row=2, min_col=3, max_col=3):
+        cell.value = None
+    wb.save(path)
+
+
 # ---------------------------
 # Intake import
 # ---------------------------
-def import_intake_for_client(client_id=None):
+def import_intake_for_client(client_id=None, clear_values=True):
+    """
+    Import intake.xlsx values for one client (a new client is created from
+    the sheet's matterid row when client_id is None). With clear_values the
+    value column is blanked afterwards so the sheet is ready for the next
+    client.
+    """
     if not INTAKE_FILE.exists():
         messagebox.showerror("Missing File", "intake.xlsx not found.")
         return
 
     try:
-        df = pd.read_excel(INTAKE_FILE, sheet_name=INTAKE_SHEET)
-    except Exception:
+        records = list(iter_intake_records())
+    except KeyError:
         messagebox.showerror("Missing Sheet", f"Sheet '{INTAKE_SHEET}' not found.")
         return
 
-    if df.empty or len(df) < 2:
+    if len(records) < 2:
         messagebox.showwarning("Empty Intake", "Intake sheet contains no usable rows.")
         return
 
     # Determine client_id if not provided
     if client_id is None:
-        matterid_row = df[df.iloc[:, 1].astype(str).str.strip().str.lower() == "matterid"]
         matterid = None
-        if not matterid_row.empty:
-            first_val = matterid_row.iloc[0, 2]  # Column C has the matterid value
-            matterid = str(first_val).strip() if pd.notna(first_val) else None
+        for rec in records:
+            if rec.var.lower() == "matterid":
+                matterid = str(rec.raw).strip() if rec.raw is not None else None
+                break
 
         if not matterid:
             messagebox.showwarning(
@@ -104,58 +164,238 @@ def import_intake_for_client(client_id=None):
         else:
             client_id = create_client(matterid)
 
-    # Fetch all DB variables for the client
-    client_vars = get_variables("client", client_id)
-
-    # Load workbook directly with openpyxl
-    wb = openpyxl.load_workbook(INTAKE_FILE)
-    ws = wb[INTAKE_SHEET]
-
     updates = 0
-    for r_idx, row in enumerate(ws.iter_rows(min_row=2, max_col=ws.max_column), start=2):
-        var_cell = row[1]  # Column B: variable name
-        val_cell = row[2]  # Column C: value
-        type_cell = row[3] if len(row) > 3 else None  # Column D: type
-        desc_cell = row[4] if len(row) > 4 else None  # Column E: description
-
-        var_name = str(var_cell.value).strip() if var_cell.value else None
-        if not var_name:
-            val_cell.value = None
-            continue
-
-        # Determine type and description
-        var_type = normalize_type(type_cell.value if type_cell else None)
-        description = str(desc_cell.value).strip() if desc_cell and desc_cell.value else ""
-
+    invalid = []
+    for rec in records:
         # Ensure metadata exists or update description
-        meta = get_variable_meta(var_name)
+        meta = get_variable_meta(rec.var)
         if meta:
-            if description and description != (meta.get("description") or ""):
+            if rec.description and rec.description != (meta.get("description") or ""):
                 set_variable_meta(
-                    var_name=var_name,
+                    var_name=rec.var,
                     var_type=meta.get("var_type", "string"),
-                    description=description,
+                    description=rec.description,
                     category=meta.get("category", "General"),
                     display_order=meta.get("display_order", 0),
                     is_derived=meta.get("is_derived", 0),
                     derived_expression=meta.get("derived_expression")
                 )
         else:
-            set_variable_meta(var_name=var_name, var_type=var_type, description=description)
+            set_variable_meta(var_name=rec.var, var_type=rec.type, description=rec.description)
 
-        # Read value from Excel and coerce
-        raw_value = val_cell.value
-        value = coerce_value(raw_value, var_type)
-        if value is not None:
-            set_variable("client", client_id, var_name, value)
+        if rec.error:
+            invalid.append(f"Row {rec.row}: {rec.var} = {rec.raw!r} ({rec.type}, {rec.error})")
+        elif rec.value is not None:
+            set_variable("client", client_id, rec.var, rec.value)
             updates += 1
 
-        # Clear Excel column C except header
-        val_cell.value = None if r_idx > 1 else val_cell.value
-
-    wb.save(INTAKE_FILE)
+    if clear_values:
+        clear_intake_values()
 
     messagebox.showinfo(
         "Intake Imported",
         f"{updates} value(s) imported for client ID {client_id}."
     )
+    if invalid:
+        messagebox.showwarning(
+            "Invalid Intake Values",
+            f"{len(invalid)} value(s) could not be converted and were skipped:\n\n" + "\n".join(invalid[:50])
+        )
+
+
+# ---------------------------
+# Bulk intake (many clients per sheet)
+# ---------------------------
+# Header aliases, matched case-insensitively
+BULK_HEADER_ALIASES = {
+    "matterid": "matterid", "matter id": "matterid", "matter": "matterid",
+    "variable": "var", "var": "var", "var_name": "var", "variable name": "var",
+    "value": "value",
+    "type": "type",
+    "description": "description",
+    "group": "group", "variable group": "group",
+}
+
+
+def read_bulk_intake(path, sheet_name=None):
+    """
+    Read a multi-client intake sheet in a single read-only pass.
+
+    Two layouts are recognised from the header row:
+      long: matterid | variable | value [| type | description]
+            one row per (matter, variable)
+      wide: variable [| group | type | description] | <matterid> | <matterid> ...
+            one row per variable, one column per matter (header = matterid)
+
+    Returns (layout, records, meta):
+      records = {matterid: {var_name: raw_value}}
+      meta    = {var_name: (var_type or None, description)}
+    Raises ValueError if the sheet matches neither layout.
+    """
+    with span("load_workbook", "excel", file=path, sheet=sheet_name):
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ValueError("The sheet is empty.")
+
+        columns = {}
+        matter_columns = []
+        for idx, heading in enumerate(header):
+            heading = str(heading).strip() if heading is not None else ""
+            key = BULK_HEADER_ALIASES.get(heading.lower())
+            if key and key not in columns:
+                columns[key] = idx
+            elif heading:
+                matter_columns.append((idx, heading))
+
+        if "var" not in columns:
+            raise ValueError("No 'variable' column found in the header row.")
+        layout = "long" if "matterid" in columns and "value" in columns else "wide"
+        if layout == "wide" and not matter_columns:
+            raise ValueError("Expected a 'matterid' and 'value' column, or one column per matterid.")
+
+        def cell(row, key):
+            idx = columns.get(key)
+            return row[idx] if idx is not None and idx < len(row) else None
+
+        records, meta = {}, {}
+        for row in rows:
+            var_name = cell(row, "var")
+            var_name = str(var_name).strip() if var_name is not None else ""
+            if not var_name:
+                continue
+            raw_type = cell(row, "type")
+            description = cell(row, "description")
+            if var_name not in meta or raw_type is not None or description:
+                old_type, old_desc = meta.get(var_name, (None, ""))
+                meta[var_name] = (
+                    normalize_type(raw_type) if raw_type is not None else old_type,
+                    str(description).strip() if description else old_desc,
+                )
+
+            if layout == "long":
+                matterid = cell(row, "matterid")
+                if matterid is None or not str(matterid).strip():
+                    continue
+                records.setdefault(str(matterid).strip(), {})[var_name] = cell(row, "value")
+            else:
+                for idx, matterid in matter_columns:
+                    records.setdefault(matterid, {})[var_name] = row[idx] if idx < len(row) else None
+    finally:
+        wb.close()
+    return layout, records, meta
+
+
+def coerce_bulk_records(records, meta):
+    """
+    Coerce raw sheet values by variable type (sheet type column first, then
+    the type already stored in variables_meta), one column per variable.
+    Returns (records, meta, errors); invalid cells become None and are
+    listed in errors.
+    """
+    known_types = {m["var_name"]: m["var_type"] for m in list_all_variable_meta()}
+    types = {
+        name: var_type or normalize_type(known_types.get(name))
+        for name, (var_type, _) in meta.items()
+    }
+    coerced, errors = coerce_records(records, types)
+    return coerced, {name: (types[name], desc) for name, (_, desc) in meta.items()}, errors
+
+
+def format_bulk_report(report):
+    """Human-readable per-client diff."""
+    lines = []
+    new_clients = sum(1 for entry in report.values() if entry["created"])
+    lines.append(f"{len(report)} matter(s): {new_clients} new, {len(report) - new_clients} existing")
+    lines.append("")
+    for matterid, entry in report.items():
+        who = f"client {entry['client_id']}" if entry["client_id"] is not None else "new client"
+        if entry["created"] and entry["client_id"] is not None:
+            who = f"new {who}"
+        lines.append(
+            f"{matterid} ({who}): {len(entry['added'])} added, "
+            f"{len(entry['changed'])} changed, {entry['unchanged']} unchanged"
+        )
+        for var_name, (old, new) in sorted(entry["changed"].items()):
+            lines.append(f"    {var_name}: {old!r} -> {new!r}")
+    return "\n".join(lines)
+
+
+def import_bulk_intake(path=None, sheet_name=None, parent=None):
+    """
+    Import many clients at once from a wide or long spreadsheet (see
+    read_bulk_intake). The file is read once; a preview of the per-client
+    diff is shown, and on confirmation everything is written in a single
+    transaction. The source file is never modified.
+    """
+    if path is None:
+        path = filedialog.askopenfilename(
+            parent=parent,
+            title="Select Bulk Intake Spreadsheet",
+            filetypes=[("Excel workbook", "*.xlsx *.xlsm")],
+        )
+        if not path:
+            return None
+
+    try:
+        layout, records, meta = read_bulk_intake(path, sheet_name)
+    except (OSError, KeyError, ValueError) as e:
+        messagebox.showerror("Bulk Intake", f"Could not read {Path(path).name}:\n{e}", parent=parent)
+        return None
+    if not records:
+        messagebox.showwarning("Bulk Intake", "No matters found in the spreadsheet.", parent=parent)
+        return None
+
+    records, meta, errors = coerce_bulk_records(records, meta)
+    preview = bulk_import_clients(records, meta, dry_run=True)
+
+    win = tk.Toplevel(parent)
+    win.title("Bulk Intake Preview")
+    win.geometry("700x500")
+    win.grab_set()
+    tk.Label(
+        win, text=f"{Path(path).name} ({layout} layout)", font=("Arial", 12, "bold")
+    ).pack(pady=(10, 5))
+
+    text_frame = tk.Frame(win)
+    text_frame.pack(fill="both", expand=True, padx=10)
+    text = tk.Text(text_frame, wrap="none", font=("Courier", 10))
+    scrollbar = tk.Scrollbar(text_frame, orient="vertical", command=text.yview)
+    text.configure(yscrollcommand=scrollbar.set)
+    text.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+    report_text = format_bulk_report(preview)
+    if errors:
+        report_text = (
+            f"{len(errors)} value(s) could not be converted and will be skipped:\n"
+            f"{format_errors(errors)}\n\n{report_text}"
+        )
+    text.insert("1.0", report_text)
+    text.config(state="disabled")
+
+    result = {"report": None}
+
+    def apply():
+        try:
+            result["report"] = bulk_import_clients(records, meta)
+        except Exception as e:
+            messagebox.showerror("Bulk Intake", f"Import failed, nothing was written:\n{e}", parent=win)
+            return
+        created = sum(1 for entry in result["report"].values() if entry["created"])
+        messagebox.showinfo(
+            "Bulk Intake",
+            f"Imported {len(result['report'])} matter(s) ({created} new client(s)).",
+            parent=win,
+        )
+        win.destroy()
+
+    btn_frame = tk.Frame(win)
+    btn_frame.pack(pady=10)
+    tk.Button(btn_frame, text="Import", command=apply, width=15).pack(side="left", padx=5)
+    tk.Button(btn_frame, text="Cancel", command=win.destroy, width=15).pack(side="left", padx=5)
+
+    win.wait_window()
+    return result["report"]
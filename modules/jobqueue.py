@@ -0,0 +1,473 @@
+# modules/jobqueue.py
+"""
+Persistent generation queue.
+
+A batch (clients x templates) is written to data/jobs.db as one job per
+document before anything is rendered. Workers claim pending jobs one at a
+time, so a batch that crashes or is cancelled halfway keeps its finished
+documents and can be resumed, and several worker processes can share one
+batch:
+
+    pending --claim--> running --> done
+                          |   \\--> failed --retry--> pending
+                          \\-- interrupted (resume) --> pending
+
+Every job has a fixed output path, {stem}_client{id}_batch{n}.docx, so a
+retried or resumed job overwrites its own earlier attempt instead of
+adding another timestamped copy.
+
+Headless workers never guess a <<dynamic>> choice: a batch records its
+answers (create_batch(answers=...) or resume --answer), and a job that needs
+a choice the batch does not have fails with that in its error. status lists
+the errors of failed jobs. A worker stopped with Ctrl+C puts its current
+job back to pending.
+
+    python -m modules.jobqueue status
+    python -m modules.jobqueue resume 12 --retry-failed
+    python -m modules.jobqueue resume 12 --retry-failed --answer venue="Garfield County" --run
+    python -m modules.jobqueue work --batch 12 --workers 4    # headless
+    python -m modules.jobqueue work --batch 12 --bundle out.zip   # one ZIP, see modules/zipbundle.py
+    python -m modules.jobqueue stale --queue                  # see modules/rendercache.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from modules.perf import span
+
+JOBS_DB_PATH = Path("data/jobs.db")
+OUTPUT_DIR = Path("output_documents")
+STATES = ("pending", "running", "done", "failed")
+# Failed jobs listed per batch by the status command
+FAILED_SHOWN = 10
+
+Job = namedtuple("Job", "id batch_id client_id template output_path attempts")
+BatchStatus = namedtuple("BatchStatus", "id created_at label total pending running done failed")
+
+
+def _connect():
+    JOBS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Autocommit mode; claims open their own BEGIN IMMEDIATE transaction
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generation_batches (
+            id INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            label TEXT,
+            grammar_override TEXT,
+            answers TEXT
+        )
+    ''')
+    if "answers" not in {r[1] for r in conn.execute("PRAGMA table_info(generation_batches)")}:
+        conn.execute("ALTER TABLE generation_batches ADD COLUMN answers TEXT")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL REFERENCES generation_batches(id),
+            client_id INTEGER NOT NULL,
+            template TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending'
+                CHECK (state IN ('pending', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            error TEXT,
+            UNIQUE (batch_id, client_id, template)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_jobs_claim ON generation_jobs (state, batch_id, id)")
+    return conn
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def output_path_for(template, client_id, batch_id):
+    """The one output file a job writes, however many times it runs."""
+    return OUTPUT_DIR / f"{Path(template).stem}_client{client_id}_batch{batch_id}.docx"
+
+
+# ---------------------------
+# Batches
+# ---------------------------
+def create_batch(client_ids, templates, grammar_override=None, label=None, answers=None):
+    """
+    Queue one pending job per (client, template); returns the batch id.
+    answers ({var_name: choice}) are the <<dynamic>> choices headless
+    workers use for this batch.
+    """
+    return _create_batch(
+        ((client_id, template, None) for client_id in client_ids for template in templates),
+        grammar_override, label, answers,
+    )
+
+
+def create_regeneration_batch(outputs, grammar_override=None, label="Regenerate stale documents"):
+    """Queue jobs that re-render existing outputs in place: outputs is [(client_id, template, output_path)]."""
+    return _create_batch(outputs, grammar_override, label)
+
+
+def _create_batch(jobs, grammar_override, label, answers=None):
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO generation_batches (created_at, label, grammar_override, answers) VALUES (?, ?, ?, ?)",
+            (_now(), label, json.dumps(grammar_override) if grammar_override else None,
+             json.dumps(answers) if answers else None),
+        )
+        batch_id = c.lastrowid
+        c.executemany(
+            "INSERT OR IGNORE INTO generation_jobs (batch_id, client_id, template, output_path) VALUES (?, ?, ?, ?)",
+            (
+                (batch_id, client_id, str(template),
+                 str(output_path or output_path_for(template, client_id, batch_id)))
+                for client_id, template, output_path in jobs
+            ),
+        )
+        conn.execute("COMMIT")
+        return batch_id
+    finally:
+        conn.close()
+
+
+def batch_grammar_override(batch_id):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT grammar_override FROM generation_batches WHERE id=?", (batch_id,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+def batch_answers(batch_id):
+    """The batch's recorded <<dynamic>> choices, {var_name: choice}."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT answers FROM generation_batches WHERE id=?", (batch_id,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row and row[0] else {}
+
+
+def record_answers(batch_id, answers):
+    """Add or replace <<dynamic>> choices of a batch (e.g. before retrying its failed jobs)."""
+    merged = dict(batch_answers(batch_id), **answers)
+    conn = _connect()
+    try:
+        conn.execute("UPDATE generation_batches SET answers=? WHERE id=?", (json.dumps(merged), batch_id))
+    finally:
+        conn.close()
+    return merged
+
+
+def list_batches(unfinished_only=False):
+    """[BatchStatus] newest first; unfinished = any job not done."""
+    conn = _connect()
+    try:
+        rows = conn.execute('''
+            SELECT b.id, b.created_at, b.label, COUNT(j.id),
+                   SUM(j.state = 'pending'), SUM(j.state = 'running'),
+                   SUM(j.state = 'done'), SUM(j.state = 'failed')
+            FROM generation_batches b
+            LEFT JOIN generation_jobs j ON j.batch_id = b.id
+            GROUP BY b.id
+            ORDER BY b.id DESC
+        ''').fetchall()
+    finally:
+        conn.close()
+    batches = [BatchStatus(*row[:3], *(n or 0 for n in row[3:])) for row in rows]
+    if unfinished_only:
+        batches = [b for b in batches if b.done < b.total]
+    return batches
+
+
+def batch_status(batch_id):
+    return next((b for b in list_batches() if b.id == batch_id), None)
+
+
+def resume_batch(batch_id, retry_failed=False):
+    """
+    Put interrupted (running) jobs back to pending, and failed ones too if
+    retry_failed. Only call this when no worker is still running the batch.
+    Returns the number of jobs requeued.
+    """
+    states = ("running", "failed") if retry_failed else ("running",)
+    conn = _connect()
+    try:
+        c = conn.execute(
+            f"UPDATE generation_jobs SET state='pending', worker=NULL "
+            f"WHERE batch_id=? AND state IN ({','.join('?' * len(states))})",
+            (batch_id, *states),
+        )
+        return c.rowcount
+    finally:
+        conn.close()
+
+
+def list_outputs(batch_id, state="done"):
+    """Output paths of a batch's jobs in the given state, in job order."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT output_path FROM generation_jobs WHERE batch_id=? AND state=? ORDER BY id",
+            (batch_id, state),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [r[0] for r in rows]
+
+
+def list_failed_jobs(batch_id):
+    """[(client_id, template, error)] of a batch's failed jobs, in job order."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT client_id, template, error FROM generation_jobs WHERE batch_id=? AND state='failed' ORDER BY id",
+            (batch_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+# ---------------------------
+# Jobs
+# ---------------------------
+def claim_job(batch_id=None, worker=None):
+    """
+    Atomically move the oldest pending job (of batch_id, or any batch) to
+    running and return it, or None when nothing is pending. Safe to call
+    from several processes at once.
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        sql = "SELECT id, batch_id, client_id, template, output_path, attempts FROM generation_jobs WHERE state='pending'"
+        params = ()
+        if batch_id is not None:
+            sql += " AND batch_id=?"
+            params = (batch_id,)
+        row = conn.execute(sql + " ORDER BY batch_id, id LIMIT 1", params).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE generation_jobs SET state='running', attempts=attempts + 1, worker=?, started_at=?, "
+            "finished_at=NULL, error=NULL WHERE id=?",
+            (worker or worker_name(), _now(), row[0]),
+        )
+        conn.execute("COMMIT")
+        job = Job(*row)
+        return job._replace(attempts=job.attempts + 1)
+    finally:
+        conn.close()
+
+
+def finish_job(job_id, error=None):
+    """Mark a claimed job done, or failed with error."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE generation_jobs SET state=?, finished_at=?, error=? WHERE id=?",
+            ("failed" if error else "done", _now(), error, job_id),
+        )
+    finally:
+        conn.close()
+
+
+def release_job(job_id):
+    """Return a claimed job to pending untouched (e.g. the user cancelled)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE generation_jobs SET state='pending', worker=NULL, attempts=MAX(attempts - 1, 0) WHERE id=?",
+            (job_id,),
+        )
+    finally:
+        conn.close()
+
+
+def run_job(job, render):
+    """
+    Run one claimed job with render(job), which returns the output path or
+    a falsy value on failure. Returns True when the job finished.
+    """
+    with span("job", "generation", batch=job.batch_id, client_id=job.client_id):
+        try:
+            output = render(job)
+        except Exception as e:
+            finish_job(job.id, f"{type(e).__name__}: {e}")
+            return False
+    finish_job(job.id, None if output else "generation returned no document")
+    return bool(output)
+
+
+def work(batch_id=None, render=None, should_stop=None, on_job=None):
+    """
+    Claim and run jobs until none are pending (or should_stop() is true).
+    render defaults to headless generation. on_job(job, ok) is called
+    after each job. Returns (done, failed) counts for this worker.
+    """
+    if render is None:
+        render = _headless_render()
+    done = failed = 0
+    worker = worker_name()
+    while not (should_stop and should_stop()):
+        job = claim_job(batch_id, worker)
+        if job is None:
+            break
+        try:
+            ok = run_job(job, render)
+        except KeyboardInterrupt:
+            # Stopped mid-render: the job never ran to completion, so it is not a failure
+            release_job(job.id)
+            raise
+        done, failed = done + ok, failed + (not ok)
+        if on_job:
+            on_job(job, ok)
+    return done, failed
+
+
+def _headless_render(bundle=None):
+    from modules.docgen import generate_document_from_template
+    from modules.headless import headless_prompts
+
+    settings = {}
+
+    def render(job):
+        if job.batch_id not in settings:
+            settings[job.batch_id] = (batch_grammar_override(job.batch_id), batch_answers(job.batch_id))
+        grammar_override, answers = settings[job.batch_id]
+        with headless_prompts(answers=answers, unanswered="fail"):
+            return generate_document_from_template(
+                Path(job.template), job.client_id,
+                grammar_override=grammar_override, output_file=Path(job.output_path), bundle=bundle,
+            )
+
+    return render
+
+
+def queue_stale_outputs(stale):
+    """Queue [rendercache.StaleOutput] for regeneration, one batch per grammar override; returns the batch ids."""
+    groups = {}
+    for output in stale:
+        key = json.dumps(output.grammar_override, sort_keys=True)
+        groups.setdefault(key, []).append((output.client_id, output.template, output.output_path))
+    return [create_regeneration_batch(jobs, json.loads(key)) for key, jobs in groups.items()]
+
+
+def _stale_command(queue):
+    from modules.rendercache import find_stale_outputs
+
+    stale = find_stale_outputs()
+    if not stale:
+        print("No stale documents.")
+        return
+    for output in stale:
+        print(f"client {output.client_id:>6}  {output.output_path}  ({', '.join(output.reasons)})")
+    if queue:
+        batch_ids = queue_stale_outputs(stale)
+        print(f"Queued {len(stale)} document(s) in batch(es) {', '.join(map(str, batch_ids))}; "
+              f"run them with 'work'.")
+
+
+def _work_process(batch_id):
+    return work(batch_id)
+
+
+def _parse_answers(pairs, parser):
+    """--answer NAME=VALUE pairs; a name given more than once is a multi-entry (numbered list) answer."""
+    answers = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep or not name.strip():
+            parser.error(f"--answer expects NAME=VALUE, got {pair!r}")
+        name = name.strip()
+        if name in answers:
+            previous = answers[name]
+            answers[name] = (previous if isinstance(previous, list) else [previous]) + [value]
+        else:
+            answers[name] = value
+    return answers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, resume and run queued document generation.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="list batches and their job counts")
+    status.add_argument("--all", action="store_true", help="include finished batches")
+    resume = sub.add_parser("resume", help="requeue a batch's interrupted jobs")
+    resume.add_argument("batch", type=int)
+    resume.add_argument("--retry-failed", action="store_true", help="requeue failed jobs too")
+    resume.add_argument("--run", action="store_true", help="then run the batch headless")
+    resume.add_argument("--answer", action="append", default=[], metavar="NAME=VALUE",
+                        help="record a <<dynamic>> choice for headless runs (repeat a name for a list)")
+    run = sub.add_parser("work", help="run pending jobs headless")
+    run.add_argument("--batch", type=int, help="only this batch (default: all)")
+    run.add_argument("--workers", type=int, default=1, help="worker processes")
+    run.add_argument("--bundle", type=Path, help="write the documents into this one ZIP archive (single worker)")
+    stale = sub.add_parser("stale", help="list documents whose client data changed since they were generated")
+    stale.add_argument("--queue", action="store_true", help="queue them for regeneration in place")
+    args = parser.parse_args(argv)
+
+    if args.command == "stale":
+        return _stale_command(args.queue)
+
+    if args.command == "status":
+        batches = list_batches(unfinished_only=not args.all)
+        if not batches:
+            print("No unfinished batches." if not args.all else "No batches.")
+        for b in batches:
+            print(f"batch {b.id:>4}  {b.created_at}  {b.done}/{b.total} done, {b.pending} pending, "
+                  f"{b.running} running, {b.failed} failed" + (f"  ({b.label})" if b.label else ""))
+            if b.failed:
+                failures = list_failed_jobs(b.id)
+                for client_id, template, error in failures[:FAILED_SHOWN]:
+                    print(f"      client {client_id:>6}  {Path(template).name}: {error}")
+                if len(failures) > FAILED_SHOWN:
+                    print(f"      ... and {len(failures) - FAILED_SHOWN} more")
+        return
+
+    if args.command == "resume":
+        if args.answer:
+            record_answers(args.batch, _parse_answers(args.answer, parser))
+        print(f"Requeued {resume_batch(args.batch, args.retry_failed)} job(s) of batch {args.batch}.")
+        if not args.run:
+            return
+        args.workers = 1
+
+    batch_id = args.batch
+    if getattr(args, "bundle", None):
+        from modules.zipbundle import ZipBundle
+        if args.workers > 1:
+            parser.error("--bundle writes one archive and runs a single worker")
+        with ZipBundle(args.bundle, batch_id) as bundle:
+            done, failed = work(batch_id, render=_headless_render(bundle))
+        print(f"{done} document(s) generated into {args.bundle}, {failed} failed.")
+        return
+    if args.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(args.workers) as pool:
+            results = list(pool.map(_work_process, [batch_id] * args.workers))
+    else:
+        results = [work(batch_id)]
+    done, failed = sum(r[0] for r in results), sum(r[1] for r in results)
+    print(f"{done} document(s) generated, {failed} failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# modules/modifiers.py
+"""
+Placeholder suffix grammar shared by {{placeholder}} and <<dynamic>> variables.
+
+A placeholder is a base variable name followed by optional suffixes:
+
+    {{defendantname_upper}}      -> base "defendantname", transform "upper"
+    {{clientname_title_combo}}   -> base "clientname", tag "combo", transform "title"
+    <<venue_upper>>              -> base "venue", transform "upper"
+
+Tags (combo, derived) choose how the base value is resolved. Transforms
+(upper, lower, title, ...) are applied to the resolved value. Suffixes are
+matched right-to-left in a fixed order (tags first, then transforms in
+registration order), each at most once, which is the order the original
+endswith/rsplit chain used.
+
+New transforms are added with register_transform() and are picked up by
+both placeholder types without touching the generation loop.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+RESOLUTION_TAGS = ("combo", "derived")
+
+_TRANSFORMS = {}
+_patterns = {}
+
+
+@dataclass(frozen=True)
+class Placeholder:
+    raw: str
+    base: str
+    tags: frozenset
+    transforms: tuple  # in application order (innermost suffix first)
+
+
+def register_transform(name, func):
+    """
+    Register a value transform usable as a _<name> suffix.
+    func takes and returns a string.
+    """
+    if name in RESOLUTION_TAGS:
+        raise ValueError(f"'{name}' is reserved as a resolution tag")
+    _TRANSFORMS[name] = func
+    _patterns.clear()
+    parse_placeholder.cache_clear()
+
+
+def _get_pattern(allow_tags):
+    """
+    Build (and cache) the suffix regex. Groups are laid out left-to-right as
+    base, transforms in reverse registration order, then tags in reverse, so a
+    lazy base leaves the longest valid suffix chain to the optional groups.
+    """
+    pattern = _patterns.get(allow_tags)
+    if pattern is None:
+        suffixes = list(reversed(list(_TRANSFORMS)))
+        if allow_tags:
+            suffixes += list(reversed(RESOLUTION_TAGS))
+        groups = "".join(f"(?:_({re.escape(s)}))?" for s in suffixes)
+        pattern = (re.compile(rf"^(.+?){groups}$"), suffixes)
+        _patterns[allow_tags] = pattern
+    return pattern
+
+
+@lru_cache(maxsize=4096)
+def parse_placeholder(raw, allow_tags=True):
+    """Parse a placeholder name into its base name, tags and transforms (memoised)."""
+    regex, suffixes = _get_pattern(allow_tags)
+    m = regex.match(raw)
+    if not m:
+        return Placeholder(raw, raw, frozenset(), ())
+    found = [s for s, g in zip(suffixes, m.groups()[1:]) if g]
+    tags = frozenset(s for s in found if s in RESOLUTION_TAGS)
+    transforms = tuple(s for s in found if s in _TRANSFORMS)
+    return Placeholder(raw, m.group(1), tags, transforms)
+
+
+def parse_placeholders(names, allow_tags=True):
+    """Parse every placeholder of a template at once: {raw: Placeholder}."""
+    return {name: parse_placeholder(name, allow_tags) for name in names}
+
+
+def apply_transforms(value, transforms):
+    """Apply transforms innermost-first; the outermost suffix wins on conflicts."""
+    if not value:
+        return value
+    value = str(value)
+    for name in transforms:
+        value = _TRANSFORMS[name](value)
+    return value
+
+
+register_transform("upper", str.upper)
+register_transform("lower", str.lower)
+register_transform("title", str.title)
@@ -0,0 +1,310 @@
+# modules/pdfexport.py
+"""
+Optional PDF export through a pool of warm LibreOffice converters.
+
+Starting soffice takes seconds, far longer than converting one letter, so
+each worker (modules/pdfworker.py) starts one headless soffice with its own
+profile and keeps it running; documents are sent to it over a pipe, one at
+a time. A pool runs one worker per core (capped at MAX_DEFAULT_WORKERS),
+so a batch converts in parallel:
+
+    with PdfConverterPool() as pool:
+        converted, failed = pool.convert_many(paths)
+
+    python -m modules.pdfexport output_documents/*.docx --workers 4
+    python -m modules.pdfexport --batch 12        # a generation batch's outputs
+
+LibreOffice is found on PATH, in its usual install folders, or through
+DOCGEN_SOFFICE. The workers need a Python that can import `uno`: this
+interpreter if it can, otherwise the one bundled with LibreOffice. When
+neither is found, is_available() is False and the app does not offer PDFs.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from modules.perf import span
+
+SOFFICE_ENV = "DOCGEN_SOFFICE"
+WORKER_SCRIPT = Path(__file__).with_name("pdfworker.py")
+MAX_DEFAULT_WORKERS = 8
+CONVERT_TIMEOUT = 300
+
+_SOFFICE_CANDIDATES = (
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+    "/usr/lib/libreoffice/program/soffice",
+    "/opt/libreoffice/program/soffice",
+)
+
+
+class PdfExportError(RuntimeError):
+    pass
+
+
+# ---------------------------
+# Finding LibreOffice
+# ---------------------------
+@lru_cache(maxsize=None)
+def find_soffice():
+    """Path of the soffice executable, or None."""
+    candidates = [os.environ.get(SOFFICE_ENV), shutil.which("soffice"), shutil.which("libreoffice")]
+    candidates.extend(_SOFFICE_CANDIDATES)
+    for candidate in candidates:
+        if candidate and Path(candidate).is_file():
+            return str(Path(candidate).resolve())
+    return None
+
+
+@lru_cache(maxsize=None)
+def find_uno_python():
+    """A Python interpreter that can import uno, or None."""
+    if importlib.util.find_spec("uno") is not None:
+        return sys.executable
+    soffice = find_soffice()
+    candidates = []
+    if soffice:
+        program = Path(soffice).parent
+        candidates += [program / "python.exe", program / "python", program.parent / "Resources" / "python"]
+    candidates += [Path(p) for p in (shutil.which("python3"), "/usr/bin/python3") if p]
+    for candidate in candidates:
+        if not candidate.is_file():
+            continue
+        try:
+            subprocess.run([str(candidate), "-c", "import uno"], check=True, timeout=30,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        return str(candidate)
+    return None
+
+
+def is_available():
+    return find_soffice() is not None and find_uno_python() is not None
+
+
+def default_workers():
+    return max(1, min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS))
+
+
+def pdf_path_for(docx_path):
+    return Path(docx_path).with_suffix(".pdf")
+
+
+# ---------------------------
+# Workers
+# ---------------------------
+class PdfWorker:
+    """
+    One pdfworker.py process (and its soffice), restarted if it dies.
+    The worker runs in its own process group, so stopping or killing it
+    takes its soffice along, and every start gets a fresh profile folder.
+    """
+
+    def __init__(self, soffice, python, name="pdf"):
+        self.soffice = soffice
+        self.python = python
+        self.name = name
+        self.profile = None
+        self.proc = None
+
+    def start(self):
+        self.profile = Path(tempfile.mkdtemp(prefix=f"docgen-{self.name}-"))
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        self.proc = subprocess.Popen(
+            [self.python, str(WORKER_SCRIPT), self.soffice, str(self.profile)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1, **group,
+        )
+        hello = self._read_reply()
+        if not hello.get("ready"):
+            self.stop()
+            raise PdfExportError(f"LibreOffice did not start: {hello.get('error', 'no response')}")
+
+    def _read_reply(self):
+        line = self.proc.stdout.readline()
+        if not line:
+            return {}
+        try:
+            return json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": line.strip()}
+
+    def convert(self, src, dst=None):
+        """Convert src to dst (default: same name, .pdf); returns dst."""
+        dst = Path(dst) if dst else pdf_path_for(src)
+        if self.proc is None or self.proc.poll() is not None:
+            self.start()
+        # A hung conversion is killed so the worker can be restarted
+        watchdog = threading.Timer(CONVERT_TIMEOUT, _kill_group, (self.proc,))
+        watchdog.start()
+        try:
+            self.proc.stdin.write(json.dumps({"src": str(src), "dst": str(dst)}) + "\n")
+            self.proc.stdin.flush()
+            reply = self._read_reply()
+        except OSError as e:
+            reply = {"ok": False, "error": str(e)}
+        finally:
+            watchdog.cancel()
+        if not reply:
+            self.stop()
+            raise PdfExportError(f"converter stopped while converting {Path(src).name}")
+        if not reply.get("ok"):
+            raise PdfExportError(reply.get("error") or "conversion failed")
+        return dst
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc is not None:
+            try:
+                # The worker closes soffice when its input ends
+                proc.stdin.close()
+                proc.wait(timeout=30)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            # Whatever is left of the group (a hung or orphaned soffice)
+            _kill_group(proc)
+            proc.wait()
+        if self.profile is not None:
+            shutil.rmtree(self.profile, ignore_errors=True)
+            self.profile = None
+
+    def close(self):
+        self.stop()
+
+
+def _kill_group(proc):
+    """Kill a worker and every process it started (its process group)."""
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class PdfConverterPool:
+    """
+    Up to `workers` warm converters, started on first use and kept until
+    close(). Thread-safe: each conversion borrows an idle worker.
+    """
+
+    def __init__(self, workers=None):
+        self.soffice = find_soffice()
+        self.python = find_uno_python()
+        if not self.soffice:
+            raise PdfExportError(f"LibreOffice (soffice) not found; install it or set {SOFFICE_ENV}.")
+        if not self.python:
+            raise PdfExportError("No Python with LibreOffice's uno module was found.")
+        self.size = workers or default_workers()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = PdfWorker(self.soffice, self.python, f"pdf{len(self._workers)}")
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def convert(self, src, dst=None):
+        worker = self._acquire()
+        try:
+            with span("pdf", "generation", file=Path(src).name):
+                return worker.convert(src, dst)
+        finally:
+            self._idle.put(worker)
+
+    def convert_many(self, paths, on_done=None):
+        """
+        Convert every .docx in paths in parallel. on_done(path, pdf, error)
+        is called as each finishes (from a pool thread). Returns
+        (converted [(docx, pdf)], failed [(docx, error)]).
+        """
+        converted, failed = [], []
+
+        def convert_one(path):
+            try:
+                pdf = self.convert(path)
+            except Exception as e:
+                failed.append((path, str(e)))
+                pdf, error = None, str(e)
+            else:
+                converted.append((path, pdf))
+                error = None
+            if on_done:
+                on_done(path, pdf, error)
+
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=min(self.size, len(paths)) or 1) as pool:
+            list(pool.map(convert_one, paths))
+        return converted, failed
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_to_pdf(paths, workers=None, on_done=None):
+    """One-shot convenience: convert paths with a temporary pool."""
+    with PdfConverterPool(workers) as pool:
+        return pool.convert_many(paths, on_done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert generated .docx files to PDF with warm LibreOffice workers.")
+    parser.add_argument("paths", nargs="*", type=Path, help=".docx files to convert")
+    parser.add_argument("--batch", type=int, help="convert the finished documents of this generation batch")
+    parser.add_argument("--workers", type=int, help=f"converter processes (default: cores, max {MAX_DEFAULT_WORKERS})")
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths)
+    if args.batch is not None:
+        from modules.jobqueue import list_outputs
+        paths += [Path(p) for p in list_outputs(args.batch)]
+    if not paths:
+        parser.error("nothing to convert")
+    if not is_available():
+        sys.exit(f"LibreOffice with Python/UNO support was not found (set {SOFFICE_ENV} to soffice's path).")
+
+    def report(path, pdf, error):
+        print(f"  {Path(path).name}: {pdf or error}")
+
+    converted, failed = convert_to_pdf(paths, args.workers, report)
+    print(f"{len(converted)} PDF(s) written, {len(failed)} failed.")
+
+
+if __name__ == "__main__":
+    main()
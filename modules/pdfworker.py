@@ -0,0 +1,123 @@
+# modules/pdfworker.py
+"""
+One long-lived PDF converter, started by modules/pdfexport.py.
+
+This script runs under a Python that can import LibreOffice's `uno` module
+(LibreOffice's bundled python, or a system python with python3-uno), so it
+must not import anything from the app. It starts its own headless soffice
+with a private profile, connects to it over a named UNO pipe and then
+converts documents for as long as its parent keeps it:
+
+    stdin   {"src": "a.docx", "dst": "a.pdf"}      one JSON request per line
+    stdout  {"ok": true} / {"ok": false, "error": "..."}
+
+The first line written is {"ready": true} once soffice accepts
+connections (or {"ready": false, "error": ...} and the worker exits).
+soffice is closed when stdin ends or the worker gets SIGTERM; the parent
+kills the worker's whole process group if it has to, so a hung soffice
+goes with it.
+
+    python pdfworker.py <soffice> <profile dir>
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+
+CONNECT_TIMEOUT = 90
+
+
+def _reply(**message):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def _props(**values):
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+def _start_office(soffice, profile):
+    pipe = f"docgen_pdf_{os.getpid()}"
+    office = subprocess.Popen(
+        [soffice, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault", "--nolockcheck",
+         f"-env:UserInstallation={uno.systemPathToFileUrl(os.path.abspath(profile))}",
+         f"--accept=pipe,name={pipe};urp;StarOffice.ComponentContext"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        try:
+            context = resolver.resolve(f"uno:pipe,name={pipe};urp;StarOffice.ComponentContext")
+            break
+        except Exception:
+            if office.poll() is not None:
+                raise RuntimeError(f"soffice exited with code {office.returncode}")
+            if time.monotonic() > deadline:
+                office.kill()
+                raise RuntimeError("soffice did not start in time")
+            time.sleep(0.25)
+    desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+    return office, desktop
+
+
+def _convert(desktop, src, dst):
+    doc = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(src)), "_blank", 0, _props(Hidden=True, ReadOnly=True),
+    )
+    if doc is None:
+        raise RuntimeError(f"could not open {src}")
+    try:
+        doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(dst)), _props(FilterName="writer_pdf_Export"))
+    finally:
+        doc.close(True)
+
+
+def main():
+    soffice, profile = sys.argv[1], sys.argv[2]
+    try:
+        office, desktop = _start_office(soffice, profile)
+    except Exception as e:
+        _reply(ready=False, error=str(e))
+        return 1
+    _reply(ready=True)
+
+    # Turn SIGTERM into SystemExit so the finally below still closes soffice
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            try:
+                _convert(desktop, job["src"], job["dst"])
+                _reply(ok=True)
+            except Exception as e:
+                _reply(ok=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        try:
+            desktop.terminate()
+        except Exception:
+            pass
+        try:
+            office.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            office.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# modules/perf.py
+"""
+Lightweight timing instrumentation for document generation.
+
+Every generation stage, every modules.db call and every Excel read is
+recorded as a span (name, category, start, duration, thread) in a fixed-size
+ring buffer, so the most recent activity is always available without the
+buffer growing over a long session:
+
+    with stage("docxtpl"):            # generation stages
+        ...
+    with span("read_excel", "excel", file=path, sheet=name):
+        ...
+    @traced("db")                     # whole functions
+    def get_variables(...): ...
+
+The Performance window in the main menu summarises the buffer, and
+export_chrome_trace() writes it in Chrome trace format (open it in
+chrome://tracing or https://ui.perfetto.dev).
+
+Benchmarks that want per-run stage totals use a StageRecorder:
+
+    with StageRecorder() as rec:
+        generate_document_from_template(...)
+    rec.totals   # {"scan": 0.012, "docxtpl": 0.030, ...}
+"""
+
+import json
+import os
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+# Stage names in pipeline order, used for reporting
+GENERATION_STAGES = (
+    "scan", "dynamic", "resolve", "reuse", "docxtpl", "save",
+    "counsel", "grammar", "docvars", "bracket", "write",
+)
+
+SPAN_BUFFER_SIZE = 20000
+
+Span = namedtuple("Span", "name category start duration thread args")
+
+_spans = deque(maxlen=SPAN_BUFFER_SIZE)
+_recorders = []
+_enabled = True
+
+
+class StageRecorder:
+    """Accumulates total seconds and call counts per stage while active."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def __enter__(self):
+        _recorders.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _recorders.remove(self)
+        return False
+
+
+# ---------------------------
+# Spans
+# ---------------------------
+def set_enabled(enabled):
+    """Turn span recording on or off (StageRecorders keep working either way)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextmanager
+def span(name, category="app", **args):
+    """Record a block as a span in the ring buffer."""
+    if not _enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        _spans.append(Span(name, category, start, perf_counter() - start,
+                           threading.get_ident(), args or None))
+
+
+def traced(category, name=None):
+    """Decorator recording every call of a function as a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _spans.append(Span(span_name, category, start, perf_counter() - start,
+                                   threading.get_ident(), None))
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(name):
+    """Time a generation stage: recorded as a span and reported to every active StageRecorder."""
+    if not _enabled and not _recorders:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        if _enabled:
+            _spans.append(Span(name, "stage", start, elapsed, threading.get_ident(), None))
+        for recorder in _recorders:
+            recorder.add(name, elapsed)
+
+
+def get_spans():
+    """Snapshot of the ring buffer, oldest first."""
+    return list(_spans)
+
+
+def clear_spans():
+    _spans.clear()
+
+
+def summarize_spans(spans=None):
+    """
+    Aggregate spans per (category, name).
+    Returns a list of dicts sorted by total time, slowest first.
+    """
+    summary = {}
+    for s in _spans if spans is None else spans:
+        row = summary.get((s.category, s.name))
+        if row is None:
+            row = summary[(s.category, s.name)] = {
+                "category": s.category, "name": s.name,
+                "count": 0, "total": 0.0, "max": 0.0,
+            }
+        row["count"] += 1
+        row["total"] += s.duration
+        if s.duration > row["max"]:
+            row["max"] = s.duration
+    rows = sorted(summary.values(), key=lambda r: r["total"], reverse=True)
+    for row in rows:
+        row["mean"] = row["total"] / row["count"]
+    return rows
+
+
+def export_chrome_trace(path, spans=None):
+    """
+    Write spans as Chrome trace JSON (complete "X" events, microseconds).
+    Returns the number of events written.
+    """
+    spans = get_spans() if spans is None else list(spans)
+    # Spans are appended when they end, so the earliest start may not come first
+    origin = min((s.start for s in spans), default=0.0)
+    pid = os.getpid()
+    events = []
+    for s in spans:
+        event = {
+            "name": s.name,
+            "cat": s.category,
+            "ph": "X",
+            "ts": round((s.start - origin) * 1e6, 3),
+            "dur": round(s.duration * 1e6, 3),
+            "pid": pid,
+            "tid": s.thread,
+        }
+        if s.args:
+            event["args"] = {k: str(v) for k, v in s.args.items()}
+        events.append(event)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
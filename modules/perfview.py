@@ -0,0 +1,120 @@
+# modules/perfview.py
+"""
+Performance window: summarises the spans recorded by modules.perf
+(generation stages, database calls, Excel reads) and exports them as a
+Chrome trace for chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
+
+from modules.perf import (
+    SPAN_BUFFER_SIZE,
+    clear_spans,
+    export_chrome_trace,
+    get_spans,
+    is_enabled,
+    set_enabled,
+    summarize_spans,
+)
+
+COLUMNS = (
+    ("category", "Category", 90),
+    ("name", "Name", 260),
+    ("count", "Calls", 70),
+    ("total", "Total (ms)", 100),
+    ("mean", "Mean (ms)", 100),
+    ("max", "Max (ms)", 100),
+)
+
+
+def open_performance_view(parent=None):
+    win = tk.Toplevel(parent)
+    win.title("Performance")
+    win.geometry("800x550")
+
+    tk.Label(win, text="Performance", font=("Arial", 14, "bold")).pack(pady=(10, 0))
+    status_var = tk.StringVar()
+    tk.Label(win, textvariable=status_var, fg="gray").pack(pady=(0, 5))
+
+    # Category filter
+    filter_frame = tk.Frame(win)
+    filter_frame.pack(fill="x", padx=10)
+    tk.Label(filter_frame, text="Show:").pack(side="left")
+    category_var = tk.StringVar(value="all")
+    for value, label in (("all", "All"), ("stage", "Generation stages"), ("db", "Database"), ("excel", "Excel")):
+        tk.Radiobutton(filter_frame, text=label, variable=category_var, value=value,
+                       command=lambda: refresh()).pack(side="left", padx=4)
+
+    # Summary table
+    table_frame = tk.Frame(win)
+    table_frame.pack(fill="both", expand=True, padx=10, pady=5)
+    tree = ttk.Treeview(table_frame, columns=[c[0] for c in COLUMNS], show="headings")
+    for key, heading, width in COLUMNS:
+        tree.heading(key, text=heading)
+        tree.column(key, width=width, anchor="w" if key in ("category", "name") else "e")
+    scrollbar = tk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+
+    def refresh():
+        spans = get_spans()
+        category = category_var.get()
+        if category != "all":
+            spans = [s for s in spans if s.category == category]
+        tree.delete(*tree.get_children())
+        for row in summarize_spans(spans):
+            tree.insert("", "end", values=(
+                row["category"],
+                row["name"],
+                row["count"],
+                f"{row['total'] * 1000:.1f}",
+                f"{row['mean'] * 1000:.2f}",
+                f"{row['max'] * 1000:.2f}",
+            ))
+        state = "recording" if is_enabled() else "paused"
+        status_var.set(f"{len(get_spans())} of {SPAN_BUFFER_SIZE} spans buffered ({state})")
+        toggle_btn.config(text="Pause Recording" if is_enabled() else "Resume Recording")
+
+    def clear():
+        clear_spans()
+        refresh()
+
+    def toggle():
+        set_enabled(not is_enabled())
+        refresh()
+
+    def export():
+        path = filedialog.asksaveasfilename(
+            parent=win,
+            title="Export Chrome Trace",
+            defaultextension=".json",
+            initialfile=f"docgen-trace-{datetime.now():%Y%m%d_%H%M%S}.json",
+            filetypes=[("Chrome trace", "*.json")],
+        )
+        if not path:
+            return
+        try:
+            count = export_chrome_trace(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e), parent=win)
+            return
+        messagebox.showinfo(
+            "Trace Exported",
+            f"Wrote {count} spans to:\n{path}\n\nOpen it in chrome://tracing or ui.perfetto.dev.",
+            parent=win,
+        )
+
+    btn_frame = tk.Frame(win)
+    btn_frame.pack(pady=10)
+    tk.Button(btn_frame, text="Refresh", command=refresh, width=12).pack(side="left", padx=4)
+    tk.Button(btn_frame, text="Clear", command=clear, width=12).pack(side="left", padx=4)
+    toggle_btn = tk.Button(btn_frame, command=toggle, width=16)
+    toggle_btn.pack(side="left", padx=4)
+    tk.Button(btn_frame, text="Export Chrome Trace", command=export, width=18).pack(side="left", padx=4)
+    tk.Button(btn_frame, text="Close", command=win.destroy, width=12).pack(side="left", padx=4)
+
+    refresh()
+    return win
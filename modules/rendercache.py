@@ -0,0 +1,326 @@
+# modules/rendercache.py
+"""
+Index of generated documents: reuse of identical renders and stale-output tracking.
+
+Just before a document is rendered, generate_document_from_template builds
+a fingerprint: the template's hash plus a hash of everything the render
+will consume (the resolved {{}} context, <<>> selections, and, when the
+document uses them, opposing counsel fields, grammar settings and rules,
+and [[bracket]] values). Finished outputs are indexed by fingerprint in
+data/renders.db; when a later render has the same fingerprint, the
+existing file is hard-linked (or copied where links are unsupported) to
+the new output name and rendering is skipped.
+
+Linked outputs share one file on disk, so an edit saved in place shows up
+under every name; generation itself always replaces an output file
+(modules.docbuffer.write_atomic) rather than writing into it. Set HARD_LINKS = False to copy instead.
+
+An indexed output is only reused while its size and modification time are
+what they were when it was indexed, so a document edited after generation
+is never handed out again. Documents with {@document-specific@} values are
+prompted every time and never reused.
+
+Every output, reused or not, also records the client variables it read
+while rendering, so find_stale_outputs() can list the documents that no
+longer match the client's data (Generate -> Regenerate Stale Documents).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from modules.template_cache import file_digest
+
+RENDERS_DB_PATH = Path("data/renders.db")
+# Bump when rendering changes in a way that makes old outputs wrong
+ENGINE_VERSION = 1
+HARD_LINKS = True
+
+_enabled = True
+_file_hashes = {}
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+def _connect():
+    RENDERS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(RENDERS_DB_PATH, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS render_outputs (
+            output_path TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            template TEXT NOT NULL,
+            template_hash TEXT NOT NULL,
+            client_id INTEGER,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_render_outputs_fingerprint ON render_outputs (fingerprint)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS render_inputs (
+            output_path TEXT PRIMARY KEY,
+            client_id INTEGER NOT NULL,
+            template TEXT NOT NULL,
+            template_hash TEXT NOT NULL,
+            grammar_override TEXT,
+            inputs TEXT NOT NULL,
+            rendered_at TEXT NOT NULL
+        )
+    ''')
+    return conn
+
+
+def file_hash(path):
+    """Content digest of a file, cached while its size and mtime are unchanged."""
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        digest = _file_hashes[key] = file_digest(path)
+    return digest
+
+
+def fingerprint(template_hash, inputs):
+    """Stable hash of a template hash plus a JSON-able description of the render inputs."""
+    payload = json.dumps(
+        {"engine": ENGINE_VERSION, "template": template_hash, "inputs": inputs},
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_output(fp):
+    """Path of an indexed, unmodified output with this fingerprint, or None."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT output_path, size, mtime_ns FROM render_outputs WHERE fingerprint=? ORDER BY created_at DESC",
+            (fp,),
+        ).fetchall()
+    finally:
+        conn.close()
+    for output_path, size, mtime_ns in rows:
+        try:
+            st = os.stat(output_path)
+        except OSError:
+            continue
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            return Path(output_path)
+    return None
+
+
+def record_output(fp, output_path, template_path, template_hash, client_id):
+    """Index a finished output under its fingerprint."""
+    st = os.stat(output_path)
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO render_outputs "
+            "(output_path, fingerprint, template, template_hash, client_id, size, mtime_ns, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(output_path), fp, str(template_path), template_hash, client_id,
+             st.st_size, st.st_mtime_ns, datetime.now().isoformat(timespec="seconds")),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def link_output(existing, output_path):
+    """
+    Make output_path the same document as existing: a hard link where the
+    filesystem allows it (and HARD_LINKS is set), otherwise a copy. Replaces output_path atomically.
+    """
+    existing, output_path = Path(existing), Path(output_path)
+    if output_path.exists() and os.path.samefile(existing, output_path):
+        return output_path
+    tmp = output_path.with_name(f".{output_path.name}.link")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        if not HARD_LINKS:
+            raise OSError("hard links disabled")
+        os.link(existing, tmp)
+    except OSError:
+        shutil.copy2(existing, tmp)
+    os.replace(tmp, output_path)
+    return output_path
+
+
+# ---------------------------
+# Consumed inputs (stale documents)
+# ---------------------------
+# Every output also records the inputs it actually read: the client
+# variables looked up while rendering (with their values at the time), the
+# opposing counsel fields it filled in, and digests of its template and the
+# grammar rules. find_stale_outputs() compares those with the current data.
+
+StaleOutput = namedtuple("StaleOutput", "output_path client_id template grammar_override reasons")
+
+
+class ConsumedVariables(dict):
+    """Client variables that remember every name looked up in them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read = set()
+
+    def __getitem__(self, name):
+        self.read.add(name)
+        return super().__getitem__(name)
+
+    def __contains__(self, name):
+        self.read.add(name)
+        return super().__contains__(name)
+
+    def get(self, name, default=None):
+        self.read.add(name)
+        return super().get(name, default)
+
+    def mark(self, names):
+        """Record names read elsewhere (e.g. straight from the database)."""
+        self.read.update(names)
+
+    def consumed(self):
+        return {name: dict.get(self, name) for name in sorted(self.read)}
+
+
+def digest(value):
+    """Short stable hash of a JSON-able value."""
+    payload = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _same(old, new):
+    # Missing and empty values are the same thing to the generator
+    return ("" if old in (None, "") else str(old)) == ("" if new in (None, "") else str(new))
+
+
+def record_inputs(output_path, template_path, client_id, inputs, grammar_override=None):
+    """
+    Remember what output_path was rendered from. inputs: {"client": {name:
+    value}, "counsel": [id, {field: value}] or None, "grammar_rules": digest
+    or None}.
+    """
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO render_inputs "
+            "(output_path, client_id, template, template_hash, grammar_override, inputs, rendered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(output_path), client_id, str(template_path), file_hash(template_path),
+             json.dumps(grammar_override) if grammar_override else None,
+             json.dumps(inputs, default=str), datetime.now().isoformat(timespec="seconds")),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def copy_inputs(source_path, output_path, template_path, client_id, client_vars, grammar_override=None):
+    """
+    Record the inputs of an output reused from source_path. The fingerprint
+    covers what was consumed, not whose data it was, so the source may
+    belong to another client: its counsel and grammar-rule inputs are kept,
+    but the client variables it read are looked up again in client_vars
+    (this render's ConsumedVariables) and recorded under client_id.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT inputs FROM render_inputs WHERE output_path=?", (str(source_path),)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return
+    inputs = json.loads(row[0])
+    client_vars.mark(inputs.get("client", {}))
+    inputs["client"] = client_vars.consumed()
+    record_inputs(output_path, template_path, client_id, inputs, grammar_override)
+
+
+def find_stale_outputs(client_ids=None):
+    """
+    [StaleOutput] for the newest existing output of each (client, template)
+    whose recorded inputs no longer match: a variable it read has a new
+    value, its opposing counsel changed, or its template or the grammar
+    rules were edited. Outputs whose template is gone are skipped.
+    """
+    from modules.db import (
+        get_client_counsel_id, get_grammar_rule_index, get_opposing_counsel_variables, get_variables,
+    )
+
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT output_path, client_id, template, template_hash, grammar_override, inputs "
+            "FROM render_inputs ORDER BY rendered_at DESC, rowid DESC"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    wanted = set(client_ids) if client_ids is not None else None
+    latest = {}
+    for row in rows:
+        output_path, client_id, template = row[:3]
+        if (wanted is not None and client_id not in wanted) or (client_id, template) in latest:
+            continue
+        if Path(output_path).exists() and Path(template).exists():
+            latest[(client_id, template)] = row
+
+    stale = []
+    client_values = {}
+    counsel_values = {}
+    rules_digest = None
+    for output_path, client_id, template, template_hash, grammar_override, inputs in latest.values():
+        inputs = json.loads(inputs)
+        reasons = []
+        if file_hash(template) != template_hash:
+            reasons.append("template changed")
+
+        if client_id not in client_values:
+            client_values[client_id] = get_variables("client", client_id)
+        current = client_values[client_id]
+        reasons.extend(name for name, old in inputs.get("client", {}).items() if not _same(old, current.get(name)))
+
+        if inputs.get("counsel"):
+            counsel_id, fields = inputs["counsel"]
+            if not _same(counsel_id, get_client_counsel_id(client_id)):
+                reasons.append("opposing counsel")
+            else:
+                if counsel_id not in counsel_values:
+                    try:
+                        data = get_opposing_counsel_variables(int(counsel_id))
+                    except Exception:
+                        data = {}
+                    counsel_values[counsel_id] = {k.lower(): v for k, v in data.items()}
+                reasons.extend(f"(({name}))" for name, old in fields.items()
+                               if not _same(old, counsel_values[counsel_id].get(name)))
+
+        if inputs.get("grammar_rules"):
+            if rules_digest is None:
+                rules_digest = digest(get_grammar_rule_index())
+            if inputs["grammar_rules"] != rules_digest:
+                reasons.append("grammar rules")
+
+        if reasons:
+            stale.append(StaleOutput(
+                output_path, client_id, template,
+                json.loads(grammar_override) if grammar_override else None, reasons,
+            ))
+    stale.sort(key=lambda s: (s.client_id, s.template))
+    return stale
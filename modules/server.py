@@ -0,0 +1,333 @@
+# modules/server.py
+"""
+Optional client/server mode.
+
+One process owns data/clients.db and serves the modules/db.py operations
+and headless document generation over HTTP/JSON, so several desktops can
+share a matter database without opening the SQLite file over a network
+drive. Desktops connect with modules/dbclient.py (set DOCGEN_SERVER).
+
+    python -m modules.server --host 0.0.0.0 --port 8765 --token s3cret
+
+The server only binds a non-loopback interface when a token is set, since
+every endpoint reads or writes client data.
+
+Endpoints (JSON in, JSON out, except the document download):
+
+    GET  /api/health         {"ok": true, "db": ..., "fts": ...}
+    GET  /api/ops            {"read": [...], "write": [...]}
+    GET  /api/revisions      {"concat": ..., "grammar": ...}
+    POST /api/db/<op>        {"args": [...], "kwargs": {...}} -> {"result": ...}
+    POST /api/generate       {"template", "client_id", "answers", "grammar", "counsel_id"}
+                             -> {"output", "download", "messages", "prompted"}
+    GET  /api/output/<name>  the bytes of a generated document
+
+"output" is the document's name inside the server's output_documents/ and
+"download" the URL path to fetch it from; nothing outside that directory
+can be downloaded. /api/revisions changes whenever concat variables or
+grammar rules are written, so desktops know when their cached copies of
+those tables are stale (see dbclient.install).
+
+Each request runs on its own thread. Reads run concurrently (the database
+is switched to WAL so they are not blocked by a writer); write operations
+and generation hold one lock, so writes are applied one at a time.
+Errors come back as {"error": message, "type": exception class} with a
+4xx/5xx status.
+
+Derived variables are evaluated with eval() wherever client variables are
+read, so set_variable_meta only accepts a derived expression that joins
+existing variable names and string literals with + (see
+check_derived_expression); anything else is refused with 403.
+"""
+
+import argparse
+import ast
+import hmac
+import inspect
+import ipaddress
+import json
+import shutil
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from modules import db
+from modules.perf import span
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TEMPLATES_DIR = Path("templates")
+OUTPUT_DIR = Path("output_documents")
+MAX_BODY_BYTES = 64 * 1024 * 1024
+TOKEN_HEADER = "X-DocGen-Token"
+
+READ_OPS = (
+    "list_clients", "list_client_label_fields", "get_client", "get_client_grammar_fields",
+    "get_client_counsel_id", "list_clients_for_counsel",
+    "get_variables", "get_all_variables_for_client", "get_variable_value_for_client",
+    "get_variable_meta", "list_all_variable_meta", "variable_exists",
+    "list_opposing_counsel", "get_opposing_counsel", "get_opposing_counsel_by_name",
+    "get_opposing_counsel_variables",
+    "list_all_concats", "list_grammar_rules",
+    "search_clients", "search_opposing_counsel",
+)
+WRITE_OPS = (
+    "create_client", "delete_client", "set_client_counsel_id",
+    "set_variable", "compare_and_set_variables", "bulk_import_clients",
+    "set_variable_meta", "delete_variable",
+    "create_opposing_counsel", "update_opposing_counsel", "delete_opposing_counsel",
+    "set_concat_variable", "delete_concat_variable",
+    "set_grammar_rule", "delete_grammar_rule",
+)
+# Tables desktops keep a local copy of, and the writes that change them
+CACHED_TABLES = {
+    "concat": ("set_concat_variable", "delete_concat_variable"),
+    "grammar": ("set_grammar_rule", "delete_grammar_rule"),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def check_derived_expression(expression, known_names):
+    """
+    Raise ApiError (403) unless expression is a + join of known variable
+    names and string literals, e.g. firstname + ' ' + lastname.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        raise ApiError(403, f"Derived expression is not valid: {expression!r}")
+    pending = [tree.body]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            pending += (node.left, node.right)
+        elif isinstance(node, ast.Name) and node.id in known_names:
+            continue
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            continue
+        else:
+            raise ApiError(403, "Derived expressions sent to the server may only join "
+                                f"existing variables and quoted text with +: {expression!r}")
+
+
+class DocGenServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, token=None):
+        super().__init__(address, DocGenRequestHandler)
+        self.token = token
+        self.write_lock = threading.Lock()
+        # A new prefix per run, so a restarted server never repeats a revision
+        self._instance = uuid.uuid4().hex[:8]
+        self._revisions = dict.fromkeys(CACHED_TABLES, 0)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def run_op(self, op, args, kwargs):
+        if op in READ_OPS:
+            func = getattr(db, op)
+            with span(op, "server"):
+                return func(*args, **kwargs)
+        if op in WRITE_OPS:
+            func = getattr(db, op)
+            if op == "set_variable_meta":
+                self._check_variable_meta(func, args, kwargs)
+            with self.write_lock, span(op, "server", write=True):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    for table, writes in CACHED_TABLES.items():
+                        if op in writes:
+                            self._revisions[table] += 1
+        raise ApiError(404, f"Unknown operation: {op}")
+
+    @staticmethod
+    def _check_variable_meta(func, args, kwargs):
+        try:
+            call = inspect.signature(func).bind(*args, **kwargs)
+        except TypeError as e:
+            raise ApiError(400, str(e))
+        if "conn" in call.arguments:
+            raise ApiError(400, "conn cannot be passed to the server")
+        expression = call.arguments.get("derived_expression")
+        if expression:
+            known = {m["var_name"] for m in db.list_all_variable_meta()} - {call.arguments["var_name"]}
+            check_derived_expression(str(expression), known)
+        elif call.arguments.get("is_derived"):
+            raise ApiError(403, "A derived variable needs a derived_expression")
+
+    def revisions(self):
+        return {table: f"{self._instance}-{n}" for table, n in self._revisions.items()}
+
+    def generate(self, request):
+        from modules.docgen import generate_document_from_template
+        from modules.headless import headless_prompts
+
+        template = (TEMPLATES_DIR / str(request.get("template", ""))).resolve()
+        if TEMPLATES_DIR.resolve() not in template.parents or not template.is_file():
+            raise ApiError(404, f"Template not found: {request.get('template')}")
+        try:
+            client_id = int(request["client_id"])
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "client_id is required")
+
+        # Generation stores prompted values, and the headless prompts are process-wide
+        with self.write_lock, span("generate", "server", template=template.name, client_id=client_id):
+            with headless_prompts(
+                answers=request.get("answers"), grammar=request.get("grammar"),
+                counsel_id=request.get("counsel_id"),
+            ) as session:
+                output = generate_document_from_template(template, client_id)
+        name = download = None
+        if output:
+            name = Path(output).resolve().relative_to(OUTPUT_DIR.resolve()).as_posix()
+            download = f"/api/output/{quote(name)}"
+        return {"output": name, "download": download, "messages": session.messages, "prompted": session.prompted}
+
+    def output_path(self, name):
+        """The generated document called name, refusing anything outside OUTPUT_DIR."""
+        path = (OUTPUT_DIR / unquote(name)).resolve()
+        if OUTPUT_DIR.resolve() not in path.parents or not path.is_file():
+            raise ApiError(404, f"Output not found: {unquote(name)}")
+        return path
+
+
+class DocGenRequestHandler(BaseHTTPRequestHandler):
+    server_version = "DocGenServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- plumbing ---
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Request body too large")
+        if not length:
+            return {}
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise ApiError(400, f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+        return payload
+
+    def _handle(self, method):
+        try:
+            token = self.server.token
+            supplied = (self.headers.get(TOKEN_HEADER) or "").encode("utf-8")
+            if token and not hmac.compare_digest(supplied, token.encode("utf-8")):
+                raise ApiError(401, "Missing or invalid token")
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if method == "GET" and path.startswith("/api/output/"):
+                self._send_file(self.server.output_path(path[len("/api/output/"):]))
+                return
+            self._send(200, self._route(method, path))
+        except ApiError as e:
+            self._send(e.status, {"error": str(e), "type": "ApiError"})
+        except TypeError as e:
+            # Almost always a bad argument list for the operation
+            self._send(400, {"error": str(e), "type": type(e).__name__})
+        except Exception as e:
+            self._send(500, {"error": str(e), "type": type(e).__name__})
+
+    def _route(self, method, path):
+        if method == "GET" and path == "/api/health":
+            return {"ok": True, "db": str(db.DB_PATH), "fts": bool(db.fts_available())}
+        if method == "GET" and path == "/api/ops":
+            return {"read": list(READ_OPS), "write": list(WRITE_OPS)}
+        if method == "GET" and path == "/api/revisions":
+            return self.server.revisions()
+        if method == "POST" and path.startswith("/api/db/"):
+            request = self._read_json()
+            args, kwargs = request.get("args") or [], request.get("kwargs") or {}
+            if not isinstance(args, list) or not isinstance(kwargs, dict):
+                raise ApiError(400, "args must be a list and kwargs an object")
+            return {"result": self.server.run_op(path[len("/api/db/"):], args, kwargs)}
+        if method == "POST" and path == "/api/generate":
+            return self.server.generate(self._read_json())
+        raise ApiError(404, f"Not found: {method} {path}")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, db_path=None, token=None):
+    """
+    Prepare the database and return a DocGenServer bound to host:port
+    (port 0 picks a free port; see server.url). Call serve_forever() on it,
+    or run it on a thread for tests. Raises ValueError for a host other
+    than loopback without a token.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve on {host or 'all interfaces'} without a token (--token)")
+    if db_path is not None:
+        db.DB_PATH = Path(db_path)
+    db.create_db()
+    conn = db.sqlite3.connect(db.DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    return DocGenServer((host, port), token=token)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the client database and document generation over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"interface to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", type=Path, default=db.DB_PATH, help=f"database file (default: {db.DB_PATH})")
+    parser.add_argument("--token", help=f"require this value in the {TOKEN_HEADER} header")
+    args = parser.parse_args(argv)
+
+    try:
+        server = make_server(args.host, args.port, args.db, args.token)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Serving {db.DB_PATH} on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
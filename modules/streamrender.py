@@ -0,0 +1,428 @@
+# modules/streamrender.py
+"""
+Memory-bounded output for documents with very long numbered lists.
+
+A multi-entry <<variable>> (discovery responses, affirmative defenses) can
+expand into thousands of paragraphs. Expanded in the python-docx tree, every
+later pass (docxtpl, counsel, grammar, bracket) would load, copy and save
+the whole thing. In streaming mode generate_document_from_template leaves
+such <<token>>s in place until the very end, so those passes only ever see
+a template-sized document. The write step then rewrites the package once:
+
+    expand_lists(document, output_file, {"AffirmativeDefense": items})
+
+word/document.xml (and any header/footer) is read with lxml.etree.iterparse
+one top-level block (paragraph or table) at a time and written with
+lxml.etree.xmlfile. The list paragraphs are generated as each block is
+written and then dropped, and the output zip entry is written as it goes.
+Peak memory is therefore set by the largest single block, not by how many
+paragraphs the list produces; benchmarks/bench_memory.py shows the ceiling.
+
+The same helpers (expand_paragraph, ListNumbering) expand shorter lists in
+the python-docx tree, in replace_dynamic_variables_in_document. Lists are
+real Word numbering (w:numPr), each restarted at 1.
+
+should_stream() decides which values take this path: numbered lists of at
+least STREAM_MIN_ITEMS items whose text holds no tokens for the skipped
+passes other than [[bracket]] variables (those are applied per item through
+item_filter).
+"""
+
+import posixpath
+import re
+import shutil
+import zipfile
+from copy import deepcopy
+from datetime import datetime
+from itertools import chain, islice
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.oxml import parse_xml
+from docx.parts.numbering import NumberingPart
+from lxml import etree
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+PKG_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+NUMBERING_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering"
+NUMBERING_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"
+# Streaming costs a fixed ~30 MB more than the python-docx tree, whose peak
+# grows with the list (benchmarks/bench_memory.py: the two meet near 5000
+# items, 143.0 vs 141.9 MB; at 20000 the tree peaks ~85 MB higher). Shorter
+# lists stay in the tree, which uses less memory for them
+STREAM_MIN_ITEMS = 5000
+LIST_INDENT_TWIPS = 720  # 0.5"
+LIST_HANGING_TWIPS = 360
+# w:name of the list definition generated lists share
+LIST_NUMBERING_NAME = "DocgenNumberedList"
+
+_STREAMED_PARTS = re.compile(r"word/(document|header\d*|footer\d*)\.xml")
+_CONTAINERS = {f"{{{W}}}{tag}" for tag in ("document", "body", "hdr", "ftr")}
+# Tokens the passes between the dynamic step and the write step would handle
+_LATER_TOKENS = re.compile(r"<<|\{\{|\{%|\(\(|\(@|\{@")
+_XMLNS_RE = re.compile(rb'\sxmlns:([A-Za-z0-9_.-]+)="([^"]*)"')
+
+# w:pPr children in schema order (only the ones list paragraphs set or keep after)
+_PPR_ORDER = [f"{{{W}}}{tag}" for tag in (
+    "pStyle", "keepNext", "keepLines", "pageBreakBefore", "framePr", "widowControl", "numPr",
+    "suppressLineNumbers", "pBdr", "shd", "tabs", "suppressAutoHyphens", "kinsoku", "wordWrap",
+    "overflowPunct", "topLinePunct", "autoSpaceDE", "autoSpaceDN", "bidi", "adjustRightInd",
+    "snapToGrid", "spacing", "ind", "contextualSpacing", "mirrorIndents", "suppressOverlap", "jc",
+    "textDirection", "textAlignment", "textboxTightWrap", "outlineLvl", "divId", "cnfStyle", "rPr",
+    "sectPr", "pPrChange",
+)]
+
+
+def _w(tag):
+    return f"{{{W}}}{tag}"
+
+
+def _element(tag):
+    return etree.Element(_w(tag), nsmap={"w": W})
+
+
+def list_items(value):
+    """
+    Items of a numbered-list value, without the "1. ", "2. ", ... the prompt
+    puts in front of each (Word numbers the paragraphs itself).
+    """
+    items = value.split("\n")
+    for i, item in enumerate(items):
+        prefix = f"{i + 1}. "
+        if item.startswith(prefix):
+            items[i] = item[len(prefix):]
+    return items
+
+
+def should_stream(var_data, value):
+    """True if this <<variable>>'s (transformed) value should be expanded at write time."""
+    if not var_data.get("use_numbered_list") or "\n" not in value:
+        return False
+    return value.count("\n") + 1 >= STREAM_MIN_ITEMS and not _LATER_TOKENS.search(value)
+
+
+# ---------------------------
+# List paragraphs
+# ---------------------------
+def set_ppr_child(ppr, child):
+    """Put child into w:pPr, replacing any element with the same tag, in schema order."""
+    existing = ppr.find(child.tag)
+    if existing is not None:
+        ppr.replace(existing, child)
+        return child
+    rank = _PPR_ORDER.index(child.tag)
+    for position, sibling in enumerate(ppr):
+        if sibling.tag in _PPR_ORDER and _PPR_ORDER.index(sibling.tag) > rank:
+            ppr.insert(position, child)
+            return child
+    ppr.append(child)
+    return child
+
+
+class ListNumbering:
+    """
+    Numbering definitions for generated lists, kept in a document's
+    w:numbering element: one shared "1." list definition (w:abstractNum),
+    and one w:num per list, restarted at 1, so every list counts from 1.
+    """
+
+    def __init__(self, numbering):
+        self.element = numbering
+        self.added = 0
+        self._abstract_id = None
+        self._next_num_id = None
+
+    def _list_definition(self):
+        abstracts = list(self.element.iterchildren(_w("abstractNum")))
+        for abstract in abstracts:
+            name = abstract.find(_w("name"))
+            if name is not None and name.get(_w("val")) == LIST_NUMBERING_NAME:
+                return abstract.get(_w("abstractNumId"))
+        abstract_id = str(max((int(a.get(_w("abstractNumId"))) for a in abstracts), default=-1) + 1)
+        abstract = etree.fromstring(
+            f'<w:abstractNum xmlns:w="{W}" w:abstractNumId="{abstract_id}">'
+            f'<w:multiLevelType w:val="singleLevel"/><w:name w:val="{LIST_NUMBERING_NAME}"/>'
+            f'<w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="decimal"/>'
+            f'<w:lvlText w:val="%1."/><w:lvlJc w:val="left"/>'
+            f'<w:pPr><w:ind w:left="{LIST_INDENT_TWIPS}" w:hanging="{LIST_HANGING_TWIPS}"/></w:pPr></w:lvl>'
+            f'</w:abstractNum>'
+        )
+        # Schema order: every w:abstractNum comes before the first w:num
+        first_num = self.element.find(_w("num"))
+        if first_num is not None:
+            first_num.addprevious(abstract)
+        else:
+            self.element.append(abstract)
+        return abstract_id
+
+    def new_list(self):
+        """numId of a new list instance, numbered from 1."""
+        if self._abstract_id is None:
+            self._abstract_id = self._list_definition()
+            self._next_num_id = max(
+                (int(n.get(_w("numId"))) for n in self.element.iterchildren(_w("num"))), default=0
+            ) + 1
+        num_id = str(self._next_num_id)
+        self._next_num_id += 1
+        num = etree.fromstring(
+            f'<w:num xmlns:w="{W}" w:numId="{num_id}"><w:abstractNumId w:val="{self._abstract_id}"/>'
+            f'<w:lvlOverride w:ilvl="0"><w:startOverride w:val="1"/></w:lvlOverride></w:num>'
+        )
+        cleanup = self.element.find(_w("numIdMacAtCleanup"))
+        if cleanup is not None:
+            cleanup.addprevious(num)
+        else:
+            self.element.append(num)
+        self.added += 1
+        return num_id
+
+
+def format_list_paragraph(p, num_id):
+    """Make p an item of list num_id: real Word numbering, indented by the list level, left-aligned."""
+    ppr = p.find(_w("pPr"))
+    if ppr is None:
+        ppr = _element("pPr")
+        p.insert(0, ppr)
+    num_pr = _element("numPr")
+    etree.SubElement(num_pr, _w("ilvl")).set(_w("val"), "0")
+    etree.SubElement(num_pr, _w("numId")).set(_w("val"), num_id)
+    set_ppr_child(ppr, num_pr)
+    # Direct indents would override the list level's hanging indent
+    for ind in ppr.findall(_w("ind")):
+        ppr.remove(ind)
+    jc = _element("jc")
+    jc.set(_w("val"), "left")
+    set_ppr_child(ppr, jc)
+    return ppr
+
+
+def list_paragraphs(p, run, items):
+    """
+    New w:p elements for items, formatted like p (its paragraph properties)
+    and run (its character formatting), in item order. A generator, so a
+    streaming writer holds one item's paragraph at a time.
+    """
+    ppr = p.find(_w("pPr"))
+    if ppr is not None:
+        ppr = deepcopy(ppr)
+        # The section break stays with the list's last paragraph (see expand_paragraph)
+        for sect_pr in ppr.findall(_w("sectPr")):
+            ppr.remove(sect_pr)
+    rpr = run.find(_w("rPr")) if run is not None else None
+    for item in items:
+        new_p = _element("p")
+        if ppr is not None:
+            new_p.append(deepcopy(ppr))
+        new_run = etree.SubElement(new_p, _w("r"))
+        if rpr is not None:
+            new_run.append(deepcopy(rpr))
+        text = etree.SubElement(new_run, _w("t"))
+        text.text = item
+        if item != item.strip():
+            text.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+        yield new_p
+
+
+def _ending_section(paragraphs, sect_pr):
+    """paragraphs, with sect_pr moved into the last one's w:pPr."""
+    previous = None
+    for paragraph in paragraphs:
+        if previous is not None:
+            yield previous
+        previous = paragraph
+    ppr = previous.find(_w("pPr"))
+    if ppr is None:
+        ppr = _element("pPr")
+        previous.insert(0, ppr)
+    set_ppr_child(ppr, sect_pr)
+    yield previous
+
+
+def expand_paragraph(p, lists, numbering, item_filter=None):
+    """
+    Replace each <<token>> of lists found in paragraph p with its first item
+    and number p as a new list of numbering (a ListNumbering). Returns an
+    iterator over the paragraphs for the remaining items (in order, created
+    as they are consumed and not attached to the tree): splice them after p
+    with one addnext chain, or write them out after it.
+    """
+    groups = []
+    for token, items in lists.items():
+        pattern = f"<<{token}>>"
+        if pattern not in "".join(t.text or "" for t in p.iter(_w("t"))):
+            continue
+        first = item_filter(items[0]) if item_filter else items[0]
+        rest = islice(items, 1, None)
+        if item_filter:
+            rest = map(item_filter, rest)
+        token_run = None
+        for run in p.iterchildren(_w("r")):
+            for text in run.iterchildren(_w("t")):
+                if text.text and pattern in text.text:
+                    text.text = text.text.replace(pattern, first)
+                    token_run = run
+        format_list_paragraph(p, numbering.new_list())
+        if len(items) > 1:
+            groups.append(list_paragraphs(p, token_run, rest))
+    added = chain.from_iterable(groups)
+    sect_pr = p.find(f"{_w('pPr')}/{_w('sectPr')}") if groups else None
+    if sect_pr is not None:
+        sect_pr.getparent().remove(sect_pr)
+        added = _ending_section(added, sect_pr)
+    return added
+
+
+def expand_block(block, lists, numbering, item_filter=None):
+    """Expand the lists in a top-level block; returns the elements to write in its place."""
+    if block.tag == _w("p"):
+        return chain([block], expand_paragraph(block, lists, numbering, item_filter))
+    for p in list(block.iter(_w("p"))):
+        anchor = p
+        for new_p in expand_paragraph(p, lists, numbering, item_filter):
+            anchor.addnext(new_p)
+            anchor = new_p
+    return [block]
+
+
+# ---------------------------
+# Streaming rewrite
+# ---------------------------
+def _serialize(element, declared):
+    """Element XML without the namespace declarations its written ancestors already make."""
+    xml = etree.tostring(element, encoding="UTF-8")
+    end = xml.index(b">")
+    start_tag = _XMLNS_RE.sub(
+        lambda m: b"" if declared.get(m.group(1).decode()) == m.group(2).decode() else m.group(0),
+        xml[:end],
+    )
+    return start_tag + xml[end:]
+
+
+def stream_part(source, target, transform):
+    """
+    Copy one WordprocessingML part from the source stream to the target
+    stream, passing every child of w:body (or w:hdr/w:ftr) through
+    transform(element) -> elements to write. Only one block is held at a time.
+    """
+    with etree.xmlfile(target, encoding="UTF-8") as xf:
+        xf.write_declaration(standalone=True)
+        contexts = []
+        declared = {}
+        for event, el in etree.iterparse(source, events=("start", "end"), huge_tree=True):
+            parent = el.getparent()
+            in_container = parent is None or (contexts and parent is contexts[-1][0])
+            if event == "start":
+                if el.tag in _CONTAINERS and in_container:
+                    context = xf.element(el.tag, dict(el.attrib), nsmap=el.nsmap if parent is None else None)
+                    context.__enter__()
+                    contexts.append((el, context))
+                    declared.update((prefix, uri) for prefix, uri in el.nsmap.items() if prefix)
+                continue
+            if contexts and el is contexts[-1][0]:
+                contexts.pop()[1].__exit__(None, None, None)
+                continue
+            if not in_container:
+                continue
+            # Blocks are written as raw XML between xmlfile's own output
+            xf.flush()
+            for block in transform(el):
+                target.write(_serialize(block, declared))
+            el.clear()
+            parent.remove(el)
+
+
+def expand_lists(source, target, lists, item_filter=None):
+    """
+    Write the .docx in source (path or buffer) to target (path or binary
+    file) with every <<token>> in lists expanded into its items (see
+    module docstring). item_filter(text) is applied to each item.
+    """
+    lists = {token: items for token, items in lists.items() if items}
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zout:
+        numbering_name, numbering_root, replaced = _numbering_part(zin)
+        numbering = ListNumbering(numbering_root)
+
+        def transform(block):
+            return expand_block(block, lists, numbering, item_filter)
+
+        for info in zin.infolist():
+            if info.filename == numbering_name:
+                continue
+            if info.filename in replaced:
+                zout.writestr(_copy_info(info), replaced[info.filename])
+                continue
+            with zin.open(info) as src, zout.open(_copy_info(info), "w", force_zip64=True) as dst:
+                if _STREAMED_PARTS.fullmatch(info.filename):
+                    stream_part(src, dst, transform)
+                else:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+        # Written last, once every list has its w:num
+        if numbering_name in zin.namelist():
+            numbering_info = _copy_info(zin.getinfo(numbering_name))
+        else:
+            numbering_info = zipfile.ZipInfo(numbering_name, date_time=datetime.now().timetuple()[:6])
+            numbering_info.compress_type = zipfile.ZIP_DEFLATED
+        zout.writestr(numbering_info, _xml_bytes(numbering.element))
+    return target
+
+
+def _xml_bytes(element):
+    return etree.tostring(element, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _numbering_part(zin):
+    """
+    (part name, w:numbering element, {part name: new bytes}) for the
+    package's numbering part. A package without one gets an empty
+    word/numbering.xml, plus the relationship and content type that add it.
+    """
+    rels_name = "word/_rels/document.xml.rels"
+    rels = etree.fromstring(zin.read(rels_name))
+    for rel in rels.iterchildren(f"{{{PKG_RELS}}}Relationship"):
+        if rel.get("Type") == NUMBERING_REL and rel.get("TargetMode") != "External":
+            target = rel.get("Target")
+            name = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join("word", target))
+            return name, etree.fromstring(zin.read(name)), {}
+
+    name = "word/numbering.xml"
+    ids = {rel.get("Id") for rel in rels}
+    n = len(ids) + 1
+    while f"rId{n}" in ids:
+        n += 1
+    etree.SubElement(rels, f"{{{PKG_RELS}}}Relationship", Id=f"rId{n}", Type=NUMBERING_REL, Target="numbering.xml")
+    types = etree.fromstring(zin.read("[Content_Types].xml"))
+    etree.SubElement(types, f"{{{CONTENT_TYPES}}}Override", PartName=f"/{name}", ContentType=NUMBERING_CONTENT_TYPE)
+    replaced = {rels_name: _xml_bytes(rels), "[Content_Types].xml": _xml_bytes(types)}
+    return name, _element("numbering"), replaced
+
+
+def document_numbering(doc):
+    """
+    The w:numbering element of a python-docx Document, for ListNumbering.
+    As in _numbering_part, a document without a numbering part gets an empty
+    word/numbering.xml and the relationship to it; python-docx writes its
+    content type when the document is saved.
+    """
+    part = doc.part
+    try:
+        return part.part_related_by(RT.NUMBERING).element
+    except KeyError:
+        pass
+    # python-docx's own fallback (NumberingPart.new) is not implemented
+    numbering = NumberingPart(
+        PackURI("/word/numbering.xml"), NUMBERING_CONTENT_TYPE,
+        parse_xml(f'<w:numbering xmlns:w="{W}"/>'), part.package,
+    )
+    part.relate_to(numbering, RT.NUMBERING)
+    return numbering.element
+
+
+def _copy_info(info):
+    copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    copy.compress_type = zipfile.ZIP_DEFLATED
+    copy.external_attr = info.external_attr
+    return copy
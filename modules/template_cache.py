@@ -0,0 +1,190 @@
+# modules/template_cache.py
+"""
+docxtpl integration layer with a shared, caching Jinja environment.
+
+docxtpl compiles every XML part with a fresh Jinja template each time a
+document is rendered, and get_undeclared_template_variables() re-parses the
+whole document on every call. For batch runs the same template XML is
+compiled over and over. This module keeps:
+
+- one Jinja Environment for the whole process, with an in-memory LRU of
+  compiled templates and an on-disk bytecode cache (data/jinja_cache/)
+  holding at most BYTECODE_CACHE_SIZE files, oldest removed first
+- a bounded LRU of the undeclared-variable analysis, keyed by template
+  path and modification time (or by content for an edited in-memory working
+  copy), so it is computed once per template instead of once per client.
+  An edited template gets a new key; the old entry simply ages out
+
+Compiled templates are keyed by a hash of the patched XML source, so a
+working copy whose XML is unchanged (no <<dynamic>> substitutions) reuses
+the template compiled for the previous client, while a changed working copy
+simply compiles a new entry.
+"""
+
+import fnmatch
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, TemplateNotFound
+
+BYTECODE_CACHE_DIR = Path("data/jinja_cache")
+COMPILED_CACHE_SIZE = 400
+BYTECODE_CACHE_SIZE = 400
+UNDECLARED_CACHE_SIZE = 200
+
+_env = None
+_undeclared_cache = OrderedDict()
+
+
+class _SourceLoader(BaseLoader):
+    """Loader serving XML sources registered just before they are compiled."""
+
+    def __init__(self):
+        self.sources = {}
+
+    def get_source(self, environment, template):
+        source = self.sources.get(template)
+        if source is None:
+            raise TemplateNotFound(template)
+        # Keys are content hashes, so a cached template is always up to date
+        return source, None, lambda: True
+
+
+class _BoundedBytecodeCache(FileSystemBytecodeCache):
+    """
+    FileSystemBytecodeCache that keeps at most max_files files on disk.
+
+    A working copy with <<dynamic>> substitutions compiles to its own XML
+    source, so without a bound every such render would leave one more file
+    behind. Files already on disk are counted (and pruned) when the cache
+    is created; after that the least recently used file goes first.
+    """
+
+    def __init__(self, directory, max_files):
+        super().__init__(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        names = fnmatch.filter(os.listdir(directory), self.pattern % ("*",))
+        paths = sorted((os.path.join(directory, name) for name in names), key=_mtime)
+        self._files = OrderedDict.fromkeys(paths)
+        with self._lock:
+            self._prune()
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is not None:
+            filename = self._get_cache_filename(bucket)
+            with self._lock:
+                self._files[filename] = None
+                self._files.move_to_end(filename)
+
+    def dump_bytecode(self, bucket):
+        super().dump_bytecode(bucket)
+        filename = self._get_cache_filename(bucket)
+        with self._lock:
+            self._files[filename] = None
+            self._files.move_to_end(filename)
+            self._prune()
+
+    def _prune(self):
+        while len(self._files) > self.max_files:
+            path, _ = self._files.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+class CachingEnvironment(Environment):
+    """
+    Jinja Environment whose from_string() goes through the loader cache.
+
+    docxtpl only ever calls from_string(), which Jinja never caches; routing
+    it through get_template() gives us the compiled-template LRU and the
+    bytecode cache for free.
+    """
+
+    def from_string(self, source, globals=None, template_class=None):
+        if template_class is not None:
+            return super().from_string(source, globals, template_class)
+        key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        self.loader.sources[key] = source
+        try:
+            return self.get_template(key, globals=globals)
+        finally:
+            # The compiled template now lives in self.cache; drop the raw XML
+            self.loader.sources.pop(key, None)
+
+
+def get_jinja_env():
+    """Return the process-wide caching Jinja environment."""
+    global _env
+    if _env is None:
+        bytecode_cache = None
+        try:
+            BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = _BoundedBytecodeCache(str(BYTECODE_CACHE_DIR), BYTECODE_CACHE_SIZE)
+        except OSError:
+            pass
+        _env = CachingEnvironment(
+            loader=_SourceLoader(),
+            cache_size=COMPILED_CACHE_SIZE,
+            bytecode_cache=bytecode_cache,
+        )
+    return _env
+
+
+def file_digest(path):
+    """SHA-1 of a file's bytes (or an in-memory buffer's), used to key per-template caches."""
+    if hasattr(path, "getbuffer"):
+        return hashlib.sha1(path.getbuffer()).hexdigest()
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def template_key(path):
+    """
+    Cache key for a template: (path, mtime, size) for a file on disk, or the
+    content digest for an in-memory buffer, which has no path to stat.
+    """
+    if hasattr(path, "getbuffer"):
+        return ("buffer", file_digest(path))
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def get_undeclared_variables(tpl, template_path):
+    """
+    Cached tpl.get_undeclared_template_variables().
+
+    Keyed by template_key(template_path), so every client rendered from an
+    unmodified template shares a single Jinja parse.
+    """
+    key = template_key(template_path)
+    cached = _undeclared_cache.get(key)
+    if cached is None:
+        cached = frozenset(tpl.get_undeclared_template_variables(jinja_env=get_jinja_env()))
+        _undeclared_cache[key] = cached
+        if len(_undeclared_cache) > UNDECLARED_CACHE_SIZE:
+            _undeclared_cache.popitem(last=False)
+    else:
+        _undeclared_cache.move_to_end(key)
+    return set(cached)
+
+
+def render_template(tpl, context):
+    """Render a DocxTemplate through the shared caching environment."""
+    tpl.render(context, jinja_env=get_jinja_env())
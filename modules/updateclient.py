@@ -1,18 +1,22 @@
 # modules/updateclient.py
 import tkinter as tk
 from tkinter import messagebox, font
-import openpyxl
 
 from modules.db import (
     list_clients,
-    set_variable,
+    compare_and_set_variables,
+    get_client_counsel_id,
+    set_client_counsel_id,
     get_variable_meta,
     set_variable_meta,
     delete_client,
     get_all_variables_for_client,
-    list_all_variable_meta,
     get_variables,
 )
+from modules.intake import iter_intake_records
+from modules.coercion import coerce_records
+from modules.clientpicker import format_client_label, pick_client
+from modules.variablegrid import ALL_CATEGORIES, VariableGrid
 
 INTAKE_XLSX = "intake.xlsx"
 INTAKE_SHEET = "IntakeSheet"
@@ -23,109 +27,26 @@ INTAKE_SHEET = "IntakeSheet"
 # -------------------------------------------------
 def build_client_label(client_id):
     vars_ = get_variables("client", client_id)
-    matterid = vars_.get("matterid", "")
-    first = vars_.get("firstname", "")
-    last = vars_.get("lastname", "")
-
-    name = " ".join(p for p in [first, last] if p).strip()
-    label = f"ID-{client_id}"
-    if matterid:
-        label = f"({matterid}) - {label}"
-    if name:
-        label += f" - {name}"
-    return label
+    return format_client_label(
+        client_id, vars_.get("matterid", ""), vars_.get("firstname", ""), vars_.get("lastname", "")
+    )
 
 
 # -------------------------------------------------
 # Client selection popup
 # -------------------------------------------------
 def select_client(clients):
-    selected_id = tk.IntVar(value=-1)
-    cancelled = tk.BooleanVar(value=False)
-
-    popup = tk.Toplevel()
-    popup.title("Select Client")
-    popup.geometry("450x450")
-    popup.grab_set()
-
-    tk.Label(popup, text="Search Client:").pack(pady=(10, 0))
-    search_var = tk.StringVar()
-
-    list_frame = tk.Frame(popup)
-    list_frame.pack(fill="both", expand=True, padx=10)
-
-    client_ids = [c[0] for c in clients]
-
-    def update_list(*_):
-        term = search_var.get().lower().strip()
-        for w in list_frame.winfo_children():
-            w.destroy()
-
-        matches = []
-        for cid in client_ids:
-            label = build_client_label(cid)
-            if not term or term in label.lower():
-                matches.append((cid, label))
-
-        if not matches:
-            tk.Label(list_frame, text="No matches found").pack(anchor="w")
-            return
-
-        for cid, label in matches:
-            tk.Radiobutton(
-                list_frame,
-                text=label,
-                variable=selected_id,
-                value=cid,
-                wraplength=380,
-            ).pack(anchor="w")
-
-    search_var.trace_add("write", update_list)
-
-    tk.Entry(popup, textvariable=search_var, width=50).pack(pady=5)
-    update_list()
-    tk.Entry(popup, textvariable=search_var, width=50).focus_set()
-
-    def submit():
-        if selected_id.get() == -1:
-            messagebox.showwarning("Select Client", "No client selected.", parent=popup)
-            return
-        popup.destroy()
-
-    def cancel():
-        cancelled.set(True)
-        popup.destroy()
-
-    btns = tk.Frame(popup)
-    btns.pack(pady=10)
-    tk.Button(btns, text="Select", command=submit).pack(side="left", padx=5)
-    tk.Button(btns, text="Cancel", command=cancel).pack(side="left", padx=5)
-
-    popup.wait_window()
-
-    if cancelled.get():
-        return None, True
-    return selected_id.get(), False
+    return pick_client(clients)
 
 
 # -------------------------------------------------
 # Intake sheet variable loader
 # -------------------------------------------------
 def load_intake_variables():
-    vars_from_excel = set()
     try:
-        wb = openpyxl.load_workbook(INTAKE_XLSX, data_only=True)
-        if INTAKE_SHEET not in wb.sheetnames:
-            return vars_from_excel
-
-        sheet = wb[INTAKE_SHEET]
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            var_name = row[1]  # Column B
-            if var_name and isinstance(var_name, str):
-                vars_from_excel.add(var_name.strip())
+        return {rec.var for rec in iter_intake_records(INTAKE_XLSX, INTAKE_SHEET)}
     except Exception:
-        pass
-    return vars_from_excel
+        return set()
 
 
 # -------------------------------------------------
@@ -142,17 +63,8 @@ def update_client():
         if cancelled or client_id is None:
             return
 
-        # Load all base variables for this client
-        client_vars = get_all_variables_for_client("client", client_id)
-
-        # --- Compute derived variables automatically ---
-        for var_meta in list_all_variable_meta():
-            if var_meta.get("is_derived"):
-                expr = var_meta.get("derived_expression")
-                try:
-                    client_vars[var_meta["var_name"]] = eval(expr, {}, client_vars)
-                except Exception:
-                    client_vars[var_meta["var_name"]] = ""  # fallback if evaluation fails
+        # Stored values only; the grid evaluates derived variables as they are shown
+        client_vars = get_all_variables_for_client("client", client_id, compute_derived=False)
 
         window = tk.Toplevel()
         window.title(f"Update Client Variables — {build_client_label(client_id)}")
@@ -161,14 +73,18 @@ def update_client():
 
         tk.Label(
             window,
-            text="Edit variables or add new ones. Derived variables are computed automatically.",
+            text="Double-click a value (or press Enter) to edit it. Derived variables are computed automatically.",
             font=("Helvetica", 13),
         ).pack(pady=8)
 
-        # --- Search bar ---
-        tk.Label(window, text="Search Variable:").pack()
+        # --- Search bar and category filter ---
+        filter_frame = tk.Frame(window)
+        filter_frame.pack(pady=(0, 10))
+        tk.Label(filter_frame, text="Search Variable:").pack(side="left", padx=5)
         var_search = tk.StringVar()
-        tk.Entry(window, textvariable=var_search, width=50).pack(pady=(0, 10))
+        tk.Entry(filter_frame, textvariable=var_search, width=40).pack(side="left", padx=5)
+        tk.Label(filter_frame, text="Category:").pack(side="left", padx=5)
+        category_var = tk.StringVar(value=ALL_CATEGORIES)
 
 
         # --- Attorney Assignment Section ---
@@ -177,19 +93,9 @@ def update_client():
         
         tk.Label(attorney_frame, text="Opposing Counsel:", font=("Helvetica", 11, "bold")).pack(side="left", padx=5)
         
-        # Get current attorney assignment DIRECTLY from clients table
         from modules.db import list_opposing_counsel
-        import sqlite3
-        from modules.db import DB_PATH
-        
-        # Read opposing_counsel_id directly from clients table
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT opposing_counsel_id FROM clients WHERE id=?", (client_id,))
-        row = c.fetchone()
-        conn.close()
-        
-        current_counsel_id = row[0] if row and row[0] else None
+
+        current_counsel_id = get_client_counsel_id(client_id)
         
         attorneys = list_opposing_counsel()
         attorney_options = ["(None)"] + [f"{row[1]} {row[2]} - {row[11] or 'No Firm'}" for row in attorneys]
@@ -212,18 +118,10 @@ def update_client():
             selected_idx = attorney_options.index(selected_name)
             selected_id = attorney_ids[selected_idx]
             
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            
+            set_client_counsel_id(client_id, selected_id)
             if selected_id:
-                c.execute("UPDATE clients SET opposing_counsel_id = ? WHERE id = ?", (selected_id, client_id))
-                conn.commit()
-                conn.close()
                 messagebox.showinfo("Success", "Opposing counsel assigned!", parent=window)
             else:
-                c.execute("UPDATE clients SET opposing_counsel_id = NULL WHERE id = ?", (client_id,))
-                conn.commit()
-                conn.close()
                 messagebox.showinfo("Success", "Opposing counsel removed!", parent=window)
         
         tk.Button(attorney_frame, text="Assign Attorney", command=save_attorney_assignment).pack(side="left", padx=5)
@@ -231,74 +129,47 @@ def update_client():
 
 
 
-        # --- Scrollable table setup ---
-        container = tk.Frame(window)
-        container.pack(fill="both", expand=True, padx=10, pady=5)
-
-        table_canvas = tk.Canvas(container)
-        table_frame = tk.Frame(table_canvas)
-        scrollbar = tk.Scrollbar(container, orient="vertical", command=table_canvas.yview)
-        table_canvas.configure(yscrollcommand=scrollbar.set)
-
-        table_canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        table_canvas.create_window((0, 0), window=table_frame, anchor="nw")
-
-        def resize_canvas(event):
-            table_canvas.configure(scrollregion=table_canvas.bbox("all"))
-
-        table_frame.bind("<Configure>", resize_canvas)
-
-        # --- Table headers ---
-        headers = ["Variable", "Description", "Value"]
-        widths = [25, 45, 25]
-        for i, (h, w) in enumerate(zip(headers, widths)):
-            tk.Label(
-                table_frame,
-                text=h,
-                width=w,
-                font=("Helvetica", 10, "bold"),
-                anchor="w",
-            ).grid(row=0, column=i, sticky="w")
-
-        all_var_meta = list_all_variable_meta()
-        meta_lookup = {m["var_name"]: m for m in all_var_meta}
-        all_var_names = set(meta_lookup.keys()) | set(client_vars.keys())
-
-        row_vars = {}
-        for row_index, var_name in enumerate(sorted(all_var_names), start=1):
-            meta = meta_lookup.get(var_name) or {}
-            raw_val = client_vars.get(var_name, "")
-            value = raw_val.get("value") if isinstance(raw_val, dict) else raw_val or ""
-
-            val_var = tk.StringVar(value=value)
-            desc_var = tk.StringVar(value=meta.get("description", ""))
-
-            bg_color = "#e6f7ff" if meta.get("is_derived") else None
+        # --- Variable grid (only visible rows are built) ---
+        grid = VariableGrid(
+            window,
+            [dict(data, var_name=name) for name, data in sorted(client_vars.items())],
+            {name: data["value"] for name, data in client_vars.items()},
+        )
+        grid.pack(fill="both", expand=True, padx=10, pady=5)
 
-            tk.Label(table_frame, text=var_name, width=25, anchor="w", bg=bg_color).grid(row=row_index, column=0, sticky="w")
-            tk.Entry(table_frame, textvariable=desc_var, width=45, state="readonly", bg=bg_color).grid(row=row_index, column=1, sticky="w")
-            tk.Entry(table_frame, textvariable=val_var, width=25, bg=bg_color).grid(row=row_index, column=2, sticky="w")
+        def refresh_grid(*_):
+            grid.filter(var_search.get(), category_var.get())
 
-            row_vars[var_name] = {"val": val_var, "desc": desc_var, "meta": meta}
+        category_menu = tk.OptionMenu(filter_frame, category_var, ALL_CATEGORIES, *grid.categories(),
+                                      command=refresh_grid)
+        category_menu.config(width=20)
+        category_menu.pack(side="left", padx=5)
+        var_search.trace_add("write", refresh_grid)
+        refresh_grid()
 
         # --- Apply updates function ---
         def apply_updates():
-            changed_vars = []
-            for var, info in row_vars.items():
-                new_val = info["val"].get().strip()
-                meta = info["meta"]
-                old_val = client_vars.get(var, "")
-                if isinstance(old_val, dict):
-                    old_val = old_val.get("value", "")
-                old_val = old_val or ""
-                if new_val != old_val:
-                    changed_vars.append((var, meta.get("description", ""), new_val, old_val))
+            changed_vars = grid.changes()
 
             if not changed_vars:
                 messagebox.showinfo("Update Client", "No changes detected.")
                 return
 
+            # Validate every changed value against its type in one pass. The
+            # values are saved as typed: the coerced forms ("True", "1.0",
+            # reformatted dates) are not what templates render
+            _, errors = coerce_records(
+                {"new": {var: new_val for var, _, new_val, _ in changed_vars}},
+                {var: client_vars[var].get("var_type") for var, _, _, _ in changed_vars},
+            )
+            if errors:
+                messagebox.showerror(
+                    "Invalid Values",
+                    f"{len(errors)} value(s) do not match their variable type:\n\n"
+                    + "\n".join(f"{e.var_name}: {e.value!r} ({e.message})" for e in errors[:50]),
+                )
+                return
+
             confirm_win = tk.Toplevel()
             confirm_win.title("Confirm Changes")
             confirm_win.geometry("800x400")
@@ -324,8 +195,35 @@ def update_client():
             submitted = tk.BooleanVar(value=False)
 
             def confirm():
-                for var, _, val, _ in changed_vars:
-                    set_variable("client", client_id, var, val)
+                # Each row is written only if nobody changed it since this window opened
+                expected = {var: client_vars[var].get("rev") for var, _, _, _ in changed_vars}
+                while True:
+                    conflicts = compare_and_set_variables(
+                        "client", client_id, [(var, val, expected[var]) for var, _, val, _ in changed_vars]
+                    )
+                    if not conflicts:
+                        break
+                    details = "\n".join(
+                        f"{c.var_name}: now {c.current_value!r}" + (f" (changed {c.updated_at} UTC)" if c.updated_at else "")
+                        if c.current_rev is not None else f"{c.var_name}: removed"
+                        for c in conflicts[:30]
+                    )
+                    if not messagebox.askyesno(
+                        "Conflicting Changes",
+                        f"{len(conflicts)} variable(s) were changed by someone else after you opened this client:\n\n"
+                        f"{details}\n\nOverwrite them with your values?",
+                        parent=confirm_win,
+                    ):
+                        messagebox.showinfo(
+                            "Update Client",
+                            "No changes were saved. Reopen the client to see the current values.",
+                            parent=confirm_win,
+                        )
+                        submitted.set(True)
+                        confirm_win.destroy()
+                        window.destroy()
+                        return
+                    expected.update((c.var_name, c.current_rev) for c in conflicts)
                 submitted.set(True)
                 confirm_win.destroy()
                 window.destroy()
@@ -0,0 +1,212 @@
+# modules/variablegrid.py
+"""
+Editable variable grid used by Update Client.
+
+Only the rows that fit on screen exist as Treeview items
+(modules/virtualtree.py); scrolling, search and category filtering re-fill
+that window from an in-memory VariableTable, so opening a client with
+hundreds of variables costs the same as opening one with twenty. Values are
+edited in a single Entry laid over the Value cell.
+
+Derived values are computed when their row is first drawn and cached until
+a value is edited. Expressions are evaluated against a scope that resolves
+other derived variables on demand, so derived-of-derived values work
+without evaluating every expression up front.
+"""
+
+import tkinter as tk
+
+from modules.db import evaluate_derived
+from modules.virtualtree import VirtualTreeview
+
+ALL_CATEGORIES = "All categories"
+
+DERIVED_BG = "#e6f7ff"
+EDITED_BG = "#ffff99"
+
+
+class _DerivedScope:
+    """Mapping that derived expressions see: current values, derived ones on demand."""
+
+    def __init__(self, table):
+        self.table = table
+        self.resolving = set()
+
+    def __getitem__(self, name):
+        table = self.table
+        if name in table.expressions and name not in self.resolving:
+            return table.value(name, scope=self)
+        if name in table.edits:
+            return table.edits[name]
+        return table.values[name]
+
+
+class VariableTable:
+    """
+    The grid's data: rows, stored values, pending edits and derived values.
+
+    rows: [{"var_name", "description", "category", "is_derived",
+    "derived_expression"}] in display order; values: {var_name: stored value}.
+    Edits are kept in .edits until the caller reads .changes().
+    """
+
+    def __init__(self, rows, values):
+        self.rows = rows
+        self.values = values
+        self.expressions = {
+            r["var_name"]: r["derived_expression"] for r in rows
+            if r.get("is_derived") and r.get("derived_expression")
+        }
+        self.edits = {}
+        self._derived = {}
+        self._search = [f"{r['var_name']} {r.get('description') or ''}".lower() for r in rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def categories(self):
+        return sorted({r.get("category") or "General" for r in self.rows})
+
+    def filter(self, term="", category=None):
+        """Positions of the rows matching term (name or description) in category."""
+        term = term.strip().lower()
+        if category == ALL_CATEGORIES:
+            category = None
+        rows, search = self.rows, self._search
+        return [
+            pos for pos in range(len(rows))
+            if (not term or term in search[pos])
+            and (category is None or (rows[pos].get("category") or "General") == category)
+        ]
+
+    def value(self, var_name, scope=None):
+        """Current value of var_name: the pending edit, else stored or derived value."""
+        if var_name in self.edits:
+            return self.edits[var_name]
+        expression = self.expressions.get(var_name)
+        if expression is None:
+            return self.values.get(var_name, "")
+        if var_name not in self._derived:
+            scope = scope or _DerivedScope(self)
+            scope.resolving.add(var_name)
+            try:
+                self._derived[var_name] = evaluate_derived(expression, scope)
+            finally:
+                scope.resolving.discard(var_name)
+        return self._derived[var_name]
+
+    def set_value(self, var_name, new_value):
+        if new_value == self.values.get(var_name, ""):
+            self.edits.pop(var_name, None)
+        else:
+            self.edits[var_name] = new_value
+        # Any derived value may depend on the edited one
+        self._derived.clear()
+
+    def changes(self):
+        """[(var_name, description, new_value, old_value)] for every edited row, in row order."""
+        return [
+            (r["var_name"], r.get("description") or "", self.edits[r["var_name"]], self.values.get(r["var_name"], ""))
+            for r in self.rows if r["var_name"] in self.edits
+        ]
+
+
+class VariableGrid(VirtualTreeview):
+    """
+    Virtual Variable / Description / Value table over a VariableTable, with
+    an in-place editor for the Value column.
+    """
+
+    def __init__(self, parent, rows, values, **kwargs):
+        super().__init__(
+            parent, "VariableGrid.Treeview", "No matching variables", header_rows=1,
+            tree_options={"columns": ("variable", "description", "value"), "show": "headings"}, **kwargs,
+        )
+        self.table = VariableTable(rows, values)
+        self.results = list(range(len(self.table)))
+        self.editor = None
+
+        for column, heading, width in (("variable", "Variable", 200), ("description", "Description", 360),
+                                       ("value", "Value", 260)):
+            self.tree.heading(column, text=heading, anchor="w")
+            self.tree.column(column, width=width, anchor="w", stretch=column != "variable")
+        self.tree.tag_configure("derived", background=DERIVED_BG)
+        self.tree.tag_configure("edited", background=EDITED_BG)
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.tree.bind("<Return>", lambda e: self.edit(self.selected))
+
+    # --- data ---
+    def categories(self):
+        return self.table.categories()
+
+    def filter(self, term="", category=None):
+        self.finish_edit()
+        self.results = self.table.filter(term, category)
+        self.offset = 0
+        self._render()
+
+    def value(self, var_name):
+        return self.table.value(var_name)
+
+    def set_value(self, var_name, new_value):
+        self.table.set_value(var_name, new_value)
+        self._render()
+
+    def changes(self):
+        self.finish_edit()
+        return self.table.changes()
+
+    # --- editing ---
+    def edit(self, var_name):
+        """Open the in-place editor on var_name's Value cell (derived rows are read-only)."""
+        self.finish_edit()
+        if var_name is None or var_name in self.table.expressions or not self.tree.exists(var_name):
+            return "break"
+        bbox = self.tree.bbox(var_name, "value")
+        if not bbox:
+            return "break"
+        x, y, width, height = bbox
+        entry = tk.Entry(self.tree)
+        entry.insert(0, self.value(var_name))
+        entry.select_range(0, "end")
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+        entry.bind("<Return>", lambda e: (self.finish_edit(), self.tree.focus_set(), self._step(1)))
+        entry.bind("<Escape>", lambda e: self.finish_edit(save=False))
+        entry.bind("<FocusOut>", lambda e: self.finish_edit())
+        self.editor = (var_name, entry)
+        return "break"
+
+    def finish_edit(self, save=True):
+        if self.editor is None:
+            return "break"
+        var_name, entry = self.editor
+        self.editor = None
+        new_value = entry.get().strip()
+        entry.destroy()
+        if save and new_value != self.value(var_name):
+            self.set_value(var_name, new_value)
+        return "break"
+
+    def _on_double_click(self, event):
+        if self.tree.identify_column(event.x) == "#3":
+            return self.edit(self.tree.identify_row(event.y) or None)
+
+    # --- rows ---
+    def _before_move(self):
+        self.finish_edit()
+
+    def _row_id(self, pos):
+        return self.table.rows[pos]["var_name"]
+
+    def _insert_row(self, pos):
+        row = self.table.rows[pos]
+        var_name = row["var_name"]
+        if var_name in self.table.edits:
+            tags = ("edited",)
+        elif var_name in self.table.expressions:
+            tags = ("derived",)
+        else:
+            tags = ()
+        self.tree.insert("", "end", iid=var_name, tags=tags,
+                         values=(var_name, row.get("description") or "", self.value(var_name)))
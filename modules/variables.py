@@ -9,38 +9,16 @@ from modules.db import (
     set_variable_meta,
     list_all_variable_meta,
 )
+from modules.coercion import SUPPORTED_TYPES, coerce_value, normalize_type
+from modules.perf import span
 
 INTAKE_FILE = Path("intake.xlsx")
 INTAKE_SHEET = "IntakeSheet"
 
-SUPPORTED_TYPES = {"string", "int", "float", "bool", "iso-date"}
-
 
 # -------------------------------------------------
 # Helpers
 # -------------------------------------------------
-def normalize_type(raw_type):
-    if not raw_type or pd.isna(raw_type):
-        return "string"
-    t = str(raw_type).strip().lower()
-    return t if t in SUPPORTED_TYPES else "string"
-
-
-def coerce_value(value, var_type: str):
-    if value is None or value == "":
-        return None
-    try:
-        if var_type == "int":
-            return int(value)
-        if var_type == "float":
-            return float(value)
-        if var_type == "bool":
-            return str(value).strip().lower() in {"1", "true", "yes", "y"}
-        return str(value).strip()
-    except Exception:
-        return str(value).strip()
-
-
 def get_meta_lookup():
     """Return {var_name: meta_dict}"""
     return {v["var_name"]: v for v in list_all_variable_meta()}
@@ -74,7 +52,7 @@ def add_missing_variable(var_name: str, client_id: int):
 
         var_type = simpledialog.askstring(
             "Variable Type",
-            f"Type for '{var_name}' (string/int/float/bool/iso-date):",
+            f"Type for '{var_name}' ({'/'.join(SUPPORTED_TYPES)}):",
             initialvalue="string"
         )
         var_type = normalize_type(var_type)
@@ -93,7 +71,8 @@ def add_missing_variable(var_name: str, client_id: int):
     # ---------------------------------------------
     if INTAKE_FILE.exists():
         try:
-            df = pd.read_excel(INTAKE_FILE, sheet_name=INTAKE_SHEET, header=0)
+            with span("read_excel", "excel", file=INTAKE_FILE, sheet=INTAKE_SHEET):
+                df = pd.read_excel(INTAKE_FILE, sheet_name=INTAKE_SHEET, header=0)
         except ValueError:
             df = pd.DataFrame(columns=["Variable", "Value", "Type", "Description"])
     else:
@@ -127,9 +106,13 @@ def add_missing_variable(var_name: str, client_id: int):
         f"Enter value for '{var_name}':"
     )
 
-    value = coerce_value(value, var_type)
-
-    if value is not None:
-        set_variable("client", client_id, var_name, value)
+    coerced = coerce_value(value, var_type)
+    if coerced is not None:
+        set_variable("client", client_id, var_name, coerced)
+    elif value and value.strip():
+        messagebox.showwarning(
+            "Invalid Value",
+            f"'{value}' is not a valid {var_type} value for '{var_name}'. Nothing was saved."
+        )
 
     root.destroy()
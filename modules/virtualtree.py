@@ -0,0 +1,138 @@
+# modules/virtualtree.py
+"""
+Virtual Treeview shared by the client picker and the Update Client
+variable grid.
+
+Only the rows that fit on screen exist as Treeview items. A subclass keeps
+its own data and sets .results (positions into that data); this class keeps
+the window over those results (scrolling, resizing, keyboard selection)
+and re-fills the visible rows, so repaint cost does not grow with the
+number of rows. Subclasses supply _row_id() and _insert_row() for one row,
+and may override _before_move(), called before the window moves.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+ROW_HEIGHT = 22
+
+
+class VirtualTreeview(tk.Frame):
+    """
+    Frame holding a single-selection Treeview and its scrollbar that shows
+    the visible window of .results. .selected is the selected row's iid.
+
+    header_rows is the number of rows taken by the Treeview's headings
+    (1 with show="headings"), left out when the widget is resized.
+    """
+
+    def __init__(self, parent, style, empty_text, header_rows=0, tree_options=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.results = []
+        self.offset = 0
+        self.visible_rows = 20
+        self.selected = None
+        self.header_rows = header_rows
+
+        ttk.Style(self).configure(style, rowheight=ROW_HEIGHT)
+        self.tree = ttk.Treeview(self, selectmode="browse", height=self.visible_rows, style=style,
+                                 **(tree_options or {}))
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.empty_label = tk.Label(self.tree, text=empty_text, fg="gray")
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self._step(-1))
+        self.tree.bind("<Down>", lambda e: self._step(1))
+        self.tree.bind("<Prior>", lambda e: self._step(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self._step(self.visible_rows))
+
+    # --- subclass hooks ---
+    def _row_id(self, pos):
+        """Treeview iid of the row at data position pos."""
+        raise NotImplementedError
+
+    def _insert_row(self, pos):
+        """Insert the row at data position pos at the end of self.tree."""
+        raise NotImplementedError
+
+    def _before_move(self):
+        pass
+
+    # --- scrolling ---
+    def scroll(self, rows):
+        max_offset = max(0, len(self.results) - self.visible_rows)
+        new_offset = min(max(0, self.offset + rows), max_offset)
+        if new_offset != self.offset:
+            self._before_move()
+            self.offset = new_offset
+            self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll(int(float(amount) * len(self.results)) - self.offset)
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120, macOS small per-notch deltas
+        steps = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        return self.scroll(-3 * steps)
+
+    def _on_resize(self, event):
+        rows = max(1, event.height // ROW_HEIGHT - self.header_rows)
+        if rows != self.visible_rows:
+            self._before_move()
+            self.visible_rows = rows
+            self.offset = min(self.offset, max(0, len(self.results) - rows))
+            self._render()
+
+    def _step(self, delta):
+        """Move the selection with the keyboard, scrolling as needed."""
+        if not self.results:
+            return "break"
+        self._before_move()
+        try:
+            current = next(i for i, pos in enumerate(self.results) if self._row_id(pos) == self.selected)
+        except StopIteration:
+            current = self.offset - 1 if delta > 0 else self.offset
+        target = min(max(0, current + delta), len(self.results) - 1)
+        self.selected = self._row_id(self.results[target])
+        if target < self.offset:
+            self.offset = target
+        elif target >= self.offset + self.visible_rows:
+            self.offset = target - self.visible_rows + 1
+        self._render()
+        return "break"
+
+    # --- rendering ---
+    def _render(self):
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        window = self.results[self.offset:self.offset + self.visible_rows]
+        for pos in window:
+            self._insert_row(pos)
+
+        if self.selected is not None and tree.exists(self.selected):
+            tree.selection_set(self.selected)
+            tree.focus(self.selected)
+
+        total = len(self.results)
+        if total:
+            self.empty_label.place_forget()
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(window)) / total))
+        else:
+            self.empty_label.place(relx=0.5, rely=0.1, anchor="n")
+            self.scrollbar.set(0, 1)
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection[0]
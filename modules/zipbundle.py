@@ -0,0 +1,135 @@
+# modules/zipbundle.py
+"""
+Write a generation batch into one ZIP archive instead of separate files.
+
+On a network share every file create is a round trip, so thousands of
+small .docx files are slow to write there. In bundle mode each finished
+document goes straight into a single archive, written locally and copied
+to the share in one go:
+
+    with ZipBundle(bundle_path_for(12), batch_id=12) as bundle:
+        bundle.add("letter_client7_batch12.docx", data, client_id=7, template="letter.docx")
+
+    python -m modules.jobqueue work --batch 12 --bundle output_documents/batch12.zip
+
+Entries are streamed into the archive as they are added (ZipFile.open in
+"w" mode), so memory stays flat however many documents a batch has: only
+the current document and the small manifest/central directory are held.
+.docx files are already compressed and are stored as-is. manifest.json,
+written last, maps each client to its files.
+
+The archive is built under a temporary name and renamed into place when
+closed, including after a cancelled or failed run, so the documents that
+were finished are never lost.
+"""
+
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def bundle_path_for(batch_id, output_dir="output_documents"):
+    """batch<id>.zip, or batch<id>_2.zip, ... if a run of the batch was already bundled."""
+    path = Path(output_dir) / f"batch{batch_id}.zip"
+    part = 1
+    while path.exists():
+        part += 1
+        path = path.with_name(f"batch{batch_id}_{part}.zip")
+    return path
+
+
+class ZipBundle:
+    """A ZIP archive of generated documents plus manifest.json."""
+
+    def __init__(self, path, batch_id=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_id = batch_id
+        self._tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self._file = open(self._tmp, "wb")
+        self._zip = zipfile.ZipFile(self._file, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        self._names = set()
+        self.entries = []
+
+    def add(self, arcname, source, client_id=None, template=None):
+        """
+        Add one document: source is its bytes or the path of a file to copy
+        in. Returns arcname.
+        """
+        arcname = str(arcname)
+        if arcname in self._names:
+            raise ValueError(f"{arcname} is already in {self.path.name}")
+        info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with self._zip.open(info, "w", force_zip64=True) as entry:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                entry.write(source)
+            else:
+                with open(source, "rb") as f:
+                    shutil.copyfileobj(f, entry, CHUNK_SIZE)
+        # Set when the entry is closed
+        size = info.file_size
+        self._names.add(arcname)
+        self.entries.append({
+            "file": arcname,
+            "client_id": client_id,
+            "template": Path(template).name if template else None,
+            "size": size,
+        })
+        return arcname
+
+    def manifest(self):
+        clients = {}
+        for entry in self.entries:
+            clients.setdefault(str(entry["client_id"]), []).append(entry["file"])
+        return {
+            "batch": self.batch_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "documents": self.entries,
+            "clients": clients,
+        }
+
+    def close(self):
+        """Write manifest.json, finish the archive and move it into place."""
+        if self._zip is None:
+            return self.path
+        try:
+            self._zip.writestr(
+                zipfile.ZipInfo(MANIFEST_NAME, date_time=datetime.now().timetuple()[:6]),
+                json.dumps(self.manifest(), indent=2),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+            self._zip.close()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._zip = None
+        return self.path
+
+    def abort(self):
+        """Discard the archive."""
+        self._zip = None
+        self._file.close()
+        if self._tmp.exists():
+            self._tmp.unlink()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Keep what was finished even if the run stopped part-way
+        self.close()
@@ -0,0 +1,74 @@
+# tests/conftest.py
+"""
+Shared fixtures. The app resolves data/, templates/ and output_documents/
+relative to the working directory, so each test runs in its own empty one.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A fresh app working directory, made the current directory."""
+    from modules import db, template_cache
+
+    for name in ("data", "templates", "output_documents"):
+        (tmp_path / name).mkdir()
+    monkeypatch.chdir(tmp_path)
+    # The shared Jinja environment keeps its bytecode cache under data/
+    monkeypatch.setattr(template_cache, "_env", None)
+    monkeypatch.setattr(db, "DB_PATH", Path("data/clients.db"))
+    monkeypatch.setattr(db, "_fts_available", None)
+    db.invalidate_concat_cache()
+    db.invalidate_grammar_rule_cache()
+    return tmp_path
+
+
+@pytest.fixture
+def client_db(workdir):
+    """modules.db over a new, empty clients.db."""
+    from modules import db
+
+    db.create_db()
+    return db
+
+
+@pytest.fixture
+def make_template(workdir):
+    """make_template(name, *paragraphs) -> path of a one-paragraph-per-line .docx in templates/."""
+    from docx import Document
+
+    def make(name, *paragraphs):
+        doc = Document()
+        for text in paragraphs:
+            doc.add_paragraph(text)
+        path = workdir / "templates" / name
+        doc.save(path)
+        return path
+
+    return make
+
+
+@pytest.fixture
+def dynamic_sheets(workdir):
+    """
+    dynamic_sheets({var_name: ([(display, output)], numbered)}) writes
+    dynamicpleadingresponses.xlsx with one sheet per <<dynamic>> variable.
+    """
+    import pandas as pd
+
+    def write(sheets):
+        with pd.ExcelWriter(workdir / "dynamicpleadingresponses.xlsx") as writer:
+            for var_name, (options, numbered) in sheets.items():
+                rows = [(display, output, "", "FALSE" if numbered and i == 0 else ("TRUE" if i == 0 else ""))
+                        for i, (display, output) in enumerate(options)]
+                frame = pd.DataFrame(rows, columns=["Display", "Output", "", "Single use"])
+                frame.to_excel(writer, sheet_name=var_name, index=False)
+
+    return write
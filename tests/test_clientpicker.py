@@ -0,0 +1,39 @@
+# tests/test_clientpicker.py
+from modules.clientpicker import ClientIndex, format_client_label
+
+ROWS = [
+    (1, "M-100", "Jane", "Doe"),
+    (2, "M-200", "John", "Adoe"),
+    (3, None, "Mary", "Smith"),
+]
+
+
+def test_format_client_label():
+    assert format_client_label(1, "M-100", "Jane", "Doe") == "(M-100) - ID-1 - Jane Doe"
+    assert format_client_label(3, None, "", None) == "ID-3"
+
+
+def test_word_prefix_matches_first():
+    index = ClientIndex(ROWS)
+    assert [index.ids[p] for p in index.search("doe")] == [1, 2]
+    assert [index.ids[p] for p in index.search("(m-200)")] == [2]
+    assert len(index.search("  ")) == 3
+
+
+def test_trigram_index_gives_same_results():
+    plain, trigram = ClientIndex(ROWS, trigrams=False), ClientIndex(ROWS, trigrams=True)
+    for term in ("doe", "smi", "m-1", "ary smith", "zzz"):
+        assert plain.search(term) == trigram.search(term)
+
+
+def test_value_matches_exclude_label_matches(client_db):
+    for matterid, first, last, street in [("M-1", "Jane", "Doe", "12 Elm Street"),
+                                          ("M-2", "Elmer", "Fudd", "3 Oak Road")]:
+        client_id = client_db.create_client(matterid, first, last)
+        client_db.set_variable("client", client_id, "street", street)
+    index = ClientIndex.from_db()
+
+    labels = index.search("elm")
+    assert [index.ids[p] for p in labels] == [2]
+    assert [index.ids[p] for p in index.value_matches("elm", set(labels))] == [1]
+    assert index.value_matches("e", set()) == []
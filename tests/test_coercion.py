@@ -0,0 +1,54 @@
+# tests/test_coercion.py
+import math
+
+import pandas as pd
+
+from modules.coercion import coerce_records, coerce_series, coerce_value, format_errors, normalize_type
+
+
+def test_normalize_type():
+    assert normalize_type(" Int ") == "int"
+    assert normalize_type("currency") == "string"
+    assert normalize_type(None) == "string"
+    assert normalize_type(math.nan) == "string"
+
+
+def test_int_column():
+    result = coerce_series(["12", 12, 12.0, "12.5", "", None, "abc"], "int", "age")
+    assert result.values.tolist() == [12, 12, 12, None, None, None, None]
+    assert result.valid.tolist() == [True, True, True, False, True, True, False]
+    assert [(e.key, e.value) for e in result.errors] == [(3, "12.5"), (6, "abc")]
+    assert all(type(v) is int for v in result.values.tolist()[:3])
+
+
+def test_float_and_bool():
+    assert coerce_series(["1.5", "x", "inf"], "float").values.tolist() == [1.5, None, None]
+    result = coerce_series(["Yes", "n", "1", "0.0", "maybe"], "bool")
+    assert result.values.tolist() == [True, False, True, False, None]
+    assert len(result.errors) == 1
+
+
+def test_dates_reject_bare_numbers():
+    result = coerce_series(["2024-03-05", "03/05/2024", "45000", "not a date"], "date")
+    assert result.values.tolist() == ["03/05/2024", "03/05/2024", None, None]
+    assert coerce_value("March 5, 2024", "iso-date") == "2024-03-05"
+
+
+def test_series_index_is_error_key():
+    result = coerce_series(pd.Series(["1", "x"], index=["M-1", "M-2"]), "int", "count")
+    assert [(e.key, e.var_name) for e in result.errors] == [("M-2", "count")]
+
+
+def test_coerce_records_by_column():
+    coerced, errors = coerce_records(
+        {"M-1": {"age": "40", "name": " Jane "}, "M-2": {"age": "forty"}},
+        {"age": "int"},
+    )
+    assert coerced == {"M-1": {"age": 40, "name": "Jane"}, "M-2": {"age": None}}
+    assert [(e.key, e.var_name) for e in errors] == [("M-2", "age")]
+    assert format_errors(errors) == "M-2: age = 'forty' (int, expected a whole number)"
+
+
+def test_format_errors_truncates():
+    errors = coerce_series(["x"] * 5, "int").errors
+    assert format_errors(errors, limit=2).splitlines()[-1] == "... and 3 more"
@@ -0,0 +1,62 @@
+# tests/test_concat.py
+import pytest
+from docx import Document
+
+from modules.docgen import build_concat_value, generate_document_from_template
+
+
+def _baseline_concat_value(concat, all_client_vars):
+    # The loop handle_concatenated_variable ran before build_concat_value existed
+    comp_list = concat["components"]
+    sep = concat.get("separator", " ")
+    values = []
+    for comp in comp_list:
+        val = all_client_vars.get(comp, "")
+        values.append(str(val))
+    return sep.join(values)
+
+
+def test_index_follows_definition_writes(client_db):
+    assert client_db.get_concat_index() == {}
+    client_db.set_concat_variable("fullname", ["firstname", "lastname"])
+    index = client_db.get_concat_index()
+    assert index["fullname"]["components"] == ["firstname", "lastname"]
+    assert index["fullname"]["separator"] == " "
+    # Cached until a definition is written
+    assert client_db.get_concat_index() is index
+
+    client_db.set_concat_variable("fullname", ["lastname", "firstname"], separator=", ")
+    index = client_db.get_concat_index()
+    assert (index["fullname"]["components"], index["fullname"]["separator"]) == (["lastname", "firstname"], ", ")
+
+    client_db.set_concat_variable("address", ["street", "city"], separator="\n")
+    client_db.delete_concat_variable("fullname")
+    assert list(client_db.get_concat_index()) == ["address"]
+
+
+@pytest.mark.parametrize("concat", [
+    {"components": ["firstname", "lastname"], "separator": " "},
+    {"components": ["lastname", "firstname"], "separator": ", "},
+    {"components": ["street", "city", "zip"], "separator": "\n"},
+    {"components": ["firstname", "middlename", "lastname"], "separator": " "},
+    {"components": ["firstname", "lastname"]},
+    {"components": ["age", "empty"], "separator": "-"},
+    {"components": [], "separator": " "},
+])
+def test_build_concat_value_matches_baseline(concat):
+    values = {"firstname": "Jane", "lastname": "Doe", "street": "12 Elm", "city": "Mesa", "age": 40, "empty": ""}
+    assert build_concat_value(concat, values) == _baseline_concat_value(concat, values)
+
+
+def test_concat_variables_in_a_document(client_db, make_template):
+    for name in ("firstname", "lastname"):
+        client_db.set_variable_meta(name)
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+    client_db.set_variable("client", client_id, "firstname", "Jane")
+    client_db.set_variable("client", client_id, "lastname", "Doe")
+    client_db.set_concat_variable("fullname", ["firstname", "lastname"])
+    client_db.set_concat_variable("sortname", ["lastname", "middlename", "firstname"], separator=", ")
+    template = make_template("letter.docx", "Dear {{ fullname }}", "Re: {{ sortname_combo }}")
+
+    output = generate_document_from_template(template, client_id)
+    assert [p.text for p in Document(output).paragraphs] == ["Dear Jane Doe", "Re: Doe, , Jane"]
@@ -0,0 +1,74 @@
+# tests/test_datagen.py
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from modules import db
+from modules.datagen import DataGenConfig, generate_database
+
+SMALL = DataGenConfig(clients=30, variables=20, derived_fraction=0.2, counsel=4, seed=7)
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+                for table in ("clients", "variables", "variables_meta", "opposing_counsel", db.CONCAT_TABLE)}
+    finally:
+        conn.close()
+
+
+def test_same_config_gives_identical_tables(workdir):
+    first = generate_database(SMALL, db_path="data/a.db")
+    second = generate_database(SMALL, db_path="data/b.db")
+    assert _dump("data/a.db") == _dump("data/b.db")
+    volatile = ("db_path", "seconds")
+    assert {k: v for k, v in first.items() if k not in volatile} == {k: v for k, v in second.items() if k not in volatile}
+
+    generate_database(DataGenConfig(clients=30, variables=20, derived_fraction=0.2, counsel=4, seed=8),
+                      db_path="data/c.db")
+    assert _dump("data/c.db")["variables"] != _dump("data/a.db")["variables"]
+
+
+def test_counts_and_core_variables(workdir):
+    stats = generate_database(SMALL, progress=lambda done, total: None)
+    assert stats["db_path"] == str(db.DB_PATH)
+    assert (stats["clients"], stats["opposing_counsel"], stats["derived"]) == (30, 4, 4)
+    # 16 generated base variables, 4 derived, plus the core identity variables
+    assert stats["variables_meta"] == 16 + 4 + 4
+    tables = _dump(db.DB_PATH)
+    assert len(tables["clients"]) == 30 and len(tables["variables"]) == stats["variable_rows"]
+    assert len(tables[db.CONCAT_TABLE]) == 4
+
+    client = db.get_client(1)
+    values = db.get_variables("client", 1)
+    assert values["firstname"] == client[1] and values["lastname"] == client[2]
+    assert db.get_client_grammar_fields(1) == (int(values["defendant_count"]), values["gender"])
+
+
+def test_generated_clients_are_searchable(workdir):
+    generate_database(SMALL)
+    matterid = db.get_client(12)[4]
+    assert 12 in db.search_clients(matterid)
+
+
+def test_refuses_a_populated_database_unless_reset(workdir):
+    generate_database(SMALL, db_path="data/load.db")
+    with pytest.raises(ValueError, match="already has clients"):
+        generate_database(SMALL, db_path="data/load.db")
+    stats = generate_database(DataGenConfig(clients=5, variables=4, counsel=1), db_path="data/load.db", reset=True)
+    assert stats["clients"] == 5
+    assert len(_dump("data/load.db")["clients"]) == 5
+
+
+def test_other_database_leaves_db_path_alone(client_db):
+    before = client_db.DB_PATH
+    client_db.create_client("M-1", "Jane", "Doe")
+    stats = generate_database(SMALL, db_path="data/load.db")
+    assert stats["db_path"] == str(Path("data/load.db"))
+    assert client_db.DB_PATH == before
+    assert [c[4] for c in client_db.list_clients()] == ["M-1"]
+    with pytest.raises(ValueError, match="load.db already has clients"):
+        generate_database(SMALL, db_path="data/load.db")
+    assert client_db.DB_PATH == before
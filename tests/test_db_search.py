@@ -0,0 +1,105 @@
+# tests/test_db_search.py
+import pytest
+
+
+def _add_clients(db):
+    jane = db.create_client("M-100", "Jane", "Doe")
+    db.set_variable("client", jane, "street", "12 Elm Street")
+    john = db.create_client("M-200", "John", "Smith")
+    db.set_variable("client", john, "claimnumber", "CLM-55501")
+    db.create_opposing_counsel("Sam", "Lawyer", firm_name="Elm & Partners", bar_number="B-77")
+    return jane, john
+
+
+@pytest.fixture(params=["fts", "like"])
+def search_db(request, workdir, monkeypatch):
+    """A database searched through FTS5, or through the LIKE fallback used when SQLite lacks it."""
+    from modules import db
+
+    if request.param == "like":
+        monkeypatch.setattr(db, "ensure_search_index", lambda: False)
+    db.create_db()
+    assert db.fts_available() is (request.param == "fts")
+    return db
+
+
+def test_search_clients(search_db):
+    jane, john = _add_clients(search_db)
+    assert search_db.search_clients("elm") == [jane]
+    assert search_db.search_clients("jane street") == [jane]
+    assert search_db.search_clients("55501") == [john]
+    assert search_db.search_clients("smith elm") == []
+    assert search_db.search_clients("  ") == []
+
+
+def test_search_sees_later_edits(search_db):
+    jane, _ = _add_clients(search_db)
+    search_db.set_variable("client", jane, "street", "9 Birch Lane")
+    assert search_db.search_clients("birch") == [jane]
+    assert search_db.search_clients("elm") == []
+    search_db.delete_client(jane)
+    assert search_db.search_clients("birch") == []
+
+
+def test_search_opposing_counsel(search_db):
+    _add_clients(search_db)
+    (counsel_id,) = search_db.search_opposing_counsel("elm partners")
+    assert search_db.get_opposing_counsel(counsel_id)[1] == "Sam"
+    assert search_db.search_opposing_counsel("nobody") == []
+
+
+def test_upserts_fire_search_triggers(client_db):
+    # An upsert's conflict clause overrides INSERT OR IGNORE inside the
+    # triggers it fires; repeated upserts of one row must still succeed
+    jane = client_db.create_client("M-100", "Jane", "Doe")
+    for value in ("1 Elm", "2 Elm", "3 Elm"):
+        client_db.set_variable("client", jane, "street", value)
+    client_db.bulk_import_clients({"M-100": {"street": "4 Oak"}})
+    assert client_db.get_variables("client", jane)["street"] == "4 Oak"
+    assert client_db.refresh_search_index() == 0  # the bulk import refreshed it
+    assert client_db.search_clients("oak") == [jane]
+
+
+def test_existing_triggers_are_replaced(client_db):
+    import sqlite3
+
+    conn = sqlite3.connect(client_db.DB_PATH)
+    conn.execute("DROP TRIGGER client_search_var_ai")
+    conn.execute(f"""CREATE TRIGGER client_search_var_ai AFTER INSERT ON variables BEGIN
+        INSERT OR IGNORE INTO {client_db.CLIENT_SEARCH_DIRTY_TABLE} (client_id) VALUES (NEW.entity_id); END""")
+    conn.commit()
+    conn.close()
+    client_db.ensure_search_index()
+    conn = sqlite3.connect(client_db.DB_PATH)
+    (sql,) = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'client_search_var_ai'").fetchone()
+    conn.close()
+    assert "OR IGNORE" not in sql
+
+
+def test_writes_refresh_the_index_and_searches_only_read(client_db):
+    import sqlite3
+
+    def dirty():
+        conn = sqlite3.connect(client_db.DB_PATH)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {client_db.CLIENT_SEARCH_DIRTY_TABLE}").fetchone()[0]
+        finally:
+            conn.close()
+
+    jane = client_db.create_client("M-100", "Jane", "Doe")
+    client_db.set_variable("client", jane, "street", "12 Elm Street")
+    client_db.compare_and_set_variables("client", jane, [("city", "Mesa", None)])
+    assert dirty() == 0
+    assert client_db.search_clients("mesa") == [jane]
+
+    # A write made behind the app's back is not indexed by a search...
+    conn = sqlite3.connect(client_db.DB_PATH)
+    conn.execute("UPDATE clients SET last_name = 'Roe' WHERE id = ?", (jane,))
+    conn.commit()
+    conn.close()
+    assert client_db.search_clients("roe") == []
+    assert dirty() == 1
+    # ...but when the index is next opened
+    client_db.ensure_search_index()
+    assert dirty() == 0
+    assert client_db.search_clients("roe") == [jane]
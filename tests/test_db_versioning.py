@@ -0,0 +1,69 @@
+# tests/test_db_versioning.py
+import pytest
+
+
+@pytest.fixture
+def client(client_db):
+    for name in ("street", "phone"):
+        client_db.set_variable_meta(name)
+    return client_db.create_client("M-100", "Jane", "Doe")
+
+
+def _revs(db, client_id):
+    return {name: data["rev"] for name, data in db.get_all_variables_for_client("client", client_id).items()
+            if name in ("street", "phone")}
+
+
+def test_rev_bumps_only_on_change(client_db, client):
+    assert _revs(client_db, client) == {"street": None, "phone": None}
+    client_db.set_variable("client", client, "street", "1 Elm")
+    client_db.set_variable("client", client, "street", "1 Elm")
+    assert _revs(client_db, client)["street"] == 0
+    client_db.set_variable("client", client, "street", "2 Elm")
+    assert _revs(client_db, client)["street"] == 1
+
+
+def test_compare_and_set_applies_all(client_db, client):
+    client_db.set_variable("client", client, "street", "1 Elm")
+    revs = _revs(client_db, client)
+    conflicts = client_db.compare_and_set_variables(
+        "client", client, [("street", "2 Elm", revs["street"]), ("phone", "555-0100", revs["phone"])]
+    )
+    assert conflicts == []
+    values = client_db.get_variables("client", client)
+    assert (values["street"], values["phone"]) == ("2 Elm", "555-0100")
+    assert _revs(client_db, client) == {"street": 1, "phone": 0}
+
+
+def test_compare_and_set_rejects_stale_rows(client_db, client):
+    client_db.set_variable("client", client, "street", "1 Elm")
+    stale = _revs(client_db, client)
+    # Another desktop saves in between
+    client_db.set_variable("client", client, "street", "9 Oak")
+    client_db.set_variable("client", client, "phone", "555-0199")
+
+    conflicts = client_db.compare_and_set_variables(
+        "client", client, [("street", "2 Elm", stale["street"]), ("phone", "555-0100", stale["phone"])]
+    )
+    assert [(c.var_name, c.expected_rev, c.current_rev, c.current_value) for c in conflicts] == [
+        ("street", 0, 1, "9 Oak"),
+        ("phone", None, 0, "555-0199"),
+    ]
+    assert all(c.updated_at for c in conflicts)
+    # Nothing was written
+    values = client_db.get_variables("client", client)
+    assert (values["street"], values["phone"]) == ("9 Oak", "555-0199")
+
+    # Overwriting with the revs from the conflicts succeeds
+    assert client_db.compare_and_set_variables(
+        "client", client, [(c.var_name, "mine", c.current_rev) for c in conflicts]
+    ) == []
+    assert client_db.get_variables("client", client)["street"] == "mine"
+
+
+def test_compare_and_set_row_removed(client_db, client):
+    client_db.set_variable("client", client, "street", "1 Elm")
+    rev = _revs(client_db, client)["street"]
+    client_db.delete_variable("street")
+    (conflict,) = client_db.compare_and_set_variables("client", client, [("street", "2 Elm", rev)])
+    assert conflict.current_rev is None
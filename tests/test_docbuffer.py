@@ -0,0 +1,73 @@
+# tests/test_docbuffer.py
+import io
+import os
+
+import pytest
+from docx import Document
+
+from modules import docgen
+from modules.docbuffer import atomic_output, load_buffer, save_document, write_atomic
+
+
+def test_atomic_output_replaces_the_file_when_done(tmp_path):
+    path = tmp_path / "out.docx"
+    path.write_bytes(b"old")
+    with atomic_output(path) as f:
+        f.write(b"new")
+        assert path.read_bytes() == b"old"
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["out.docx"]
+
+
+def test_atomic_output_keeps_the_old_file_on_error(tmp_path):
+    path = tmp_path / "out.docx"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_output(path) as f:
+            f.write(b"half")
+            raise RuntimeError("render failed")
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["out.docx"]
+
+
+def test_write_atomic_leaves_other_links_alone(tmp_path):
+    path, link = tmp_path / "out.docx", tmp_path / "reused.docx"
+    path.write_bytes(b"shared")
+    os.link(path, link)
+    assert write_atomic(path, b"rewritten") == path
+    assert path.read_bytes() == b"rewritten"
+    assert link.read_bytes() == b"shared"
+
+
+def test_buffers_load_and_save_in_place(tmp_path):
+    path = tmp_path / "in.docx"
+    doc = Document()
+    doc.add_paragraph("x" * 5000)
+    doc.save(path)
+    buffer = load_buffer(path)
+    assert buffer.getvalue() == path.read_bytes()
+
+    doc = Document(buffer)
+    doc.paragraphs[0].text = "short"
+    save_document(doc, buffer)
+    # The shorter document replaces the old bytes rather than overwriting a prefix
+    assert buffer.tell() == 0
+    assert [p.text for p in Document(buffer).paragraphs] == ["short"]
+    assert Document(io.BytesIO(buffer.getvalue())).paragraphs[0].text == "short"
+
+
+def test_failed_generation_writes_nothing(client_db, make_template, workdir, monkeypatch):
+    template = make_template("letter.docx", "Dear [[plaintiff]]")
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("bracket pass failed")
+
+    monkeypatch.setattr(docgen, "replace_bracket_variables", fail)
+    output = workdir / "output_documents" / "letter.docx"
+    output.write_bytes(b"earlier run")
+    with pytest.raises(RuntimeError, match="bracket pass failed"):
+        docgen.generate_document_from_template(template, client_id, output_file=output)
+    assert output.read_bytes() == b"earlier run"
+    assert os.listdir(workdir / "output_documents") == ["letter.docx"]
+    assert os.listdir(workdir / "templates") == ["letter.docx"]
@@ -0,0 +1,100 @@
+# tests/test_docmerge.py
+import struct
+import zipfile
+import zlib
+
+import pytest
+from docx import Document
+
+from modules.docmerge import DocumentMerger, merge_documents
+
+
+def _png(rgb):
+    """A 1x1 PNG of one colour."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"\x00" + bytes(rgb))) + chunk(b"IEND", b""))
+
+
+def _save(path, *paragraphs, style=None, image=None):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text, style=style)
+    if image is not None:
+        image_path = path.with_suffix(".png")
+        image_path.write_bytes(image)
+        doc.add_picture(str(image_path))
+    doc.save(path)
+    return path
+
+
+def _texts(path):
+    return [p.text for p in Document(path).paragraphs]
+
+
+def test_documents_are_appended_in_order(tmp_path):
+    paths = [_save(tmp_path / f"{name}.docx", f"Dear {name}", "Regards") for name in ("ann", "bob", "cy")]
+    merged = merge_documents(paths, tmp_path / "out" / "mailing.docx")
+
+    assert _texts(merged) == ["Dear ann", "Regards", "", "Dear bob", "Regards", "", "Dear cy", "Regards"]
+    breaks = Document(merged).element.body.xpath('.//w:br[@w:type="page"]')
+    assert len(breaks) == 2
+    assert not list((tmp_path / "out").glob(".*.tmp"))
+
+
+def test_without_page_breaks(tmp_path):
+    paths = [_save(tmp_path / f"{i}.docx", f"Letter {i}") for i in range(2)]
+    merged = merge_documents(paths, tmp_path / "mailing.docx", page_breaks=False)
+    assert _texts(merged) == ["Letter 0", "Letter 1"]
+
+
+def test_each_document_restarts_its_numbered_lists(tmp_path):
+    paths = [_save(tmp_path / f"{i}.docx", "First", "Second", style="List Number") for i in range(3)]
+    merged = Document(merge_documents(paths, tmp_path / "mailing.docx"))
+
+    num_ids = []
+    for p in merged.paragraphs:
+        num_pr = p._p.pPr.numPr if p._p.pPr is not None else None
+        num_ids.append(num_pr.numId.val if num_pr is not None else None)
+    # The first document numbers through its style; the others get their own restarted lists
+    assert num_ids[:2] == [None, None]
+    restarted = [num_ids[3:5], num_ids[6:8]]
+    assert all(a == b and a is not None for a, b in restarted)
+    assert restarted[0][0] != restarted[1][0]
+
+    numbering = merged.part.numbering_part.element
+    abstract_count = len(Document().part.numbering_part.element.xpath("w:abstractNum"))
+    # The list definitions are shared, not copied per document
+    assert len(numbering.xpath("w:abstractNum")) == abstract_count
+    for num_id in (restarted[0][0], restarted[1][0]):
+        (num,) = numbering.xpath(f'w:num[@w:numId="{num_id}"]')
+        assert num.xpath('w:lvlOverride[@w:ilvl="0"]/w:startOverride/@w:val') == ["1"]
+
+
+def test_identical_images_are_stored_once(tmp_path):
+    logo, photo = _png((200, 0, 0)), _png((0, 0, 200))
+    paths = [
+        _save(tmp_path / "a.docx", "A", image=logo),
+        _save(tmp_path / "b.docx", "B", image=logo),
+        _save(tmp_path / "c.docx", "C", image=photo),
+        _save(tmp_path / "d.docx", "D", image=photo),
+    ]
+    merged = merge_documents(paths, tmp_path / "mailing.docx")
+
+    with zipfile.ZipFile(merged) as z:
+        media = sorted(z.read(n) for n in z.namelist() if n.startswith("word/media/"))
+    assert media == sorted([logo, photo])
+    doc = Document(merged)
+    assert len(doc.inline_shapes) == 4
+    ids = doc.element.body.xpath(".//wp:docPr/@id")
+    assert len(set(ids)) == 4
+
+
+def test_failed_merge_leaves_no_output(tmp_path):
+    first = _save(tmp_path / "a.docx", "A")
+    with pytest.raises(FileNotFoundError):
+        with DocumentMerger(tmp_path / "mailing.docx") as merger:
+            merger.add(first)
+            merger.add(tmp_path / "missing.docx")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.docx"]
@@ -0,0 +1,83 @@
+# tests/test_grammar.py
+from modules import grammar
+from modules.grammar import GRAMMAR_TOKEN_RE, build_grammar_tables, get_grammar_table, substitute_tokens
+
+
+def test_tables_resolve_every_count_and_gender():
+    tables = build_grammar_tables(grammar.GRAMMAR_RULES)
+    assert set(tables) == {(c, g) for c in grammar.COUNTS for g in grammar.GENDERS}
+    assert tables[("singular", "female")]["he_she_they"] == "she"
+    assert tables[("singular", "neutral")]["his_her_their"] == "their"
+    assert tables[("plural", "male")]["he_she_they"] == "they"
+    # Rules without gendered forms use their plain singular form
+    assert tables[("singular", "female")]["is_are"] == "is"
+
+
+def test_capitalized_variants():
+    table = build_grammar_tables(grammar.GRAMMAR_RULES)[("singular", "male")]
+    assert table["He_she_they"] == "He"
+    assert table["He_She_They"] == "He"
+    assert table["Defendant_defendants"] == "Defendant"
+
+
+def test_substitution_leaves_unknown_tokens():
+    table = build_grammar_tables(grammar.GRAMMAR_RULES)[("plural", "neutral")]
+    text = "(@He_she_they@) (@denies_deny@) the (@claim_claims@)."
+    assert substitute_tokens(text, GRAMMAR_TOKEN_RE, table) == "They deny the (@claim_claims@)."
+
+
+def test_user_rules_are_merged_and_refreshed(client_db):
+    assert "claim_claims" not in get_grammar_table("plural", "male")
+    client_db.set_grammar_rule("claim_claims", singular="claim", plural="claims")
+    client_db.set_grammar_rule("is_are", singular="is", plural="be")
+    assert get_grammar_table("plural", "male")["claim_claims"] == "claims"
+    assert get_grammar_table("plural", "male")["Claim_claims"] == "Claims"
+    # A user rule replaces the built-in one of the same name
+    assert get_grammar_table("plural", "female")["is_are"] == "be"
+
+    client_db.delete_grammar_rule("is_are")
+    assert get_grammar_table("plural", "female")["is_are"] == "are"
+    # Unknown genders fall back to the male table
+    assert get_grammar_table("singular", "unknown") is get_grammar_table("singular", "male")
+
+
+def test_normalize_gender():
+    assert grammar.normalize_gender(" F ") == "female"
+    assert grammar.normalize_gender("Non-Binary") == "neutral"
+    assert grammar.normalize_gender(None) == "male"
+    assert grammar.normalize_gender("unknown", default=None) is None
+
+
+def test_settings_come_from_the_client_record(client_db):
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+    assert grammar.grammar_settings_from_client(client_id, {}) == {"count": "singular", "gender": None}
+    assert grammar.grammar_settings_from_client(client_id, {"gender": "F"}) == {"count": "singular", "gender": "female"}
+    # Plural parties need no gender
+    assert grammar.grammar_settings_from_client(client_id, {"defendant_count": "3"}) == {
+        "count": "plural", "gender": "neutral"}
+    assert grammar.grammar_settings_from_client(client_id, {"defendant_count": "n/a", "gender": "m"}) == {
+        "count": "singular", "gender": "male"}
+
+
+def test_settings_are_asked_once_per_client(client_db, monkeypatch):
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+    asked = []
+
+    def prompt(parent):
+        asked.append(parent)
+        return {"count": "singular", "gender": "female"}
+
+    monkeypatch.setattr(grammar, "prompt_grammar_settings", prompt)
+    grammar.clear_grammar_defaults()
+    try:
+        override = {"count": "plural", "gender": "neutral"}
+        assert grammar.get_grammar_settings(client_id, {}, override=override) is override
+        assert asked == []
+        for _ in range(2):
+            assert grammar.get_grammar_settings(client_id, {}) == {"count": "singular", "gender": "female"}
+        assert len(asked) == 1
+        grammar.clear_grammar_defaults(client_id)
+        grammar.get_grammar_settings(client_id, {})
+        assert len(asked) == 2
+    finally:
+        grammar.clear_grammar_defaults()
@@ -0,0 +1,49 @@
+# tests/test_headless.py
+import pytest
+from docx import Document
+
+from modules import docgen, grammar
+from modules.headless import UnansweredPrompt, headless_prompts
+
+
+def test_answers_and_first_options(client_db, make_template, dynamic_sheets):
+    dynamic_sheets({
+        "venue": ([("Garfield", "Garfield County"), ("Mesa", "Mesa County")], False),
+        "court": ([("District", "District Court"), ("County", "County Court")], False),
+    })
+    template = make_template("caption.docx", "<<court>> of <<venue>>", "Re: {{ case_name }}")
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+
+    with headless_prompts(answers={"venue": "Mesa County", "case_name": "Doe v. Roe"}) as session:
+        output = docgen.generate_document_from_template(template, client_id)
+
+    assert [p.text for p in Document(output).paragraphs] == ["District Court of Mesa County", "Re: Doe v. Roe"]
+    assert ("dynamic", "court") in session.prompted and ("dynamic", "venue") in session.prompted
+
+
+def test_numbered_list_answers(workdir, dynamic_sheets):
+    dynamic_sheets({"defenses": ([("Limitations", "Statute of limitations.")], True)})
+    with headless_prompts(answers={"defenses": ["Laches.", "Waiver."]}) as session:
+        result = session.dynamic_variable(None, "defenses", 1)
+    assert result["value"] == "1. Laches.\n2. Waiver."
+    assert result["use_numbered_list"] and result["selected_items"] == ["Laches.", "Waiver."]
+
+
+def test_unanswered_prompts_can_fail(workdir, dynamic_sheets):
+    dynamic_sheets({"venue": ([("Garfield", "Garfield County")], False)})
+    with headless_prompts(unanswered="fail") as session:
+        with pytest.raises(UnansweredPrompt, match="<<venue>>"):
+            session.dynamic_variable(None, "venue", 1)
+        # Without a sheet there is nothing to choose from
+        assert session.dynamic_variable(None, "unknown", 1) is None
+
+
+def test_dialogs_are_restored_and_messages_recorded():
+    originals = (docgen.prompt_for_variable, docgen.messagebox, grammar.prompt_grammar_settings)
+    with headless_prompts(grammar={"count": "plural", "gender": "neutral"}) as session:
+        assert docgen.messagebox.askyesno("Overwrite?", "Replace the file?") is False
+        docgen.messagebox.showerror("Failed", "Template missing")
+        assert grammar.prompt_grammar_settings(None) == {"count": "plural", "gender": "neutral"}
+    assert session.messages == [("askyesno", "Overwrite?", "Replace the file?"),
+                                ("showerror", "Failed", "Template missing")]
+    assert (docgen.prompt_for_variable, docgen.messagebox, grammar.prompt_grammar_settings) == originals
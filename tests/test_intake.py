@@ -0,0 +1,142 @@
+# tests/test_intake.py
+import openpyxl
+import pytest
+
+from modules import intake
+
+
+def _sheet(path, *rows, title=None):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    if title:
+        ws.title = title
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def test_long_layout(tmp_path):
+    path = _sheet(
+        tmp_path / "long.xlsx",
+        ("Matter ID", "Variable", "Value", "Type", "Description"),
+        ("M-1", "age", "40", "int", "Age in years"),
+        ("M-1", "venue", "Garfield", None, None),
+        (" M-2 ", "age", "forty", None, None),
+        (None, "venue", "orphan", None, None),
+        ("M-2", None, "no variable", None, None),
+    )
+    layout, records, meta = intake.read_bulk_intake(path)
+    assert layout == "long"
+    assert records == {"M-1": {"age": "40", "venue": "Garfield"}, "M-2": {"age": "forty"}}
+    # A later row without a type keeps the one given earlier
+    assert meta == {"age": ("int", "Age in years"), "venue": (None, "")}
+
+
+def test_wide_layout(tmp_path):
+    path = _sheet(
+        tmp_path / "wide.xlsx",
+        ("Variable", "Type", "M-1", "M-2"),
+        ("age", "int", 40, None),
+        ("venue", None, "Garfield", "Mesa"),
+        title="Bulk",
+    )
+    layout, records, meta = intake.read_bulk_intake(path, "Bulk")
+    assert layout == "wide"
+    assert records == {"M-1": {"age": 40, "venue": "Garfield"}, "M-2": {"age": None, "venue": "Mesa"}}
+    assert meta["age"] == ("int", "")
+
+
+def test_unrecognised_header(tmp_path):
+    with pytest.raises(ValueError, match="No 'variable' column"):
+        intake.read_bulk_intake(_sheet(tmp_path / "bad.xlsx", ("Name", "Address")))
+    with pytest.raises(ValueError, match="one column per matterid"):
+        intake.read_bulk_intake(_sheet(tmp_path / "bad.xlsx", ("Variable", "Type")))
+
+
+def test_coercion_falls_back_to_stored_types(client_db):
+    client_db.set_variable_meta("claim_amount", "float")
+    records = {"M-1": {"age": "40", "claim_amount": "12.50"}, "M-2": {"age": "x", "claim_amount": "y"}}
+    meta = {"age": ("int", ""), "claim_amount": (None, "")}
+    coerced, types, errors = intake.coerce_bulk_records(records, meta)
+    assert coerced == {"M-1": {"age": 40, "claim_amount": 12.5}, "M-2": {"age": None, "claim_amount": None}}
+    assert types == {"age": ("int", ""), "claim_amount": ("float", "")}
+    assert sorted((e.key, e.var_name) for e in errors) == [("M-2", "age"), ("M-2", "claim_amount")]
+
+
+def test_bulk_import_reports_a_diff(client_db):
+    existing = client_db.create_client("M-1", "Jane", "Doe")
+    client_db.set_variable_meta("venue")
+    client_db.set_variable("client", existing, "venue", "Garfield")
+    records = {"M-1": {"venue": "Mesa", "age": 40}, "M-2": {"venue": "Garfield", "age": None}}
+    meta = {"age": ("int", "Age in years")}
+
+    preview = client_db.bulk_import_clients(records, meta, dry_run=True)
+    assert preview["M-2"] == {"client_id": None, "created": True, "added": {"venue": "Garfield"},
+                              "changed": {}, "unchanged": 0}
+    assert [c[4] for c in client_db.list_clients()] == ["M-1"]
+    assert client_db.get_variable_meta("age") is None
+
+    report = client_db.bulk_import_clients(records, meta)
+    assert report["M-1"] == {"client_id": existing, "created": False, "added": {"age": "40"},
+                             "changed": {"venue": ("Garfield", "Mesa")}, "unchanged": 0}
+    created = report["M-2"]["client_id"]
+    assert client_db.get_variables("client", created) == {"venue": "Garfield"}
+    assert client_db.get_variable_meta("age")["description"] == "Age in years"
+
+    again = client_db.bulk_import_clients(records, meta)
+    assert again["M-1"]["unchanged"] == 2 and not again["M-1"]["added"] and not again["M-1"]["changed"]
+    assert intake.format_bulk_report(again).splitlines()[0] == "2 matter(s): 0 new, 2 existing"
+    lines = intake.format_bulk_report(report).splitlines()
+    assert lines[0] == "2 matter(s): 1 new, 1 existing"
+    assert lines[2:] == [
+        f"M-1 (client {existing}): 1 added, 1 changed, 0 unchanged",
+        "    venue: 'Garfield' -> 'Mesa'",
+        f"M-2 (new client {created}): 1 added, 0 changed, 0 unchanged",
+    ]
+
+
+def test_intake_records_stream_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(intake, "INTAKE_CHUNK_ROWS", 2)
+    path = _sheet(
+        tmp_path / "intake.xlsx",
+        ("Group", "Variable", "Value", "Type", "Description"),
+        ("Client", "age", "40", "int", "Age"),
+        ("Client", None, "skipped", None, None),
+        ("Court", " venue ", "Garfield", None, None),
+        ("Court", "filed", "2024-03-05", "iso-date", None),
+        ("Court", "jury", "maybe", "bool", None),
+        title=intake.INTAKE_SHEET,
+    )
+    before = path.stat().st_mtime_ns
+    records = list(intake.iter_intake_records(path))
+
+    assert [(r.row, r.var, r.value, r.type) for r in records] == [
+        (2, "age", 40, "int"),
+        (4, "venue", "Garfield", "string"),
+        (5, "filed", "2024-03-05", "iso-date"),
+        (6, "jury", None, "bool"),
+    ]
+    assert records[0].description == "Age" and records[1].group == "Court"
+    assert records[3].raw == "maybe" and records[3].error
+    assert all(r.error is None for r in records[:3])
+    # Read-only: the workbook is never saved back
+    assert path.stat().st_mtime_ns == before
+
+
+def test_missing_intake_sheet(tmp_path):
+    with pytest.raises(KeyError):
+        list(intake.iter_intake_records(_sheet(tmp_path / "intake.xlsx", ("a",))))
+
+
+def test_clear_intake_values(tmp_path):
+    path = _sheet(
+        tmp_path / "intake.xlsx",
+        ("Group", "Variable", "Value", "Type"),
+        ("Client", "age", "40", "int"),
+        title=intake.INTAKE_SHEET,
+    )
+    intake.clear_intake_values(path)
+    ws = openpyxl.load_workbook(path)[intake.INTAKE_SHEET]
+    assert [c.value for c in ws[1]] == ["Group", "Variable", "Value", "Type"]
+    assert [c.value for c in ws[2]] == ["Client", "age", None, "int"]
@@ -0,0 +1,108 @@
+# tests/test_jobqueue.py
+import pytest
+
+from modules import jobqueue
+
+
+def _states(batch_id):
+    status = jobqueue.batch_status(batch_id)
+    return status.pending, status.running, status.done, status.failed
+
+
+def test_batch_jobs_have_fixed_outputs(workdir):
+    batch = jobqueue.create_batch([1, 2], ["templates/letter.docx"])
+    assert jobqueue.batch_status(batch).total == 2
+    job = jobqueue.claim_job(batch, "w1")
+    assert job.output_path == str(jobqueue.output_path_for("templates/letter.docx", job.client_id, batch))
+    assert job.output_path.endswith(f"letter_client1_batch{batch}.docx")
+
+
+def test_claim_is_exclusive_and_ordered(workdir):
+    batch = jobqueue.create_batch([1, 2, 3], ["a.docx"])
+    claimed = [jobqueue.claim_job(batch, f"w{i}") for i in range(4)]
+    assert [j.client_id for j in claimed[:3]] == [1, 2, 3]
+    assert claimed[3] is None
+    assert _states(batch) == (0, 3, 0, 0)
+
+
+def test_resume_requeues_interrupted_and_failed(workdir):
+    batch = jobqueue.create_batch([1, 2, 3], ["a.docx"])
+    first, second, _ = (jobqueue.claim_job(batch) for _ in range(3))
+    jobqueue.finish_job(first.id)
+    jobqueue.finish_job(second.id, "boom")
+    # The third worker crashed, leaving its job running
+    assert _states(batch) == (0, 1, 1, 1)
+    assert jobqueue.resume_batch(batch) == 1
+    assert _states(batch) == (1, 0, 1, 1)
+    assert jobqueue.resume_batch(batch, retry_failed=True) == 1
+    assert _states(batch) == (2, 0, 1, 0)
+    retried = jobqueue.claim_job(batch)
+    assert retried.client_id == 2 and retried.attempts == 2
+
+
+def test_work_records_failures(workdir):
+    batch = jobqueue.create_batch([1, 2, 3], ["a.docx"])
+
+    def render(job):
+        if job.client_id == 2:
+            raise ValueError("no such client")
+        return job.client_id != 3 and job.output_path
+
+    assert jobqueue.work(batch, render=render) == (1, 2)
+    assert jobqueue.list_failed_jobs(batch) == [
+        (2, "a.docx", "ValueError: no such client"),
+        (3, "a.docx", "generation returned no document"),
+    ]
+    assert jobqueue.list_outputs(batch) == [str(jobqueue.output_path_for("a.docx", 1, batch))]
+
+
+def test_interrupted_worker_releases_its_job(workdir):
+    batch = jobqueue.create_batch([1, 2], ["a.docx"])
+
+    def render(job):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        jobqueue.work(batch, render=render)
+    assert _states(batch) == (2, 0, 0, 0)
+    assert jobqueue.claim_job(batch).attempts == 1
+
+
+def test_status_lists_failed_job_errors(workdir, capsys):
+    batch = jobqueue.create_batch([7], ["templates/letter.docx"])
+    jobqueue.finish_job(jobqueue.claim_job(batch).id, "UnansweredPrompt: <<venue>> needs a choice")
+    jobqueue.main(["status"])
+    out = capsys.readouterr().out
+    assert "0 pending, 0 running, 1 failed" in out
+    assert "client      7  letter.docx: UnansweredPrompt: <<venue>> needs a choice" in out
+
+
+def test_answers_recorded_per_batch(workdir):
+    batch = jobqueue.create_batch([1], ["a.docx"], answers={"venue": "Garfield County"})
+    assert jobqueue.batch_answers(batch) == {"venue": "Garfield County"}
+    jobqueue.record_answers(batch, {"responses": ["Admit", "Deny"]})
+    assert jobqueue.batch_answers(batch) == {"venue": "Garfield County", "responses": ["Admit", "Deny"]}
+
+
+def test_resume_cli_records_answers(workdir):
+    batch = jobqueue.create_batch([1], ["a.docx"])
+    jobqueue.main(["resume", str(batch), "--answer", "venue=Garfield County",
+                   "--answer", "responses=Admit", "--answer", "responses=Deny"])
+    assert jobqueue.batch_answers(batch) == {"venue": "Garfield County", "responses": ["Admit", "Deny"]}
+
+
+def test_headless_worker_fails_unanswered_dynamic_prompts(client_db, make_template, dynamic_sheets):
+    dynamic_sheets({"venue": ([("Garfield", "Garfield County"), ("Mesa", "Mesa County")], False)})
+    template = make_template("venue.docx", "Filed in <<venue>>.")
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+
+    unanswered = jobqueue.create_batch([client_id], [template])
+    assert jobqueue.work(unanswered) == (0, 1)
+    ((_, _, error),) = jobqueue.list_failed_jobs(unanswered)
+    assert error.startswith("UnansweredPrompt: <<venue>>")
+
+    answered = jobqueue.create_batch([client_id], [template], answers={"venue": "Mesa County"})
+    assert jobqueue.work(answered) == (1, 0)
+    from docx import Document
+    (output,) = jobqueue.list_outputs(answered)
+    assert Document(output).paragraphs[0].text == "Filed in Mesa County."
@@ -0,0 +1,33 @@
+# tests/test_modifiers.py
+from modules.modifiers import apply_transforms, parse_placeholder, register_transform
+
+
+def test_parse_suffixes():
+    p = parse_placeholder("clientname_title_combo")
+    assert (p.base, p.tags, p.transforms) == ("clientname", frozenset({"combo"}), ("title",))
+    assert parse_placeholder("defendantname_upper").transforms == ("upper",)
+    assert parse_placeholder("venue").base == "venue"
+
+
+def test_tags_only_where_allowed():
+    p = parse_placeholder("venue_combo", allow_tags=False)
+    assert p.base == "venue_combo" and not p.tags
+
+
+def test_apply_transforms_innermost_first():
+    assert apply_transforms("jane doe", ("lower", "upper")) == "JANE DOE"
+    assert apply_transforms("", ("upper",)) == ""
+
+
+def test_registered_transform_is_parsed(monkeypatch):
+    from modules import modifiers
+
+    monkeypatch.setattr(modifiers, "_TRANSFORMS", dict(modifiers._TRANSFORMS))
+    register_transform("initial", lambda v: v[:1])
+    try:
+        p = parse_placeholder("firstname_initial")
+        assert p.transforms == ("initial",)
+        assert apply_transforms("Jane", p.transforms) == "J"
+    finally:
+        modifiers._patterns.clear()
+        parse_placeholder.cache_clear()
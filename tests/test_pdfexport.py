@@ -0,0 +1,150 @@
+# tests/test_pdfexport.py
+import os
+import sys
+import textwrap
+import time
+
+import pytest
+
+from modules import pdfexport
+from modules.pdfexport import PdfConverterPool, PdfExportError
+
+# Speaks pdfworker.py's line protocol without LibreOffice: "crash" in a
+# source name ends the process, "hang" never answers, "bad" is reported as
+# a failed conversion. A sleeping child stands in for soffice; its pid and
+# the profile it was given are logged next to the script
+FAKE_WORKER = textwrap.dedent("""
+    import json, os, subprocess, sys, time
+    office = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(600)"],
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    with open(os.path.join(os.path.dirname(__file__), "offices.log"), "a") as log:
+        log.write(str(office.pid) + " " + sys.argv[2] + "\\n")
+    sys.stdout.write(json.dumps({"ready": True}) + "\\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        job = json.loads(line)
+        if "crash" in job["src"]:
+            sys.exit(1)
+        if "hang" in job["src"]:
+            time.sleep(600)
+        if "bad" in job["src"]:
+            reply = {"ok": False, "error": "IOException: cannot load"}
+        else:
+            with open(job["dst"], "w") as f:
+                f.write("pdf of " + os.path.basename(job["src"]) + " by " + str(os.getpid()))
+            reply = {"ok": True}
+        sys.stdout.write(json.dumps(reply) + "\\n")
+        sys.stdout.flush()
+""")
+
+
+@pytest.fixture
+def fake_office(tmp_path, monkeypatch):
+    script = tmp_path / "fakeworker.py"
+    script.write_text(FAKE_WORKER)
+    monkeypatch.setattr(pdfexport, "WORKER_SCRIPT", script)
+    monkeypatch.setattr(pdfexport, "find_soffice", lambda: "soffice")
+    monkeypatch.setattr(pdfexport, "find_uno_python", lambda: sys.executable)
+
+
+def _offices(tmp_path):
+    return [line.split(" ", 1) for line in (tmp_path / "offices.log").read_text().splitlines()]
+
+
+def _running(pid, wait=5):
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    return False
+        except FileNotFoundError:
+            return False
+        if time.monotonic() > deadline:
+            return True
+        time.sleep(0.05)
+
+
+def _docs(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.docx"
+        path.write_bytes(b"docx")
+        paths.append(path)
+    return paths
+
+
+def test_pdf_path_and_worker_count():
+    assert pdfexport.pdf_path_for("out/letter_client1.docx").as_posix() == "out/letter_client1.pdf"
+    assert 1 <= pdfexport.default_workers() <= pdfexport.MAX_DEFAULT_WORKERS
+
+
+def test_soffice_from_environment(tmp_path, monkeypatch):
+    soffice = tmp_path / "soffice"
+    soffice.write_text("")
+    monkeypatch.setenv(pdfexport.SOFFICE_ENV, str(soffice))
+    pdfexport.find_soffice.cache_clear()
+    try:
+        assert pdfexport.find_soffice() == str(soffice.resolve())
+    finally:
+        pdfexport.find_soffice.cache_clear()
+
+
+def test_pool_needs_libreoffice(monkeypatch):
+    monkeypatch.setattr(pdfexport, "find_soffice", lambda: None)
+    monkeypatch.setattr(pdfexport, "find_uno_python", lambda: None)
+    with pytest.raises(PdfExportError, match="soffice"):
+        PdfConverterPool()
+
+
+def test_convert_many_reports_each_document(tmp_path, fake_office):
+    paths = _docs(tmp_path, "a", "bad", "c", "d")
+    done = []
+    with PdfConverterPool(workers=2) as pool:
+        converted, failed = pool.convert_many(paths, on_done=lambda *args: done.append(args))
+        assert len(pool._workers) == 2
+        profiles = [w.profile for w in pool._workers]
+
+    assert sorted(docx.name for docx, _ in converted) == ["a.docx", "c.docx", "d.docx"]
+    assert all(pdf == docx.with_suffix(".pdf") and pdf.is_file() for docx, pdf in converted)
+    assert failed == [(tmp_path / "bad.docx", "IOException: cannot load")]
+    assert sorted(args[0].name for args in done) == ["a.docx", "bad.docx", "c.docx", "d.docx"]
+    # Workers stay warm across documents and clean up their profiles on close
+    assert len({pdf.read_text().rsplit(" ", 1)[1] for _, pdf in converted}) <= 2
+    assert not any(profile.exists() for profile in profiles)
+
+
+def test_worker_restarts_after_it_dies(tmp_path, fake_office):
+    crash, after = _docs(tmp_path, "crash", "after")
+    with PdfConverterPool(workers=1) as pool:
+        with pytest.raises(PdfExportError, match="stopped while converting crash.docx"):
+            pool.convert(crash)
+        assert pool.convert(after, tmp_path / "renamed.pdf") == tmp_path / "renamed.pdf"
+    assert (tmp_path / "renamed.pdf").read_text().startswith("pdf of after.docx")
+
+
+@pytest.mark.skipif(not pdfexport.is_available(), reason="LibreOffice with UNO is not installed")
+def test_real_conversion(make_template):
+    source = make_template("letter.docx", "Dear client")
+    converted, failed = pdfexport.convert_to_pdf([source], workers=1)
+    assert failed == []
+    assert converted[0][1].read_bytes().startswith(b"%PDF")
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="needs /proc to inspect processes")
+def test_hung_conversion_leaves_no_office_behind(tmp_path, fake_office, monkeypatch):
+    monkeypatch.setattr(pdfexport, "CONVERT_TIMEOUT", 1)
+    hang, after = _docs(tmp_path, "hang", "after")
+    with PdfConverterPool(workers=1) as pool:
+        with pytest.raises(PdfExportError, match="stopped while converting hang.docx"):
+            pool.convert(hang)
+        (hung_pid, _), = _offices(tmp_path)
+        assert not _running(int(hung_pid))
+        assert pool.convert(after).is_file()
+
+    (_, first_profile), (second_pid, second_profile) = _offices(tmp_path)
+    # The replacement worker does not reuse the locked profile, and closing
+    # the pool takes its office along too
+    assert first_profile != second_profile
+    assert not any(os.path.exists(p) for p in (first_profile, second_profile))
+    assert not _running(int(second_pid))
@@ -0,0 +1,72 @@
+# tests/test_perf.py
+import json
+
+import pytest
+
+from modules import perf
+
+
+@pytest.fixture(autouse=True)
+def fresh_buffer(monkeypatch):
+    monkeypatch.setattr(perf, "_spans", perf.deque(maxlen=perf.SPAN_BUFFER_SIZE))
+    monkeypatch.setattr(perf, "_enabled", True)
+
+
+def test_spans_and_traced_calls_are_recorded():
+    @perf.traced("db")
+    def lookup():
+        return 42
+
+    with perf.span("read_excel", "excel", sheet="venue"):
+        assert lookup() == 42
+    names = [(s.category, s.name, s.args) for s in perf.get_spans()]
+    # Spans are appended as they end
+    assert names == [("db", "lookup", None), ("excel", "read_excel", {"sheet": "venue"})]
+
+
+def test_spans_are_recorded_when_the_block_raises():
+    with pytest.raises(ValueError):
+        with perf.span("boom"):
+            raise ValueError
+    assert [s.name for s in perf.get_spans()] == ["boom"]
+
+
+def test_ring_buffer_keeps_the_latest_spans(monkeypatch):
+    monkeypatch.setattr(perf, "_spans", perf.deque(maxlen=3))
+    for i in range(5):
+        with perf.span(f"s{i}"):
+            pass
+    assert [s.name for s in perf.get_spans()] == ["s2", "s3", "s4"]
+
+
+def test_stage_recorder_works_while_spans_are_off():
+    perf.set_enabled(False)
+    with perf.StageRecorder() as rec:
+        for _ in range(2):
+            with perf.stage("docxtpl"):
+                pass
+        with perf.span("ignored"):
+            pass
+    with perf.stage("after"):
+        pass
+    assert rec.counts == {"docxtpl": 2}
+    assert rec.totals["docxtpl"] >= 0
+    assert perf.get_spans() == []
+
+
+def test_summary_and_chrome_trace(tmp_path):
+    spans = [
+        perf.Span("get_variables", "db", 10.0, 0.002, 1, None),
+        perf.Span("docxtpl", "stage", 9.5, 0.5, 1, None),
+        perf.Span("get_variables", "db", 10.1, 0.004, 2, {"client_id": 7}),
+    ]
+    rows = perf.summarize_spans(spans)
+    assert [(r["name"], r["count"]) for r in rows] == [("docxtpl", 1), ("get_variables", 2)]
+    assert rows[1]["max"] == 0.004 and rows[1]["mean"] == pytest.approx(0.003)
+
+    path = tmp_path / "trace.json"
+    assert perf.export_chrome_trace(path, spans) == 3
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [e["ts"] for e in events] == [500000.0, 0.0, 600000.0]
+    assert events[2]["dur"] == 4000.0 and events[2]["args"] == {"client_id": "7"}
+    assert {e["ph"] for e in events} == {"X"}
@@ -0,0 +1,152 @@
+# tests/test_rendercache.py
+import os
+
+import pytest
+from docx import Document
+
+from modules import rendercache
+from modules.docgen import generate_document_from_template
+from modules.headless import headless_prompts
+
+
+@pytest.fixture
+def client(client_db):
+    for name in ("firstname", "lastname", "street"):
+        client_db.set_variable_meta(name)
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+    for name, value in (("firstname", "Jane"), ("lastname", "Doe"), ("street", "12 Elm")):
+        client_db.set_variable("client", client_id, name, value)
+    return client_id
+
+
+def _render(template, client_id, name):
+    output = template.parent.parent / "output_documents" / name
+    with headless_prompts() as session:
+        result = generate_document_from_template(template, client_id, output_file=output)
+    assert result == str(output), session.messages
+    return output
+
+
+# ---------------------------
+# Reuse of identical renders
+# ---------------------------
+def test_fingerprint_is_stable_and_input_sensitive():
+    fp = rendercache.fingerprint("abc", {"context": {"a": 1, "b": 2}})
+    assert fp == rendercache.fingerprint("abc", {"context": {"b": 2, "a": 1}})
+    assert fp != rendercache.fingerprint("abc", {"context": {"a": 1, "b": 3}})
+    assert fp != rendercache.fingerprint("abd", {"context": {"a": 1, "b": 2}})
+
+
+def test_identical_render_is_linked(client, make_template):
+    template = make_template("letter.docx", "Dear {{firstname}} {{lastname}},")
+    first = _render(template, client, "first.docx")
+    second = _render(template, client, "second.docx")
+    assert os.path.samefile(first, second)
+    assert Document(second).paragraphs[0].text == "Dear Jane Doe,"
+
+
+def test_changed_inputs_render_again(client, client_db, make_template):
+    template = make_template("letter.docx", "Dear {{firstname}},")
+    first = _render(template, client, "first.docx")
+    client_db.set_variable("client", client, "firstname", "Janet")
+    second = _render(template, client, "second.docx")
+    assert not os.path.samefile(first, second)
+    assert Document(second).paragraphs[0].text == "Dear Janet,"
+
+
+def test_edited_output_is_not_reused(workdir):
+    path = workdir / "output_documents" / "a.docx"
+    path.write_bytes(b"generated")
+    rendercache.record_output("fp1", path, "t.docx", "hash", 1)
+    assert rendercache.find_output("fp1") == path
+    path.write_bytes(b"edited by hand")
+    assert rendercache.find_output("fp1") is None
+
+
+def test_link_output_copies_without_hard_links(workdir, monkeypatch):
+    source = workdir / "output_documents" / "a.docx"
+    source.write_bytes(b"doc")
+    target = workdir / "output_documents" / "b.docx"
+    target.write_bytes(b"old")
+    monkeypatch.setattr(rendercache, "HARD_LINKS", False)
+    rendercache.link_output(source, target)
+    assert target.read_bytes() == b"doc" and not os.path.samefile(source, target)
+
+
+# ---------------------------
+# Stale outputs
+# ---------------------------
+def test_variable_change_makes_output_stale(client, client_db, make_template):
+    template = make_template("letter.docx", "Dear {{firstname}},")
+    output = _render(template, client, "letter.docx")
+    assert rendercache.find_stale_outputs() == []
+
+    client_db.set_variable("client", client, "street", "9 Oak")  # not used by the template
+    assert rendercache.find_stale_outputs() == []
+    client_db.set_variable("client", client, "firstname", "Janet")
+    (stale,) = rendercache.find_stale_outputs()
+    assert (stale.output_path, stale.client_id, stale.reasons) == (str(output), client, ["firstname"])
+    assert rendercache.find_stale_outputs(client_ids=[client + 1]) == []
+
+
+def test_template_change_makes_output_stale(client, make_template):
+    template = make_template("letter.docx", "Dear {{firstname}},")
+    _render(template, client, "letter.docx")
+    make_template("letter.docx", "Hello {{firstname}},")
+    (stale,) = rendercache.find_stale_outputs()
+    assert stale.reasons == ["template changed"]
+
+
+def test_only_newest_output_per_template_is_checked(client, client_db, make_template):
+    template = make_template("letter.docx", "Dear {{firstname}},")
+    _render(template, client, "old.docx")
+    client_db.set_variable("client", client, "firstname", "Janet")
+    _render(template, client, "new.docx")
+    assert rendercache.find_stale_outputs() == []
+
+
+def test_bracket_fallbacks_are_recorded(client, client_db, make_template, monkeypatch):
+    # Without output reuse no fingerprint is built, so only the bracket pass
+    # itself can record what [[plaintiff]] was resolved from
+    monkeypatch.setattr(rendercache, "_enabled", False)
+    template = make_template("caption.docx", "[[plaintiff]], Plaintiff")
+    output = _render(template, client, "caption.docx")
+    assert Document(output).paragraphs[0].text == "Jane Doe, Plaintiff"
+
+    client_db.set_variable("client", client, "lastname", "Roe")
+    (stale,) = rendercache.find_stale_outputs()
+    assert stale.reasons == ["lastname"]
+
+
+def test_reused_output_is_recorded_for_its_own_client(client_db, make_template):
+    client_db.set_variable_meta("defendantname")
+    first, second = (client_db.create_client(f"M-{i}", "Jane", f"Doe{i}") for i in (1, 2))
+    for client_id in (first, second):
+        client_db.set_variable("client", client_id, "defendantname", "Acme")
+    template = make_template("notice.docx", "Notice to {{defendantname}}")
+    a = _render(template, first, "a.docx")
+    b = _render(template, second, "b.docx")
+    assert os.path.samefile(a, b)
+
+    client_db.set_variable("client", first, "defendantname", "Acme Corp")
+    stale = rendercache.find_stale_outputs()
+    assert [(s.output_path, s.client_id, s.reasons) for s in stale] == [
+        (str(a), first, ["defendantname"]),
+    ]
+    client_db.set_variable("client", second, "defendantname", "Beta LLC")
+    assert [(s.output_path, s.client_id) for s in rendercache.find_stale_outputs([second])] == [(str(b), second)]
+
+
+def test_document_token_cache_is_bounded(workdir, make_template, monkeypatch):
+    from modules import docgen
+    monkeypatch.setattr(docgen, "DOCUMENT_TOKEN_CACHE_SIZE", 2)
+    monkeypatch.setattr(docgen, "_document_token_cache", docgen.OrderedDict())
+    paths = [make_template(f"t{i}.docx", f"((counsel_{i})) [[bracket_{i}]]") for i in range(3)]
+    for path in paths:
+        docgen.document_tokens(path)
+    assert len(docgen._document_token_cache) == 2
+    assert docgen.document_tokens(paths[0]) == {"counsel": {"counsel_0"}, "grammar": set(), "docvars": set(),
+                                                "bracket": {"bracket_0"}}
+    # Re-reading the oldest entry evicted the next oldest
+    assert len(docgen._document_token_cache) == 2
+    assert docgen.file_digest(paths[1]) not in docgen._document_token_cache
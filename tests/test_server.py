@@ -0,0 +1,169 @@
+# tests/test_server.py
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from modules import dbclient, server
+from modules.dbclient import RemoteDB, RemoteError
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def running(client_db):
+    srv = server.make_server("127.0.0.1", 0, token=TOKEN)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_token_required(running):
+    with pytest.raises(RemoteError) as e:
+        RemoteDB(running.url).health()
+    assert e.value.status == 401
+    with pytest.raises(RemoteError) as e:
+        RemoteDB(running.url, token="wrong").list_clients()
+    assert e.value.status == 401
+    assert RemoteDB(running.url, token=TOKEN).health()["ok"] is True
+
+
+def test_non_loopback_bind_needs_token(workdir):
+    for host in ("0.0.0.0", "", "192.168.1.10"):
+        with pytest.raises(ValueError):
+            server.make_server(host, 0)
+    assert server.is_loopback("localhost") and server.is_loopback("::1")
+
+
+def test_operations_round_trip(running):
+    remote = RemoteDB(running.url, token=TOKEN)
+    remote.set_variable_meta("street")
+    client_id = remote.create_client("M-1", "Jane", "Doe")
+    remote.set_variable("client", client_id, "street", "12 Elm")
+    assert remote.get_variables("client", client_id)["street"] == "12 Elm"
+    assert remote.search_clients("elm") == [client_id]
+    with pytest.raises(RemoteError) as e:
+        remote.call("drop_everything")
+    assert e.value.status == 404
+
+
+def test_unsafe_derived_expressions_are_refused(running, client_db):
+    remote = RemoteDB(running.url, token=TOKEN)
+    for name in ("firstname", "lastname"):
+        remote.set_variable_meta(name)
+    payloads = (
+        "().__class__.__base__.__subclasses__()",
+        "firstname.__class__",
+        "firstname + open('x')",
+        "unknown_name + ' '",
+        "firstname * 3",
+    )
+    for expression in payloads:
+        with pytest.raises(RemoteError) as e:
+            remote.set_variable_meta("fullname", "string", is_derived=1, derived_expression=expression)
+        assert e.value.status == 403, expression
+    with pytest.raises(RemoteError) as e:
+        remote.call("set_variable_meta", "fullname", "string", None, "General", 0, 1, "firstname.__class__")
+    assert e.value.status == 403
+    with pytest.raises(RemoteError) as e:
+        remote.set_variable_meta("fullname", is_derived=1)
+    assert e.value.status == 403
+    assert client_db.get_variable_meta("fullname") is None
+
+    remote.set_variable_meta("fullname", is_derived=1, derived_expression="firstname + ' ' + lastname")
+    client_id = remote.create_client("M-1")
+    remote.set_variable("client", client_id, "firstname", "Jane")
+    remote.set_variable("client", client_id, "lastname", "Doe")
+    assert remote.get_all_variables_for_client("client", client_id)["fullname"]["value"] == "Jane Doe"
+
+
+def test_revisions_change_on_cached_table_writes(running):
+    remote = RemoteDB(running.url, token=TOKEN)
+    before = remote.revisions()
+    remote.set_variable("client", remote.create_client("M-1"), "street", "12 Elm")
+    assert remote.revisions() == before
+    remote.set_concat_variable("fullname", ["firstname", "lastname"])
+    after = remote.revisions()
+    assert after["concat"] != before["concat"] and after["grammar"] == before["grammar"]
+
+
+def test_generate_returns_downloadable_document(running, workdir):
+    from docx import Document
+
+    doc = Document()
+    doc.add_paragraph("Dear {{firstname}},")
+    doc.save(workdir / "templates" / "letter.docx")
+    remote = RemoteDB(running.url, token=TOKEN)
+    remote.set_variable_meta("firstname")
+    client_id = remote.create_client("M-1", "Jane", "Doe")
+    remote.set_variable("client", client_id, "firstname", "Jane")
+
+    result = remote.generate("letter.docx", client_id, download_to=workdir / "downloads")
+    assert "/" not in result["output"] and result["download"].startswith("/api/output/")
+    local = Document(result["local_output"])
+    assert local.paragraphs[0].text == "Dear Jane,"
+
+
+def test_download_is_scoped_to_output_dir(running, workdir):
+    (workdir / "data" / "secret.txt").write_text("no")
+    remote = RemoteDB(running.url, token=TOKEN)
+    for path in ("/api/output/..%2Fdata%2Fsecret.txt", "/api/output/../data/secret.txt",
+                 "/api/output/missing.docx"):
+        with pytest.raises(RemoteError) as e:
+            remote.download(path, workdir / "out.bin")
+        assert e.value.status == 404
+
+
+class _FakeRemote:
+    def __init__(self):
+        self.revision = "a-0"
+        self.loads = 0
+
+    def revisions(self):
+        return {"concat": self.revision}
+
+    def load(self):
+        self.loads += 1
+        return {"fullname": self.loads}
+
+
+def test_revision_checked_cache(monkeypatch):
+    remote = _FakeRemote()
+    cache = dbclient.RevisionCheckedCache(remote, "concat", remote.load)
+    monkeypatch.setattr(dbclient, "CACHE_CHECK_SECONDS", 3600)
+    assert cache.get() == cache.get() == {"fullname": 1}
+    remote.revision = "a-1"
+    assert cache.get() == {"fullname": 1}  # not rechecked yet
+    monkeypatch.setattr(dbclient, "CACHE_CHECK_SECONDS", 0)
+    assert cache.get() == {"fullname": 2}
+    assert cache.get() == {"fullname": 2}
+    cache.invalidate()
+    assert cache.get() == {"fullname": 3}
+
+
+def test_install_sees_other_desktops_writes(workdir, monkeypatch):
+    from modules import db
+
+    env = dict(os.environ, PYTHONPATH=str(server.Path(server.__file__).resolve().parent.parent))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "modules.server", "--port", "0", "--token", TOKEN],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, text=True,
+    )
+    saved = dict(vars(db))
+    try:
+        url = proc.stdout.readline().split(" on ")[1].split()[0]
+        monkeypatch.setattr(dbclient, "CACHE_CHECK_SECONDS", 0)
+        dbclient.install(url, TOKEN)
+        assert db.get_concat_index() == {}
+        # Another desktop adds a concat variable
+        RemoteDB(url, token=TOKEN).set_concat_variable("fullname", ["firstname", "lastname"])
+        assert list(db.get_concat_index()) == ["fullname"]
+    finally:
+        vars(db).clear()
+        vars(db).update(saved)
+        proc.terminate()
+        proc.wait(10)
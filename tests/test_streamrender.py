@@ -0,0 +1,130 @@
+# tests/test_streamrender.py
+import shutil
+import zipfile
+from pathlib import Path
+
+from docx import Document
+
+from conftest import PROJECT_ROOT
+from modules import streamrender
+from modules.docgen import generate_document_from_template
+from modules.headless import headless_prompts
+
+ANSWER_TEMPLATE = "DOC - Answer (substantive).docx"
+
+
+def test_document_numbering_creates_a_missing_part(tmp_path):
+    doc = Document(PROJECT_ROOT / "templates" / ANSWER_TEMPLATE)
+    assert not any(p.partname == "/word/numbering.xml" for p in doc.part.package.iter_parts())
+    numbering = streamrender.ListNumbering(streamrender.document_numbering(doc))
+    num_id = numbering.new_list()
+    path = tmp_path / "numbered.docx"
+    doc.save(path)
+
+    with zipfile.ZipFile(path) as z:
+        assert 'PartName="/word/numbering.xml"' in z.read("[Content_Types].xml").decode()
+        assert f'w:numId="{num_id}"' in z.read("word/numbering.xml").decode()
+        assert 'Target="numbering.xml"' in z.read("word/_rels/document.xml.rels").decode()
+    # Opening again finds the part rather than adding a second one
+    reopened = Document(path)
+    assert streamrender.document_numbering(reopened) is reopened.part.numbering_part.element
+
+
+def test_short_list_in_template_without_numbering(client_db, dynamic_sheets):
+    # The shipped answer template has no word/numbering.xml
+    template = Path(shutil.copy(PROJECT_ROOT / "templates" / ANSWER_TEMPLATE, "templates"))
+    with zipfile.ZipFile(template) as z:
+        assert "word/numbering.xml" not in z.namelist()
+    defenses = ["Failure to state a claim.", "Statute of limitations."]
+    dynamic_sheets({
+        "AffirmativeDefense": ([(d, d) for d in defenses], True),
+        "Answer": ([("Admit", "Admitted."), ("Deny", "Denied.")], False),
+        "jurisdiction": ([("Yes", "Jurisdiction is proper.")], False),
+        "jurisdiction_upper": ([("Yes", "JURISDICTION")], False),
+        "venue": ([("Yes", "Venue is proper.")], False),
+        "venue_upper": ([("Yes", "VENUE")], False),
+    })
+    client_id = client_db.create_client("M-1", "Jane", "Doe")
+
+    with headless_prompts(answers={"AffirmativeDefense": defenses}):
+        output = generate_document_from_template(template, client_id)
+
+    assert output
+    with zipfile.ZipFile(output) as z:
+        assert "word/numbering.xml" in z.namelist()
+        assert 'PartName="/word/numbering.xml"' in z.read("[Content_Types].xml").decode()
+    items = [p for p in Document(output).paragraphs if p.text.strip() in defenses]
+    assert [p.text.strip() for p in items] == defenses
+    assert all(p._p.pPr is not None and p._p.pPr.numPr is not None for p in items)
+
+
+def _list_paragraphs(path):
+    """(text, numId or None) of each body paragraph."""
+    result = []
+    for p in Document(path).paragraphs:
+        num_pr = p._p.pPr.numPr if p._p.pPr is not None else None
+        result.append((p.text, num_pr.numId.val if num_pr is not None else None))
+    return result
+
+
+def test_list_items_strips_only_matching_numbers():
+    assert streamrender.list_items("1. Admit\n2. Deny\n4. Other") == ["Admit", "Deny", "4. Other"]
+    assert streamrender.list_items("No number") == ["No number"]
+
+
+def test_should_stream_needs_a_long_plain_numbered_list():
+    numbered = {"use_numbered_list": True}
+    long_list = "\n".join(f"Item {i}" for i in range(streamrender.STREAM_MIN_ITEMS))
+    assert streamrender.should_stream(numbered, long_list)
+    assert not streamrender.should_stream({"use_numbered_list": False}, long_list)
+    assert not streamrender.should_stream(numbered, long_list.split("\n", 1)[1])
+    # Passes skipped by streaming would have had work to do in the items
+    assert not streamrender.should_stream(numbered, long_list + "\n{{ venue }}")
+    # [[bracket]] variables are applied per item instead
+    assert streamrender.should_stream(numbered, long_list + "\n[[plaintiff]]")
+
+
+def test_expand_lists_numbers_each_list_from_one(make_template):
+    source = make_template("lists.docx", "Intro", "<<Defense>>", "Between", "<<Response>>", "End")
+    target = source.with_name("expanded.docx")
+    streamrender.expand_lists(source, target, {"Defense": ["A", "B", "C"], "Response": ["x", "y"]},
+                              item_filter=str.upper)
+
+    paragraphs = _list_paragraphs(target)
+    assert [text for text, _ in paragraphs] == ["Intro", "A", "B", "C", "Between", "X", "Y", "End"]
+    defense_id, response_id = paragraphs[1][1], paragraphs[5][1]
+    assert defense_id != response_id
+    assert [num_id for _, num_id in paragraphs] == [None] + [defense_id] * 3 + [None] + [response_id] * 2 + [None]
+    numbering = Document(target).part.numbering_part.element
+    for num_id in (defense_id, response_id):
+        (num,) = numbering.xpath(f'w:num[@w:numId="{num_id}"]')
+        assert num.xpath("w:lvlOverride/w:startOverride/@w:val") == ["1"]
+
+
+def test_expand_lists_adds_a_missing_numbering_part(workdir):
+    source = shutil.copy(PROJECT_ROOT / "templates" / ANSWER_TEMPLATE, "templates")
+    target = workdir / "expanded.docx"
+    items = [f"Defense {i}" for i in range(1, 4)]
+    streamrender.expand_lists(source, target, {"AffirmativeDefense": items})
+
+    with zipfile.ZipFile(target) as z:
+        assert 'PartName="/word/numbering.xml"' in z.read("[Content_Types].xml").decode()
+        assert 'Target="numbering.xml"' in z.read("word/_rels/document.xml.rels").decode()
+    listed = [(text, num_id) for text, num_id in _list_paragraphs(target) if text in items]
+    assert [text for text, _ in listed] == items
+    assert len({num_id for _, num_id in listed}) == 1 and listed[0][1] is not None
+
+
+def test_section_break_moves_to_the_last_item():
+    from lxml import etree
+
+    p = etree.fromstring(
+        f'<w:p xmlns:w="{streamrender.W}"><w:pPr><w:sectPr/></w:pPr><w:r><w:t>&lt;&lt;List&gt;&gt;</w:t></w:r></w:p>'
+    )
+    numbering = streamrender.ListNumbering(etree.fromstring(f'<w:numbering xmlns:w="{streamrender.W}"/>'))
+    added = list(streamrender.expand_paragraph(p, {"List": ["one", "two", "three"]}, numbering))
+
+    sect = f"{{{streamrender.W}}}sectPr"
+    assert p.find(f".//{sect}") is None
+    assert [q.find(f".//{sect}") is not None for q in added] == [False, True]
+    assert ["".join(q.itertext()) for q in [p] + added] == ["one", "two", "three"]
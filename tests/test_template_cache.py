@@ -0,0 +1,71 @@
+# tests/test_template_cache.py
+import io
+import os
+
+from modules import template_cache
+
+
+class _FakeTemplate:
+    def __init__(self, names):
+        self.names = names
+        self.calls = 0
+
+    def get_undeclared_template_variables(self, jinja_env=None):
+        self.calls += 1
+        return set(self.names)
+
+
+def test_undeclared_variables_cached_per_path_and_mtime(workdir):
+    path = workdir / "templates" / "letter.docx"
+    path.write_bytes(b"v1")
+    tpl = _FakeTemplate({"firstname"})
+
+    assert template_cache.get_undeclared_variables(tpl, path) == {"firstname"}
+    assert template_cache.get_undeclared_variables(tpl, path) == {"firstname"}
+    assert tpl.calls == 1
+
+    # An edited template is parsed again
+    path.write_bytes(b"version 2")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    edited = _FakeTemplate({"firstname", "lastname"})
+    assert template_cache.get_undeclared_variables(edited, path) == {"firstname", "lastname"}
+    assert edited.calls == 1
+
+
+def test_undeclared_buffers_keyed_by_content(workdir):
+    tpl = _FakeTemplate({"venue"})
+    template_cache.get_undeclared_variables(tpl, io.BytesIO(b"same xml"))
+    template_cache.get_undeclared_variables(tpl, io.BytesIO(b"same xml"))
+    template_cache.get_undeclared_variables(tpl, io.BytesIO(b"other xml"))
+    assert tpl.calls == 2
+
+
+def test_undeclared_cache_is_bounded(workdir, monkeypatch):
+    monkeypatch.setattr(template_cache, "UNDECLARED_CACHE_SIZE", 3)
+    monkeypatch.setattr(template_cache, "_undeclared_cache", template_cache.OrderedDict())
+    tpl = _FakeTemplate(set())
+    for i in range(5):
+        template_cache.get_undeclared_variables(tpl, io.BytesIO(b"doc %d" % i))
+    assert len(template_cache._undeclared_cache) == 3
+    # The oldest entries were evicted, the newest is still cached
+    template_cache.get_undeclared_variables(tpl, io.BytesIO(b"doc 4"))
+    template_cache.get_undeclared_variables(tpl, io.BytesIO(b"doc 0"))
+    assert tpl.calls == 6
+
+
+def test_bytecode_cache_is_bounded(workdir, make_template, monkeypatch):
+    from docxtpl import DocxTemplate
+    monkeypatch.setattr(template_cache, "BYTECODE_CACHE_SIZE", 3)
+    cache_dir = template_cache.BYTECODE_CACHE_DIR
+    for i in range(8):
+        with open(make_template(f"copy{i}.docx", f"Working copy {i} for {{{{ name }}}}"), "rb") as f:
+            tpl = DocxTemplate(io.BytesIO(f.read()))
+        template_cache.render_template(tpl, {"name": "Jane"})
+    assert 0 < len(os.listdir(cache_dir)) <= 3
+
+    # Leftovers from an earlier run are pruned when the environment is created
+    for i in range(5):
+        (cache_dir / f"__jinja2_stale{i}.cache").write_bytes(b"")
+    monkeypatch.setattr(template_cache, "_env", None)
+    template_cache.get_jinja_env()
+    assert len(os.listdir(cache_dir)) == 3
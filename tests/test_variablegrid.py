@@ -0,0 +1,89 @@
+# tests/test_variablegrid.py
+from modules import variablegrid
+from modules.variablegrid import ALL_CATEGORIES, VariableTable
+
+ROWS = [
+    {"var_name": "firstname", "description": "First name", "category": "Client"},
+    {"var_name": "lastname", "description": "Last name", "category": "Client"},
+    {"var_name": "venue", "description": "County of the court", "category": "Court"},
+    {"var_name": "notes", "description": None, "category": None},
+    {"var_name": "fullname", "description": "Full name", "category": "Client", "is_derived": 1,
+     "derived_expression": "firstname + ' ' + lastname"},
+    {"var_name": "salutation", "description": "", "category": "Letters", "is_derived": 1,
+     "derived_expression": "'Dear ' + fullname"},
+]
+VALUES = {"firstname": "Jane", "lastname": "Doe", "venue": "Mesa", "notes": ""}
+
+
+def _counting(monkeypatch):
+    evaluated = []
+
+    def evaluate(expression, context):
+        evaluated.append(expression)
+        return real(expression, context)
+
+    real = variablegrid.evaluate_derived
+    monkeypatch.setattr(variablegrid, "evaluate_derived", evaluate)
+    return evaluated
+
+
+def test_category_and_search_filter():
+    table = VariableTable(ROWS, VALUES)
+    names = lambda positions: [ROWS[pos]["var_name"] for pos in positions]
+    assert table.categories() == ["Client", "Court", "General", "Letters"]
+    assert names(table.filter()) == [r["var_name"] for r in ROWS]
+    assert names(table.filter(category=ALL_CATEGORIES)) == [r["var_name"] for r in ROWS]
+    assert names(table.filter(category="Client")) == ["firstname", "lastname", "fullname"]
+    # Rows without a category are listed under General
+    assert names(table.filter(category="General")) == ["notes"]
+    # The search term matches names and descriptions within the category
+    assert names(table.filter(" NAME ", "Client")) == ["firstname", "lastname", "fullname"]
+    assert names(table.filter("county")) == ["venue"]
+    assert names(table.filter("county", "Client")) == []
+
+
+def test_derived_of_derived_is_evaluated_lazily(monkeypatch):
+    evaluated = _counting(monkeypatch)
+    table = VariableTable(ROWS, VALUES)
+    assert evaluated == []
+    assert table.value("salutation") == "Dear Jane Doe"
+    assert len(evaluated) == 2
+    # fullname was resolved on the way and is cached with salutation
+    assert table.value("fullname") == "Jane Doe"
+    assert len(evaluated) == 2
+
+    table.set_value("firstname", "Janet")
+    assert table.value("salutation") == "Dear Janet Doe"
+    assert len(evaluated) == 4
+
+
+def test_derived_cycle_falls_back_to_stored_values():
+    rows = [
+        {"var_name": "a", "is_derived": 1, "derived_expression": "b + '!'"},
+        {"var_name": "b", "is_derived": 1, "derived_expression": "a + '?'"},
+        {"var_name": "c", "is_derived": 1, "derived_expression": "c + d"},
+    ]
+    table = VariableTable(rows, {"a": "A"})
+    # a's own expression is being resolved, so b reads a's stored value
+    assert table.value("a") == "A?!"
+    assert table.value("b") == "A?"
+    # A self-reference without a stored value cannot be evaluated
+    assert table.value("c") == ""
+
+
+def test_changes_track_edits_in_row_order():
+    table = VariableTable(ROWS, VALUES)
+    table.set_value("venue", "Garfield")
+    table.set_value("firstname", "Janet")
+    table.set_value("notes", "")
+    assert table.changes() == [
+        ("firstname", "First name", "Janet", "Jane"),
+        ("venue", "County of the court", "Garfield", "Mesa"),
+    ]
+    assert table.value("fullname") == "Janet Doe"
+
+    # Setting a value back to the stored one drops the edit
+    table.set_value("firstname", "Jane")
+    table.set_value("notes", "Call back")
+    assert table.changes() == [("venue", "County of the court", "Garfield", "Mesa"),
+                               ("notes", "", "Call back", "")]
@@ -0,0 +1,83 @@
+# tests/test_zipbundle.py
+import json
+import zipfile
+
+import pytest
+
+from modules import jobqueue
+from modules.zipbundle import MANIFEST_NAME, ZipBundle, bundle_path_for
+
+
+def _manifest(path):
+    with zipfile.ZipFile(path) as z:
+        return json.loads(z.read(MANIFEST_NAME))
+
+
+def test_documents_and_manifest(tmp_path):
+    source = tmp_path / "copied.docx"
+    source.write_bytes(b"from a file")
+    with ZipBundle(tmp_path / "batch3.zip", batch_id=3) as bundle:
+        bundle.add("a_client1.docx", b"in memory", client_id=1, template="templates/a.docx")
+        bundle.add("b_client1.docx", source, client_id=1, template="templates/b.docx")
+        bundle.add("a_client2.docx", b"second", client_id=2, template="templates/a.docx")
+
+    with zipfile.ZipFile(tmp_path / "batch3.zip") as z:
+        assert z.namelist() == ["a_client1.docx", "b_client1.docx", "a_client2.docx", MANIFEST_NAME]
+        assert z.read("b_client1.docx") == b"from a file"
+        assert z.getinfo("a_client1.docx").compress_type == zipfile.ZIP_STORED
+    manifest = _manifest(tmp_path / "batch3.zip")
+    assert manifest["batch"] == 3
+    assert manifest["clients"] == {"1": ["a_client1.docx", "b_client1.docx"], "2": ["a_client2.docx"]}
+    assert [(d["template"], d["size"]) for d in manifest["documents"]] == [
+        ("a.docx", 9), ("b.docx", 11), ("a.docx", 6),
+    ]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_duplicate_names_are_refused(tmp_path):
+    with ZipBundle(tmp_path / "out.zip") as bundle:
+        bundle.add("letter.docx", b"1")
+        with pytest.raises(ValueError, match="already in out.zip"):
+            bundle.add("letter.docx", b"2")
+    assert len(bundle) == 1
+
+
+def test_interrupted_run_keeps_finished_documents(tmp_path):
+    with pytest.raises(KeyboardInterrupt):
+        with ZipBundle(tmp_path / "out.zip") as bundle:
+            bundle.add("done.docx", b"finished")
+            raise KeyboardInterrupt
+    assert _manifest(tmp_path / "out.zip")["clients"] == {"None": ["done.docx"]}
+    assert bundle.close() == tmp_path / "out.zip"
+
+
+def test_abort_discards_the_archive(tmp_path):
+    bundle = ZipBundle(tmp_path / "out.zip")
+    bundle.add("x.docx", b"x")
+    bundle.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bundle_path_does_not_overwrite_earlier_runs(workdir):
+    first = bundle_path_for(5)
+    assert first.as_posix() == "output_documents/batch5.zip"
+    first.touch()
+    second = bundle_path_for(5)
+    assert second.name == "batch5_2.zip"
+    second.touch()
+    assert bundle_path_for(5).name == "batch5_3.zip"
+
+
+def test_worker_writes_documents_into_the_bundle(client_db, make_template, workdir):
+    template = make_template("letter.docx", "Dear client")
+    client_ids = [client_db.create_client(f"M-{i}", "Jane", f"Doe{i}") for i in range(2)]
+    batch = jobqueue.create_batch(client_ids, [template])
+    path = workdir / "output_documents" / "bundle.zip"
+
+    with ZipBundle(path, batch) as bundle:
+        assert jobqueue.work(batch, render=jobqueue._headless_render(bundle)) == (2, 0)
+
+    names = [f"letter_client{client_id}_batch{batch}.docx" for client_id in client_ids]
+    assert _manifest(path)["clients"] == {str(c): [n] for c, n in zip(client_ids, names)}
+    # Nothing but the archive is written
+    assert [p.name for p in (workdir / "output_documents").iterdir()] == ["bundle.zip"]